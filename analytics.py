@@ -0,0 +1,207 @@
+"""Fee analytics over NumPy column arrays.
+
+load_ledger() reads enrollments and payments once, in bulk, into columns
+(ids, fees, amounts, dates as day numbers computed by SQLite, course names
+dictionary-encoded as small integers). Every report below is then a vectorized group-by
+(np.bincount / np.unique) over those arrays, so reports over hundreds of
+thousands of payments take milliseconds and never touch the database.
+"""
+import sqlite3
+from datetime import date
+
+import numpy as np
+
+from database import DB_NAME
+
+AGING_BUCKETS = (30, 60, 90)  # days since enrollment
+
+
+# Dates are read as day numbers (days since 1970-01-01), -1 where missing or invalid
+DAY_NUMBER_SQL = "IFNULL(CAST(julianday(substr({}, 1, 10)) - 2440587.5 AS INTEGER), -1)"
+
+
+class Ledger:
+    """Enrollments and payments as column arrays.
+
+    Enrollment columns are aligned by position (sorted by enrollment id);
+    payment_enrollment holds the enrollment position each payment belongs
+    to. Payments whose enrollment no longer exists are left out. The arrays
+    can be memory-mapped (see report_snapshot.py); they are only copied
+    where a payment has to be dropped.
+    """
+    def __init__(self, enrollment_ids, course_names, enrollment_course, fees, enrollment_days,
+                 payment_enrollment_ids, amounts, payment_days):
+        self.enrollment_ids = enrollment_ids
+        self.course_names = course_names
+        self.enrollment_course = enrollment_course
+        self.fees = fees
+        self.enrollment_days = enrollment_days
+
+        # Enrollment ids are dense integers: map id -> position with one lookup array
+        lookup = np.full(int(enrollment_ids.max()) + 2 if len(enrollment_ids) else 1, -1, dtype=np.int64)
+        lookup[enrollment_ids] = np.arange(len(enrollment_ids))
+        positions = lookup[np.clip(payment_enrollment_ids, -1, len(lookup) - 1)]
+        known = positions >= 0
+        if known.all():
+            self.payment_enrollment = positions
+            self.amounts = amounts
+            self.payment_days = payment_days
+        else:
+            self.payment_enrollment = positions[known]
+            self.amounts = amounts[known]
+            self.payment_days = payment_days[known]
+
+    @property
+    def enrollment_count(self):
+        return len(self.enrollment_ids)
+
+    @property
+    def payment_count(self):
+        return len(self.amounts)
+
+
+def ledger_from_rows(enrollments, payments):
+    """Ledger from (id, course_name, fee, day) enrollment rows sorted by id and (enrollment_id, amount, day) payment rows"""
+    ids, courses, fees, days = zip(*enrollments) if enrollments else ((), (), (), ())
+    course_names, enrollment_course = np.unique(np.array(courses, dtype=str), return_inverse=True)
+    enrollment_ids, amounts, payment_days = zip(*payments) if payments else ((), (), ())
+    return Ledger(
+        np.array(ids, dtype=np.int64),
+        course_names,
+        enrollment_course.astype(np.int64),
+        np.array([fee or 0 for fee in fees], dtype=np.int64),
+        np.array(days, dtype=np.int64),
+        np.array([eid if eid is not None else -1 for eid in enrollment_ids], dtype=np.int64),
+        np.array([amount or 0 for amount in amounts], dtype=np.int64),
+        np.array(payment_days, dtype=np.int64),
+    )
+
+
+def load_ledger(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(f"SELECT id, course_name, course_fee, {DAY_NUMBER_SQL.format('enrollment_date')} "
+              "FROM enrollments ORDER BY id")
+    enrollments = c.fetchall()
+    c.execute(f"SELECT enrollment_id, amount, {DAY_NUMBER_SQL.format('date')} FROM payments")
+    payments = c.fetchall()
+    conn.close()
+    return ledger_from_rows(enrollments, payments)
+
+
+def paid_by_enrollment(ledger):
+    return np.bincount(ledger.payment_enrollment, weights=ledger.amounts,
+                       minlength=ledger.enrollment_count).astype(np.int64)
+
+
+def outstanding_by_enrollment(ledger):
+    """(enrollment ids, fees, paid, outstanding) arrays; overpayments show as negative outstanding"""
+    paid = paid_by_enrollment(ledger)
+    return ledger.enrollment_ids, ledger.fees, paid, ledger.fees - paid
+
+
+def outstanding_by_course(ledger):
+    """Per course: enrollments, total fees, paid and outstanding, largest outstanding first"""
+    paid = paid_by_enrollment(ledger)
+    courses = len(ledger.course_names)
+    counts = np.bincount(ledger.enrollment_course, minlength=courses)
+    fees = np.bincount(ledger.enrollment_course, weights=ledger.fees, minlength=courses).astype(np.int64)
+    collected = np.bincount(ledger.enrollment_course, weights=paid, minlength=courses).astype(np.int64)
+    outstanding = fees - collected
+    order = np.argsort(-outstanding, kind="stable")
+    return [
+        {
+            "course": str(ledger.course_names[i]),
+            "enrollments": int(counts[i]),
+            "fees": int(fees[i]),
+            "paid": int(collected[i]),
+            "outstanding": int(outstanding[i]),
+        }
+        for i in order
+    ]
+
+
+def group_collections(keys, amounts):
+    """(distinct keys, payment counts, amounts) for payments grouped by day or month numbers"""
+    if not len(keys):
+        return keys, keys, keys
+    # Day and month numbers span a small range, so count into one slot per value
+    low = keys.min()
+    slots = keys - low
+    counts = np.bincount(slots)
+    totals = np.bincount(slots, weights=amounts).astype(np.int64)
+    present = np.flatnonzero(counts)
+    return present + low, counts[present], totals[present]
+
+
+def collections_by_day(ledger, start=None, end=None):
+    """[(YYYY-MM-DD, payments, amount)] for days with payments, optionally limited to start..end inclusive"""
+    days, amounts = ledger.payment_days, ledger.amounts
+    mask = days >= 0
+    if start:
+        mask &= days >= np.datetime64(start, "D").astype(np.int64)
+    if end:
+        mask &= days <= np.datetime64(end, "D").astype(np.int64)
+    unique, counts, totals = group_collections(days[mask], amounts[mask])
+    labels = np.array(unique, dtype="datetime64[D]").astype(str)
+    return [(str(label), int(count), int(total)) for label, count, total in zip(labels, counts, totals)]
+
+
+def collections_by_month(ledger):
+    """[(YYYY-MM, payments, amount)] for months with payments"""
+    days = ledger.payment_days
+    mask = days >= 0
+    # Group by day first, then fold the (few) days into months
+    day_numbers, day_counts, day_totals = group_collections(days[mask], ledger.amounts[mask])
+    if not len(day_numbers):
+        return []
+    months = day_numbers.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    counts = np.add.reduceat(day_counts, starts)
+    totals = np.add.reduceat(day_totals, starts)
+    labels = months[starts].astype("datetime64[M]").astype(str)
+    return [(str(label), int(count), int(total)) for label, count, total in zip(labels, counts, totals)]
+
+
+def dues_aging(ledger, as_of=None, buckets=AGING_BUCKETS):
+    """Outstanding fees grouped by days since enrollment.
+
+    Returns [(label, enrollments with dues, amount due)] for 0-30, 31-60,
+    61-90 and over 90 days (with the default buckets), plus "Unknown date"
+    when some enrollments have no valid date.
+    """
+    today = np.datetime64(as_of or date.today().isoformat(), "D").astype(np.int64)
+    _, _, _, outstanding = outstanding_by_enrollment(ledger)
+    due = outstanding > 0
+    known = ledger.enrollment_days >= 0
+    ages = today - ledger.enrollment_days
+    bucket = np.digitize(ages, np.array(buckets) + 1)  # 0..len(buckets)
+    labels = []
+    lower = 0
+    for limit in buckets:
+        labels.append(f"{lower}-{limit} days")
+        lower = limit + 1
+    labels.append(f"over {buckets[-1]} days")
+
+    selected = due & known
+    counts = np.bincount(bucket[selected], minlength=len(labels))
+    amounts = np.bincount(bucket[selected], weights=outstanding[selected], minlength=len(labels)).astype(np.int64)
+    result = [(label, int(count), int(amount)) for label, count, amount in zip(labels, counts, amounts)]
+    unknown = due & ~known
+    if unknown.any():
+        result.append(("Unknown date", int(unknown.sum()), int(outstanding[unknown].sum())))
+    return result
+
+
+def fee_summary(ledger):
+    paid = int(ledger.amounts.sum())
+    fees = int(ledger.fees.sum())
+    _, _, _, outstanding = outstanding_by_enrollment(ledger)
+    return {
+        "enrollments": ledger.enrollment_count,
+        "payments": ledger.payment_count,
+        "fees": fees,
+        "paid": paid,
+        "outstanding": int(outstanding[outstanding > 0].sum()),
+        "enrollments_with_dues": int((outstanding > 0).sum()),
+    }
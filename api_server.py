@@ -0,0 +1,539 @@
+"""Headless REST API over database.py, so several front desks can share one institute.db.
+
+Run it on the PC that holds the database. By default it only listens on
+this PC; to serve the other desks, listen on the network and require a
+token:
+
+    INSTITUTE_API_TOKEN=<secret> INSTITUTE_API_HOSTS=192.168.1.10 python api_server.py --host 0.0.0.0 --port 8000
+
+Every desk then reads and writes through this one process, which is the
+only writer: writes are serialized by a lock, and reads reuse pooled SQLite
+connections (see database.enable_connection_pool()).
+
+List endpoints take limit and offset and return
+{"results": [...], "offset": n, "limit": n, "next": url or null}.
+GET responses carry an ETag built from the change journal (the latest
+change to the tables the response is read from), so a client repeating a
+request with If-None-Match gets a 304 until one of those tables changes.
+
+    GET    /api/students?search=&limit=&offset=
+    POST   /api/students                  {name, phone, email, address}
+    DELETE /api/students/<id>
+    GET    /api/courses
+    POST   /api/courses                   {name, fee, duration}
+    DELETE /api/courses/<id>
+    GET    /api/enrollments?student=      enrollments with amount paid, by student id or name
+    POST   /api/enrollments               {student_id, course_name, date}; fee and duration come from the course
+    DELETE /api/enrollments?student_id=&course_name=
+    POST   /api/payments                  {enrollment_id, amount, date, mode}
+    GET    /api/payments/history?student=&course=&limit=&offset=
+    GET    /api/receipts/<receipt_no>
+    GET    /api/dues?from=&to=&limit=&offset=   unpaid installments due in a date range (either end optional)
+    GET    /api/changes?since=&limit=     change journal entries, for clients keeping caches current
+    GET    /api/diagnostics/cache         read cache hit/miss counts (see database.get_read_cache_stats())
+    POST   /api/batch                     {calls: [{op, args}]}, several database.py calls in one request
+                                          (see BATCH_OPERATIONS; used by data_source.HttpDataSource)
+
+Set INSTITUTE_API_TOKEN to require an "Authorization: Bearer <token>"
+header (the server refuses to listen beyond this PC without one), and
+INSTITUTE_API_HOSTS to a comma-separated list of host names the server
+may be reached by (default: localhost only).
+"""
+import os
+import sqlite3
+import secrets
+import argparse
+import ipaddress
+import threading
+from datetime import datetime
+
+from django.conf import settings
+
+settings.configure(
+    DEBUG=False,
+    SECRET_KEY=os.environ.get("INSTITUTE_API_SECRET_KEY") or secrets.token_hex(32),
+    # Add the LAN address desks use (e.g. 192.168.1.10) to INSTITUTE_API_HOSTS when serving the network
+    ALLOWED_HOSTS=[host.strip() for host in os.environ.get("INSTITUTE_API_HOSTS", "localhost,127.0.0.1,[::1]").split(",")
+                   if host.strip()],
+    ROOT_URLCONF=__name__,
+    INSTALLED_APPS=["rest_framework"],
+    MIDDLEWARE=[],
+    DATABASES={},
+    USE_TZ=False,
+    REST_FRAMEWORK={
+        "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+        "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+        "DEFAULT_AUTHENTICATION_CLASSES": [],
+        "DEFAULT_PERMISSION_CLASSES": [f"{__name__}.HasApiToken"],
+        "UNAUTHENTICATED_USER": None,
+    },
+)
+
+import django
+django.setup()
+
+from rest_framework.permissions import BasePermission
+
+
+# Defined before the other rest_framework imports, which load DEFAULT_PERMISSION_CLASSES
+class HasApiToken(BasePermission):
+    """Checks the Host header against ALLOWED_HOSTS, then requires the INSTITUTE_API_TOKEN bearer token if set"""
+    def has_permission(self, request, view):
+        # No middleware runs here, so nothing else validates the host; raises DisallowedHost (400)
+        request.get_host()
+        token = os.environ.get("INSTITUTE_API_TOKEN")
+        if not token:
+            return True
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        return secrets.compare_digest(header, f"Bearer {token}")
+
+
+from django.urls import path
+from django.views.decorators.http import etag
+from django.core.wsgi import get_wsgi_application
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import APIException, NotFound, ParseError
+from rest_framework.response import Response
+
+import database
+from database import (
+    initialize_db, enable_connection_pool, get_connection, get_changes_since, get_latest_change_seq,
+    get_students_page, get_all_students, add_student, delete_student,
+    get_courses, get_all_courses, add_course, delete_course, course_exists,
+    get_enrollments_by_student_identifier, get_student_enrollments, enroll_student, unenroll_student,
+    can_unenroll, get_enrollment, get_enrollment_id, get_course_by_name, get_student, get_student_enrollment_dates,
+    get_enrollment_balances, add_payment, add_payments, get_total_paid, get_payment_history, get_receipt,
+    get_fee_dues, get_overdue_fees, get_read_cache_stats, get_table_rows, get_rows_by_ids, update_rows,
+    PAYMENT_MODES, CAPTURED_TABLES
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+STUDENT_FIELDS = ("id", "student_id", "name", "phone", "email", "address")
+COURSE_FIELDS = ("id", "name", "fee", "duration")
+ENROLLMENT_FIELDS = ("id", "course_name", "course_fee", "paid")
+PAYMENT_FIELDS = ("payment_id", "receipt_no", "student_id", "name", "course_name", "amount", "date", "mode")
+DUE_FIELDS = ("enrollment_id", "student_id", "name", "course_name", "installment_no", "due_date", "owed")
+CHANGE_FIELDS = ("seq", "table_name", "row_id", "op")
+
+# One writer for the whole office: write calls run one at a time
+write_lock = threading.Lock()
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Request conflicts with the current data"
+
+
+def as_dicts(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def int_param(request, name, default, minimum=0, maximum=None):
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ParseError(f"{name} must be an integer")
+    if number < minimum:
+        raise ParseError(f"{name} must be at least {minimum}")
+    return min(number, maximum) if maximum is not None else number
+
+
+def page_params(request):
+    return (int_param(request, "limit", DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE),
+            int_param(request, "offset", 0))
+
+
+def paginated(request, fields, fetch):
+    """Page of fetch(limit, offset) rows; one extra row is fetched to tell whether a next page exists"""
+    limit, offset = page_params(request)
+    rows = fetch(limit + 1, offset)
+    next_url = None
+    if len(rows) > limit:
+        query = request.query_params.copy()
+        query["offset"] = offset + limit
+        query["limit"] = limit
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    return Response({"results": as_dicts(fields, rows[:limit]), "offset": offset, "limit": limit, "next": next_url})
+
+
+def require(data, *names):
+    missing = [name for name in names if data.get(name) in (None, "")]
+    if missing:
+        raise ParseError(f"Missing fields: {', '.join(missing)}")
+    return [data[name] for name in names]
+
+
+def journal_etag(*tables):
+    """ETag function for responses read from tables: changes when any of them (or the whole database) changes"""
+    def make_etag(request, *args, **kwargs):
+        conn = get_connection()
+        try:
+            # Each lookup is a single seek on idx_change_log_table; '' holds restore markers
+            seqs = [conn.execute("SELECT MAX(seq) FROM change_log WHERE table_name = ?", (table,)).fetchone()[0] or 0
+                    for table in tables + ("",)]
+        finally:
+            conn.close()
+        return "-".join(str(seq) for seq in seqs)
+    return make_etag
+
+
+@api_view(["GET", "POST"])
+@etag(journal_etag("students"))
+def students(request):
+    if request.method == "POST":
+        with write_lock:
+            student_id = checked_add_student(request.data.get("name"), request.data.get("phone"),
+                                             request.data.get("email", ""), request.data.get("address", ""))
+        return Response({"student_id": student_id}, status=status.HTTP_201_CREATED)
+    search = request.query_params.get("search", "").strip()
+    return paginated(request, STUDENT_FIELDS, lambda limit, offset: get_students_page(search, limit, offset))
+
+
+@api_view(["DELETE"])
+def student_detail(request, student_id):
+    with write_lock:
+        delete_student(student_id)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET", "POST"])
+@etag(journal_etag("courses"))
+def courses(request):
+    if request.method == "POST":
+        name, fee, duration = require(request.data, "name", "fee", "duration")
+        with write_lock:
+            checked_add_course(name, fee, duration, request.data.get("installments"))
+        return Response(status=status.HTTP_201_CREATED)
+    return paginated(request, COURSE_FIELDS, get_courses)
+
+
+@api_view(["DELETE"])
+def course_detail(request, course_id):
+    with write_lock:
+        delete_course(course_id)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET", "POST", "DELETE"])
+@etag(journal_etag("enrollments", "payments"))
+def enrollments(request):
+    if request.method == "POST":
+        student_id, course_name = require(request.data, "student_id", "course_name")
+        with write_lock:
+            checked_enroll_student(student_id, request.data.get("student_name"), course_name,
+                                   date=request.data.get("date"))
+        return Response(status=status.HTTP_201_CREATED)
+    if request.method == "DELETE":
+        student_id, course_name = require(request.query_params, "student_id", "course_name")
+        with write_lock:
+            if not unenroll_student(student_id, course_name):
+                return Response({"detail": "Enrollment not found or has payments"}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    student = require(request.query_params, "student")[0].strip()
+    return paginated(request, ENROLLMENT_FIELDS,
+                     lambda limit, offset: get_enrollments_by_student_identifier(student, limit, offset))
+
+
+def checked_add_student(name, phone, email="", address=""):
+    """add_student() that requires a name and phone; call with write_lock held"""
+    name, phone = require({"name": name, "phone": phone}, "name", "phone")
+    return add_student(name, phone, email or "", address or "")
+
+
+def positive_int(name, value, maximum):
+    """value as an int from 1 to maximum, else a 400"""
+    if not str(value).strip().isdigit() or not 0 < int(value) <= maximum:
+        raise ParseError(f"{name} must be a whole number from 1 to {maximum:,}")
+    return int(value)
+
+
+def checked_add_course(name, fee, duration, installments=None):
+    """add_course() with the Course Manager's limits on fee and duration; call with write_lock held"""
+    name = str(name).strip()
+    if not name:
+        raise ParseError("name must not be empty")
+    fee, duration = positive_int("fee", fee, 1000000), positive_int("duration", duration, 60)
+    if installments is not None:
+        installments = positive_int("installments", installments, 60)
+    if course_exists(name):
+        raise Conflict(f"Course '{name}' already exists")
+    add_course(name, fee, duration, installments)
+
+
+def checked_enroll_student(student_id, student_name, course_name, fee=None, duration=None, date=None):
+    """enroll_student() for an existing student and course; call with write_lock held.
+
+    Fee and duration come from the course, whatever the client sent, and
+    enrolling twice in the same course is refused as the Enroll window does.
+    """
+    student = get_student(student_id)
+    if student is None:
+        raise NotFound("Student not found")
+    course = get_course_by_name(str(course_name).strip())
+    if course is None:
+        raise NotFound(f"Course '{course_name}' not found")
+    course_id, course_name, fee, duration = course
+    if get_enrollment_id(student[0], course_name) is not None:
+        raise Conflict(f"{student[2]} is already enrolled in {course_name}")
+    enroll_student(student[0], student[2], course_name, fee, duration, date or datetime.now().strftime("%Y-%m-%d"))
+
+
+def checked_add_payment(enrollment_id, amount, date=None, mode=None):
+    """add_payment() that refuses unknown enrollments and overpayments; call with write_lock held"""
+    try:
+        enrollment_id, amount = int(enrollment_id), int(amount)
+    except (TypeError, ValueError):
+        raise ParseError("enrollment_id and amount must be integers")
+    if amount <= 0:
+        raise ParseError("amount must be greater than 0")
+    # Checked under the lock, so two desks cannot both take the last of a balance
+    enrollment = get_enrollment(enrollment_id)
+    if enrollment is None:
+        raise NotFound("Enrollment not found")
+    fee, paid = enrollment[4] or 0, enrollment[5]
+    if paid + amount > fee:
+        raise Conflict(f"Cannot pay more than total fee (pending ₹{fee - paid})")
+    if mode is not None and mode not in PAYMENT_MODES:
+        raise ParseError(f"mode must be one of {', '.join(PAYMENT_MODES)}")
+    return add_payment(enrollment_id, amount, date or datetime.now().strftime("%Y-%m-%d"), mode)
+
+
+def checked_add_payments(payments):
+    """add_payments() for [enrollment_id, amount, date, mode] lists from JSON; call with write_lock held"""
+    if not isinstance(payments, list):
+        raise ParseError("payments must be a list")
+    today = datetime.now().strftime("%Y-%m-%d")
+    checked = []
+    for payment in payments:
+        try:
+            enrollment_id, amount, date, mode = payment
+            enrollment_id, amount = int(enrollment_id), int(amount)
+        except (TypeError, ValueError):
+            raise ParseError("each payment must be [enrollment_id, amount, date, mode]")
+        if amount <= 0:
+            raise ParseError("amount must be greater than 0")
+        if mode is not None and mode not in PAYMENT_MODES:
+            raise ParseError(f"mode must be one of {', '.join(PAYMENT_MODES)}")
+        checked.append((enrollment_id, amount, date or today, mode))
+    try:
+        return add_payments(checked)
+    except ValueError as e:
+        # Balances changed since the desk checked them; nothing was recorded
+        raise Conflict(str(e))
+
+
+def checked_columns(table, columns):
+    """table and columns as tuples of known names, id first; the SQL is built from them"""
+    if table not in CAPTURED_TABLES:
+        raise ParseError(f"Unknown table: {table!r}")
+    if not isinstance(columns, list) or not columns or columns[0] != "id" \
+            or not set(columns) <= set(CAPTURED_TABLES[table]):
+        raise ParseError(f"columns must be id followed by columns of {table}")
+    return table, tuple(columns)
+
+
+def checked_get_table_rows(table, columns):
+    return get_table_rows(*checked_columns(table, columns))
+
+
+def checked_get_rows_by_ids(table, columns, ids):
+    table, columns = checked_columns(table, columns)
+    try:
+        ids = [int(row_id) for row_id in ids]
+    except (TypeError, ValueError):
+        raise ParseError("ids must be a list of row ids")
+    return get_rows_by_ids(table, columns, ids)
+
+
+def checked_update_rows(table, edits):
+    """update_rows() from the Student and Course Managers with their checks; call with write_lock held"""
+    if table not in ("students", "courses"):
+        raise ParseError(f"Rows of {table!r} cannot be edited")
+    if not isinstance(edits, dict) or not all(isinstance(values, dict) for values in edits.values()):
+        raise ParseError("edits must be {row id: {column: value}}")
+    try:
+        edits = {int(row_id): dict(values) for row_id, values in edits.items()}
+    except ValueError:
+        raise ParseError("edits must be {row id: {column: value}}")
+    for row_id, values in edits.items():
+        if table == "students":
+            for name in ("name", "phone"):
+                if name in values and not str(values[name]).strip():
+                    raise ParseError(f"{name} must not be empty")
+            continue
+        if "fee" in values:
+            values["fee"] = positive_int("fee", values["fee"], 1000000)
+        if "duration" in values:
+            values["duration"] = positive_int("duration", values["duration"], 60)
+        if "name" in values:
+            values["name"] = str(values["name"]).strip()
+            if not values["name"]:
+                raise ParseError("name must not be empty")
+            course = get_course_by_name(values["name"])
+            if course is not None and course[0] != row_id:
+                raise Conflict(f"Course '{values['name']}' already exists")
+    update_rows(table, edits)
+
+
+@api_view(["POST"])
+def payments(request):
+    enrollment_id, amount = require(request.data, "enrollment_id", "amount")
+    with write_lock:
+        receipt_no = checked_add_payment(enrollment_id, amount, request.data.get("date"), request.data.get("mode"))
+    return Response({"receipt_no": receipt_no}, status=status.HTTP_201_CREATED)
+
+
+@api_view(["GET"])
+@etag(journal_etag("students", "enrollments", "payments"))
+def payment_history(request):
+    student = require(request.query_params, "student")[0].strip()
+    course = request.query_params.get("course", "").strip() or None
+    return paginated(request, PAYMENT_FIELDS,
+                     lambda limit, offset: get_payment_history(student, course, limit, offset))
+
+
+@api_view(["GET"])
+@etag(journal_etag("students", "enrollments", "payments"))
+def receipt(request, receipt_no):
+    row = get_receipt(receipt_no)
+    if row is None:
+        raise NotFound("Receipt not found")
+    return Response(dict(zip(PAYMENT_FIELDS, row)))
+
+
+@api_view(["GET"])
+@etag(journal_etag("students", "enrollments", "payments", "installment_plans"))
+def dues(request):
+    start, end = request.query_params.get("from") or None, request.query_params.get("to") or None
+    return paginated(request, DUE_FIELDS, lambda limit, offset: get_fee_dues(start, end, limit, offset))
+
+
+@api_view(["GET"])
+def changes(request):
+    since = int_param(request, "since", 0)
+    limit = int_param(request, "limit", MAX_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    return Response({"results": as_dicts(CHANGE_FIELDS, get_changes_since(since, limit=limit))})
+
+
+@api_view(["GET"])
+def cache_stats(request):
+    return Response(get_read_cache_stats())
+
+
+# Operations accepted by /api/batch: name -> (function, whether it writes)
+BATCH_OPERATIONS = {
+    "get_all_students": (get_all_students, False),
+    "get_courses": (get_courses, False),
+    "get_table_rows": (checked_get_table_rows, False),
+    "get_rows_by_ids": (checked_get_rows_by_ids, False),
+    "get_student_enrollment_dates": (get_student_enrollment_dates, False),
+    "get_all_courses": (get_all_courses, False),
+    "get_student_enrollments": (get_student_enrollments, False),
+    "get_enrollments_by_student_identifier": (get_enrollments_by_student_identifier, False),
+    "get_enrollment": (get_enrollment, False),
+    "get_total_paid": (get_total_paid, False),
+    "get_payment_history": (get_payment_history, False),
+    "get_receipt": (get_receipt, False),
+    "get_enrollment_balances": (get_enrollment_balances, False),
+    "get_fee_dues": (get_fee_dues, False),
+    "get_overdue_fees": (get_overdue_fees, False),
+    "course_exists": (course_exists, False),
+    "can_unenroll": (can_unenroll, False),
+    "get_changes_since": (get_changes_since, False),
+    "get_latest_change_seq": (lambda: get_latest_change_seq(), False),
+    "add_student": (checked_add_student, True),
+    "delete_student": (delete_student, True),
+    "add_course": (checked_add_course, True),
+    "delete_course": (delete_course, True),
+    "update_rows": (checked_update_rows, True),
+    "enroll_student": (checked_enroll_student, True),
+    "unenroll_student": (unenroll_student, True),
+    "add_payment": (checked_add_payment, True),
+    "add_payments": (checked_add_payments, True),
+}
+
+
+def run_batch_call(call):
+    try:
+        function, writes = BATCH_OPERATIONS[call["op"]]
+    except (TypeError, KeyError):
+        return {"error": f"Unknown operation: {call!r}", "status": status.HTTP_400_BAD_REQUEST}
+    args = call.get("args") or []
+    try:
+        if writes:
+            with write_lock:
+                result = function(*args)
+        else:
+            result = function(*args)
+    except APIException as e:
+        return {"error": str(e.detail), "status": e.status_code}
+    except (TypeError, ValueError) as e:
+        return {"error": str(e), "status": status.HTTP_400_BAD_REQUEST}
+    except sqlite3.Error as e:
+        return {"error": f"Database error: {e}", "status": status.HTTP_500_INTERNAL_SERVER_ERROR}
+    return {"result": result}
+
+
+@api_view(["POST"])
+def batch(request):
+    """Run several database.py calls in one round trip; results come back in order, one per call"""
+    calls = request.data.get("calls")
+    if not isinstance(calls, list):
+        raise ParseError("calls must be a list")
+    return Response({"results": [run_batch_call(call) for call in calls]})
+
+
+urlpatterns = [
+    path("api/students", students),
+    path("api/students/<int:student_id>", student_detail),
+    path("api/courses", courses),
+    path("api/courses/<int:course_id>", course_detail),
+    path("api/enrollments", enrollments),
+    path("api/payments", payments),
+    path("api/payments/history", payment_history),
+    path("api/receipts/<str:receipt_no>", receipt),
+    path("api/dues", dues),
+    path("api/changes", changes),
+    path("api/diagnostics/cache", cache_stats),
+    path("api/batch", batch),
+]
+
+application = get_wsgi_application()
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def main():
+    from django.core.servers.basehttp import run
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: this PC only)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pool-size", type=int, default=8, help="idle SQLite connections kept open")
+    args = parser.parse_args()
+    if not is_loopback(args.host) and not os.environ.get("INSTITUTE_API_TOKEN"):
+        # Every student, payment and fee record would be open to anyone on the network
+        raise SystemExit(f"Refusing to listen on {args.host} without INSTITUTE_API_TOKEN; "
+                         "set a token or use --host 127.0.0.1")
+
+    initialize_db()
+    enable_connection_pool(args.pool_size)
+    print(f"Serving {os.path.abspath(database.DB_NAME)} on http://{args.host}:{args.port}/api/")
+    run(args.host, args.port, application, threading=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,57 @@
 import sys
+import time
+
+# Startup milestones, reported with --startup-timing
+startup_marks = [("app.py started", time.perf_counter())]
+
+def mark_startup(label):
+    startup_marks.append((label, time.perf_counter()))
+
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QEvent, QTimer
 from PyQt5.QtGui import QFont, QPalette, QColor
+mark_startup("import PyQt5")
 from database import initialize_db
-from course_manager import open_course_manager,open_enroll_window,open_payment_window,open_payment_history  # Assume this will be converted too
-from course_manager import open_student_manager
-from settings_manager import open_settings_window
+from theme import apply_theme
+mark_startup("import database")
+# Window modules (and the backup modules behind Settings) are imported when first opened
+from window_manager import (
+    window_manager, open_course_manager, open_student_manager, open_enroll_window,
+    open_payment_window, open_payment_history, open_dashboard, open_settings_window
+)
+mark_startup("import window_manager")
+
+
+class FirstPaintWatcher(QObject):
+    """Calls on_first_paint once the watched window has painted for the first time"""
+    def __init__(self, on_first_paint):
+        super().__init__()
+        self.on_first_paint = on_first_paint
 
-# Initialize DB on app startup
-initialize_db()
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            # Let the paint finish before running anything slow
+            QTimer.singleShot(0, self.on_first_paint)
+        return False
+
+
+def print_startup_report():
+    start = startup_marks[0][1]
+    previous = start
+    print("Startup timing (ms since app.py started):")
+    for label, moment in startup_marks[1:]:
+        print(f"  {label:<28} {(moment - start) * 1000:8.1f}  (+{(moment - previous) * 1000:.1f})")
+        previous = moment
 
 class InstituteApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Institute Management System")
         self.setGeometry(100, 100, 500, 600)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QLabel#title {
-                background-color: #2c3e50;
-                color: white;
-                padding: 20px;
-                border-radius: 10px;
-                font-size: 20px;
-                font-weight: bold;
-                margin: 10px;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 15px;
-                border-radius: 8px;
-                font-size: 14px;
-                font-weight: bold;
-                margin: 8px;
-                min-height: 50px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-                transform: translateY(-2px);
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-            }
-        """)
+        self.setObjectName("mainMenu")
 
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -62,13 +64,7 @@ class InstituteApp(QWidget):
         layout.addWidget(title)
 
         subtitle = QLabel("Management System")
-        subtitle.setStyleSheet("""
-            color: #34495e;
-            font-size: 16px;
-            font-weight: 500;
-            margin: 10px;
-            text-align: center;
-        """)
+        subtitle.setObjectName("subtitle")
         subtitle.setAlignment(Qt.AlignCenter)
         layout.addWidget(subtitle)
 
@@ -96,6 +92,10 @@ class InstituteApp(QWidget):
         btn_history.clicked.connect(open_payment_history)
         layout.addWidget(btn_history)
 
+        btn_dashboard = QPushButton("📈 Fee Dashboard")
+        btn_dashboard.clicked.connect(open_dashboard)
+        layout.addWidget(btn_dashboard)
+
         btn_settings = QPushButton("Settings")
         btn_settings.clicked.connect(open_settings_window)
         layout.addWidget(btn_settings)
@@ -105,14 +105,37 @@ class InstituteApp(QWidget):
 
         self.setLayout(layout)
 
+def after_first_paint():
+    mark_startup("first paint")
+    # Background backups (no-op unless enabled in Settings); the backup modules load when one is due
+    from backup_scheduler import start_backup_scheduler
+    start_backup_scheduler()
+    mark_startup("backup scheduler started")
+    if "--startup-timing" in sys.argv:
+        print_startup_report()
+
 # Main launcher
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    mark_startup("QApplication created")
     
     # Set application-wide font
     font = QFont("Segoe UI", 9)
     app.setFont(font)
+    # One style sheet for every window, parsed once
+    apply_theme(app)
+    
+    # Create or upgrade the schema before any window can touch the database
+    initialize_db()
+    mark_startup("initialize_db")
     
     window = InstituteApp()
+    mark_startup("main menu built")
+    first_paint_watcher = FirstPaintWatcher(after_first_paint)
+    window.installEventFilter(first_paint_watcher)
     window.show()
+    
+    # Window build/open times and memory, printed on exit
+    if "--window-stats" in sys.argv:
+        app.aboutToQuit.connect(lambda: print("\n".join(window_manager.report())))
     sys.exit(app.exec_())
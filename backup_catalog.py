@@ -0,0 +1,197 @@
+import json
+import sqlite3
+from datetime import datetime
+
+# Kept outside institute.db so restoring a backup never rewinds the backup history
+CATALOG_DB = "backup_catalog.db"
+CATALOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Copy of a destination's catalog entries stored alongside its backups, so a
+# fresh install can rebuild the catalog without listing the whole destination
+CATALOG_INDEX_NAME = "backup_catalog.json"
+
+BACKUP_FILE_COLUMNS = ("destination", "name", "backup_mode", "created_at", "size",
+                       "sha256", "schema_version", "row_counts")
+
+
+def get_catalog_connection():
+    return sqlite3.connect(CATALOG_DB)
+
+
+def initialize_catalog():
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS backup_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            trigger TEXT NOT NULL,      -- 'manual', 'scheduled', 'cli' or 'continuous'
+            status TEXT NOT NULL,       -- 'success', 'failed' or 'skipped'
+            db_sha256 TEXT,
+            summary TEXT
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_backup_history_status ON backup_history(status, started_at)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS backup_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destination TEXT NOT NULL,  -- 'local' or 'dropbox'
+            name TEXT NOT NULL,         -- backup file or chunk-store revision name
+            backup_mode TEXT NOT NULL,  -- 'full' or 'incremental'
+            created_at TEXT NOT NULL,
+            size INTEGER,
+            sha256 TEXT,
+            schema_version INTEGER,
+            row_counts TEXT,            -- JSON object of table -> row count
+            UNIQUE(destination, name)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_backup_files_created ON backup_files(destination, backup_mode, created_at)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS log_shipping (
+            destination TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,  -- highest change_log seq uploaded to the destination
+            shipped_at TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def record_backup(started_at, trigger, status, db_sha256=None, summary=""):
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO backup_history (started_at, finished_at, trigger, status, db_sha256, summary)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (started_at, datetime.now().strftime(CATALOG_TIME_FORMAT), trigger, status, db_sha256, summary))
+    conn.commit()
+    conn.close()
+
+
+def get_last_backup_sha256():
+    """SHA-256 of the database captured by the most recent successful backup"""
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT db_sha256 FROM backup_history
+        WHERE status = 'success'
+        ORDER BY started_at DESC, id DESC LIMIT 1
+    """)
+    row = c.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def get_backup_history(limit=50):
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT id, started_at, finished_at, trigger, status, summary
+        FROM backup_history
+        ORDER BY started_at DESC, id DESC LIMIT ?
+    """, (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+def _backup_file_from_row(row):
+    entry = dict(zip(BACKUP_FILE_COLUMNS, row))
+    entry["row_counts"] = json.loads(entry["row_counts"]) if entry["row_counts"] else {}
+    return entry
+
+
+def add_backup_file(destination, name, backup_mode, created_at, size=None, manifest=None):
+    """Catalog a backup stored at a destination; manifest supplies hash, schema version and row counts"""
+    manifest = manifest or {}
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("""
+        INSERT OR REPLACE INTO backup_files
+        (destination, name, backup_mode, created_at, size, sha256, schema_version, row_counts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (destination, name, backup_mode, created_at, size, manifest.get("sha256"),
+          manifest.get("schema_version"), json.dumps(manifest.get("row_counts") or {})))
+    conn.commit()
+    conn.close()
+
+
+def get_backup_files(destination=None, backup_mode=None, limit=None):
+    """Cataloged backups, newest first, as dicts"""
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    query = f"SELECT {', '.join(BACKUP_FILE_COLUMNS)} FROM backup_files WHERE 1 = 1"
+    params = []
+    if destination:
+        query += " AND destination = ?"
+        params.append(destination)
+    if backup_mode:
+        query += " AND backup_mode = ?"
+        params.append(backup_mode)
+    query += " ORDER BY created_at DESC, id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    c.execute(query, params)
+    rows = c.fetchall()
+    conn.close()
+    return [_backup_file_from_row(row) for row in rows]
+
+
+def get_expired_backup_files(destination, backup_mode, keep):
+    """Names of the backups beyond the newest `keep` for one destination and mode"""
+    return [entry["name"] for entry in get_backup_files(destination, backup_mode)[keep:]]
+
+
+def remove_backup_files(destination, names):
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.executemany("DELETE FROM backup_files WHERE destination = ? AND name = ?",
+                  [(destination, name) for name in names])
+    conn.commit()
+    conn.close()
+
+
+def export_destination_index(destination):
+    """JSON index of a destination's cataloged backups, mirrored next to the backups themselves"""
+    entries = get_backup_files(destination)
+    for entry in entries:
+        del entry["destination"]
+    return json.dumps({"backups": entries}, indent=2).encode("utf-8")
+
+
+def import_destination_index(destination, data):
+    """Load a mirrored index into the catalog; returns the number of entries imported"""
+    entries = json.loads(data.decode("utf-8")).get("backups", [])
+    for entry in entries:
+        add_backup_file(destination, entry["name"], entry.get("backup_mode", "full"), entry["created_at"],
+                        entry.get("size"), entry)
+    return len(entries)
+
+
+def get_shipped_seq(destination):
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("SELECT last_seq FROM log_shipping WHERE destination = ?", (destination,))
+    row = c.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+def set_shipped_seq(destination, last_seq):
+    initialize_catalog()
+    conn = get_catalog_connection()
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO log_shipping (destination, last_seq, shipped_at) VALUES (?, ?, ?)",
+              (destination, last_seq, datetime.now().strftime(CATALOG_TIME_FORMAT)))
+    conn.commit()
+    conn.close()
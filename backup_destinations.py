@@ -0,0 +1,228 @@
+import os
+
+from backup_engine import (
+    DROPBOX_FOLDER, STREAM_CHUNK_SIZE, upload_bytes_to_dropbox, upload_file_to_dropbox,
+    download_dropbox_file, list_dropbox_folder, remove_file_quietly
+)
+from fake_dropbox import FakeDropbox
+
+
+class BackupDestinationError(Exception):
+    """Raised when a destination cannot be used (missing config, bad credentials, no space...)"""
+    pass
+
+
+def _copy_stream(src, dst, total, progress=None):
+    """Copy between open files in fixed-size blocks, reporting bytes copied"""
+    copied = 0
+    while True:
+        block = src.read(STREAM_CHUNK_SIZE)
+        if not block:
+            break
+        dst.write(block)
+        copied += len(block)
+        if progress:
+            progress(copied, total or copied)
+
+
+class BackupDestination:
+    """Storage that backups are written to and restored from.
+
+    Names are relative to the destination root and may include one folder
+    ("chunks/<sha256>.gz"). put_file/get_file stream whole backups in
+    fixed-size blocks; put_bytes/get_bytes are for small objects such as
+    indexes and chunk-store entries. Missing objects raise FileNotFoundError
+    on every implementation, and delete ignores them.
+    """
+    key = None    # 'local' or 'dropbox', used in the backup catalog
+    label = None  # shown in status messages
+
+    def prepare(self, required_space=0):
+        """Check the destination is usable and create its root folder"""
+        pass
+
+    def put_file(self, name, local_path, progress=None):
+        raise NotImplementedError
+
+    def get_file(self, name, local_path, progress=None):
+        raise NotImplementedError
+
+    def put_bytes(self, name, data):
+        raise NotImplementedError
+
+    def get_bytes(self, name):
+        raise NotImplementedError
+
+    def list(self, folder=""):
+        """Names of the files directly inside folder; empty if it does not exist"""
+        raise NotImplementedError
+
+    def delete(self, name):
+        raise NotImplementedError
+
+    def local_path(self, name):
+        """Filesystem path of name if it can be read in place, otherwise None"""
+        return None
+
+
+class LocalDestination(BackupDestination):
+    """Backups stored in a directory on a local or mounted drive"""
+    key = "local"
+    label = "Local"
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def _path(self, name):
+        return os.path.join(self.root_dir, *name.split("/"))
+
+    def prepare(self, required_space=0):
+        try:
+            os.makedirs(self.root_dir, exist_ok=True)
+        except PermissionError:
+            raise BackupDestinationError(f"Permission denied: Cannot create directory '{self.root_dir}'")
+        except OSError as e:
+            raise BackupDestinationError(f"Cannot access directory '{self.root_dir}': {str(e)}")
+
+        try:
+            statvfs = os.statvfs(self.root_dir)
+            free_space = statvfs.f_frsize * statvfs.f_bavail
+        except (AttributeError, OSError):
+            return  # Skip disk space check if not available
+        if free_space < required_space:
+            raise BackupDestinationError(f"Insufficient disk space. Available: {free_space//1024//1024}MB, "
+                                         f"Required: {required_space//1024//1024}MB")
+
+    def _write_atomically(self, name, write):
+        # Write under a temporary name so a crash never leaves a truncated file behind
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = path + ".partial"
+        try:
+            with open(partial_path, "wb") as f:
+                write(f)
+            os.replace(partial_path, path)
+        except Exception:
+            remove_file_quietly(partial_path)
+            raise
+
+    def put_file(self, name, local_path, progress=None):
+        total = os.path.getsize(local_path)
+        with open(local_path, "rb") as src:
+            self._write_atomically(name, lambda dst: _copy_stream(src, dst, total, progress))
+
+    def get_file(self, name, local_path, progress=None):
+        path = self._path(name)
+        total = os.path.getsize(path)
+        with open(path, "rb") as src, open(local_path, "wb") as dst:
+            _copy_stream(src, dst, total, progress)
+
+    def put_bytes(self, name, data):
+        self._write_atomically(name, lambda f: f.write(data))
+
+    def get_bytes(self, name):
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def list(self, folder=""):
+        path = self._path(folder) if folder else self.root_dir
+        if not os.path.isdir(path):
+            return []
+        return [name for name in os.listdir(path)
+                if not name.endswith(".partial") and os.path.isfile(os.path.join(path, name))]
+
+    def delete(self, name):
+        remove_file_quietly(self._path(name))
+
+    def local_path(self, name):
+        return self._path(name)
+
+
+class DropboxDestination(BackupDestination):
+    """Backups stored in a Dropbox folder through an SDK client (or a FakeDropbox)"""
+    key = "dropbox"
+    label = "Dropbox"
+
+    def __init__(self, dbx, root_folder=DROPBOX_FOLDER):
+        self.dbx = dbx
+        self.root_folder = root_folder
+
+    def _path(self, name):
+        return f"{self.root_folder}/{name}"
+
+    def _raise_if_missing(self, e):
+        if "not_found" in str(e).lower():
+            raise FileNotFoundError(str(e))
+
+    def prepare(self, required_space=0):
+        # Test connection and permissions first
+        try:
+            self.dbx.files_list_folder("")
+        except Exception as e:
+            if type(e).__name__ == "AuthError":
+                raise BackupDestinationError(f"Invalid Dropbox token. Please check your token and try again.\n\nError details: {str(e)}")
+            if "scope" in str(e).lower() or "permitted" in str(e).lower():
+                raise BackupDestinationError(f"Missing Dropbox permissions. Please enable these scopes in your Dropbox app:\n\n- files.content.write\n- files.metadata.write\n- files.content.read\n- files.metadata.read\n\nThen generate a new token.\n\nError details: {str(e)}")
+            raise BackupDestinationError(f"Failed to connect to Dropbox: {str(e)}")
+
+        # Create backup folder if it doesn't exist
+        try:
+            self.dbx.files_create_folder(self.root_folder)
+        except Exception as e:
+            if "conflict" not in str(e).lower():
+                raise BackupDestinationError(f"Failed to create backup folder: {str(e)}")
+            # Folder already exists, which is fine
+
+    def put_file(self, name, local_path, progress=None):
+        # Upload in fixed-size chunks so memory use stays bounded
+        upload_file_to_dropbox(self.dbx, local_path, self._path(name), progress=progress)
+
+    def get_file(self, name, local_path, progress=None):
+        try:
+            download_dropbox_file(self.dbx, self._path(name), local_path, progress=progress)
+        except Exception as e:
+            self._raise_if_missing(e)
+            raise
+
+    def put_bytes(self, name, data):
+        upload_bytes_to_dropbox(self.dbx, data, self._path(name))
+
+    def get_bytes(self, name):
+        try:
+            metadata, response = self.dbx.files_download(self._path(name))
+        except Exception as e:
+            self._raise_if_missing(e)
+            raise
+        try:
+            return response.content
+        finally:
+            response.close()
+
+    def list(self, folder=""):
+        try:
+            entries = list_dropbox_folder(self.dbx, self._path(folder) if folder else self.root_folder)
+        except Exception as e:
+            if "not_found" in str(e).lower():
+                return []
+            raise
+        return [entry.name for entry in entries]
+
+    def delete(self, name):
+        try:
+            self.dbx.files_delete(self._path(name))
+        except Exception as e:
+            if "not_found" not in str(e).lower():
+                raise
+
+
+class FakeDropboxDestination(DropboxDestination):
+    """Dropbox destination backed by a FakeDropbox on local disk.
+
+    Keeps Dropbox semantics (upload sessions, paginated listings, API
+    errors) and can add per-request latency and a bandwidth cap, so the
+    backup pipeline can be tested and benchmarked without a network.
+    """
+    label = "Dropbox (simulated)"
+
+    def __init__(self, root_dir, latency=0.0, bandwidth=None, list_page_size=1000, root_folder=DROPBOX_FOLDER):
+        super().__init__(FakeDropbox(root_dir, list_page_size, latency=latency, bandwidth=bandwidth), root_folder)
@@ -0,0 +1,523 @@
+import os
+import gzip
+import lzma
+import json
+import shutil
+import struct
+import hashlib
+import sqlite3
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+from database import DB_NAME, SCHEMA_VERSION, get_schema_version, get_table_row_counts
+
+# Dropbox imports (optional - a fake client can be passed in for offline use)
+try:
+    import dropbox
+    DROPBOX_AVAILABLE = True
+except ImportError:
+    DROPBOX_AVAILABLE = False
+
+# zstandard is optional; offered as a compression choice only when installed
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DROPBOX_FOLDER = "/InstituteBackups"
+
+BACKUP_PREFIX = "institute_backup_"
+BACKUP_EXTENSION = ".ibak"
+LEGACY_BACKUP_EXTENSION = ".db"
+BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Container layout: magic line, 4-byte big-endian manifest length, manifest JSON, compressed database
+CONTAINER_MAGIC = b"IMSBACKUP1\n"
+CONTAINER_FORMAT_VERSION = 1
+DEFAULT_COMPRESSION = "gzip"
+
+# Read/write buffer for streaming compression, hashing and downloads
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Tables a backup must contain before it may replace the live database
+REQUIRED_TABLES = ("courses", "students", "enrollments", "payments")
+
+# Size of each upload session request; also the peak amount of backup data held in memory
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of database pages copied per step of the SQLite backup API
+SNAPSHOT_PAGES_PER_STEP = 256
+
+
+# Errors raised by the codecs when a payload is truncated or corrupted
+DECOMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError) + ((zstandard.ZstdError,) if ZSTD_AVAILABLE else ())
+
+
+class BackupIntegrityError(Exception):
+    """Raised when a backup container is malformed or fails hash verification"""
+    pass
+
+
+def available_compressions():
+    """Compression codecs usable on this machine, in preference order for the settings UI"""
+    codecs = ["gzip", "xz"]
+    if ZSTD_AVAILABLE:
+        codecs.append("zstd")
+    codecs.append("none")
+    return codecs
+
+
+def make_backup_filename(timestamp):
+    return f"{BACKUP_PREFIX}{timestamp}{BACKUP_EXTENSION}"
+
+
+def is_backup_filename(filename):
+    """True for both container backups and legacy raw .db copies"""
+    return filename.startswith(BACKUP_PREFIX) and (
+        filename.endswith(BACKUP_EXTENSION) or filename.endswith(LEGACY_BACKUP_EXTENSION)
+    )
+
+
+def parse_backup_timestamp(filename):
+    """Return the datetime encoded in a backup filename, or None if it has none"""
+    stem = os.path.splitext(filename)[0].replace(BACKUP_PREFIX, "", 1)
+    try:
+        return datetime.strptime(stem, BACKUP_TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def remove_file_quietly(path):
+    """Delete a file, ignoring errors if it is already gone"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def create_snapshot(source_db_path=DB_NAME, progress=None):
+    """Copy the database into a private temp file and return its path.
+
+    Uses SQLite's backup API so the snapshot is consistent even while other
+    connections are writing. The caller owns the returned file and must
+    delete it when done.
+    """
+    if not os.path.exists(source_db_path):
+        raise FileNotFoundError(f"Database file '{source_db_path}' not found")
+
+    # mkstemp creates the file atomically with owner-only permissions
+    fd, snapshot_path = tempfile.mkstemp(prefix="institute_snapshot_", suffix=".db")
+    os.close(fd)
+
+    def progress_callback(status, remaining, total):
+        if progress and total:
+            progress(total - remaining, total)
+
+    try:
+        source_conn = sqlite3.connect(source_db_path)
+        try:
+            snapshot_conn = sqlite3.connect(snapshot_path)
+            try:
+                source_conn.backup(snapshot_conn, pages=SNAPSHOT_PAGES_PER_STEP, progress=progress_callback)
+            finally:
+                snapshot_conn.close()
+        finally:
+            source_conn.close()
+    except Exception:
+        remove_file_quietly(snapshot_path)
+        raise
+
+    return snapshot_path
+
+
+def _overwrite_mode():
+    if DROPBOX_AVAILABLE:
+        return dropbox.files.WriteMode.overwrite
+    return "overwrite"
+
+
+def _session_cursor(session_id, offset):
+    if DROPBOX_AVAILABLE:
+        return dropbox.files.UploadSessionCursor(session_id=session_id, offset=offset)
+    return SimpleNamespace(session_id=session_id, offset=offset)
+
+
+def _commit_info(remote_path):
+    if DROPBOX_AVAILABLE:
+        return dropbox.files.CommitInfo(path=remote_path, mode=_overwrite_mode())
+    return SimpleNamespace(path=remote_path, mode=_overwrite_mode())
+
+
+def upload_bytes_to_dropbox(dbx, data, remote_path):
+    """Upload a small in-memory payload (chunks, indexes) in a single request"""
+    return dbx.files_upload(data, remote_path, mode=_overwrite_mode())
+
+
+def upload_file_to_dropbox(dbx, local_path, remote_path, chunk_size=UPLOAD_CHUNK_SIZE, progress=None):
+    """Upload a local file to Dropbox without reading it all into memory.
+
+    Files up to chunk_size go in a single request; larger files are sent
+    through an upload session one chunk at a time. progress, if given, is
+    called with (bytes_sent, total_bytes) after every request.
+    """
+    total_size = os.path.getsize(local_path)
+
+    with open(local_path, "rb") as f:
+        if total_size <= chunk_size:
+            metadata = dbx.files_upload(f.read(), remote_path, mode=_overwrite_mode())
+            if progress:
+                progress(total_size, total_size)
+            return metadata
+
+        session = dbx.files_upload_session_start(f.read(chunk_size))
+        cursor = _session_cursor(session.session_id, f.tell())
+        commit = _commit_info(remote_path)
+        if progress:
+            progress(cursor.offset, total_size)
+
+        while True:
+            if total_size - f.tell() <= chunk_size:
+                metadata = dbx.files_upload_session_finish(f.read(chunk_size), cursor, commit)
+                if progress:
+                    progress(total_size, total_size)
+                return metadata
+
+            dbx.files_upload_session_append_v2(f.read(chunk_size), cursor)
+            cursor.offset = f.tell()
+            if progress:
+                progress(cursor.offset, total_size)
+
+
+def build_manifest(snapshot_path, compression=DEFAULT_COMPRESSION):
+    """Describe a database snapshot: schema version, row counts per table and SHA-256"""
+    return {
+        "format_version": CONTAINER_FORMAT_VERSION,
+        "created_at": datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT),
+        "compression": compression,
+        "schema_version": get_schema_version(snapshot_path),
+        "row_counts": get_table_row_counts(snapshot_path),
+        "size": os.path.getsize(snapshot_path),
+        "sha256": file_sha256(snapshot_path)
+    }
+
+
+def compress_bytes(data, compression):
+    """One-shot compression for small payloads such as incremental chunks"""
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "xz":
+        return lzma.compress(data, preset=6)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise BackupIntegrityError("zstd compression requested but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if compression == "none":
+        return data
+    raise BackupIntegrityError(f"Unknown compression '{compression}'")
+
+
+def decompress_bytes(data, compression):
+    try:
+        if compression == "gzip":
+            return gzip.decompress(data)
+        if compression == "xz":
+            return lzma.decompress(data)
+        if compression == "zstd":
+            if not ZSTD_AVAILABLE:
+                raise BackupIntegrityError("Backup is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+    except DECOMPRESSION_ERRORS as e:
+        raise BackupIntegrityError(f"Backup data is corrupted: {e}")
+    if compression == "none":
+        return data
+    raise BackupIntegrityError(f"Unknown compression '{compression}'")
+
+
+def _open_compressor(fileobj, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6)
+    if compression == "xz":
+        return lzma.LZMAFile(fileobj, mode="wb", preset=6)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise BackupIntegrityError("zstd compression requested but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=10).stream_writer(fileobj, closefd=False)
+    if compression == "none":
+        return None
+    raise BackupIntegrityError(f"Unknown compression '{compression}'")
+
+
+def _open_decompressor(fileobj, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(fileobj, mode="rb")
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise BackupIntegrityError("Backup is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    if compression == "none":
+        return fileobj
+    raise BackupIntegrityError(f"Unknown compression '{compression}'")
+
+
+def write_backup_container(snapshot_path, container_path, compression=DEFAULT_COMPRESSION, manifest=None):
+    """Write a snapshot into a compressed container, streaming it chunk by chunk.
+
+    Returns the manifest stored in the container header.
+    """
+    if manifest is None:
+        manifest = build_manifest(snapshot_path, compression)
+    manifest_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+
+    with open(container_path, "wb") as out, open(snapshot_path, "rb") as src:
+        out.write(CONTAINER_MAGIC)
+        out.write(struct.pack(">I", len(manifest_bytes)))
+        out.write(manifest_bytes)
+
+        writer = _open_compressor(out, compression)
+        target = writer if writer is not None else out
+        try:
+            while True:
+                chunk = src.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    return manifest
+
+
+def _read_manifest_header(f):
+    if f.read(len(CONTAINER_MAGIC)) != CONTAINER_MAGIC:
+        raise BackupIntegrityError("Not a backup container (bad header)")
+    length_bytes = f.read(4)
+    if len(length_bytes) != 4:
+        raise BackupIntegrityError("Backup container header is truncated")
+    (length,) = struct.unpack(">I", length_bytes)
+    try:
+        return json.loads(f.read(length).decode("utf-8"))
+    except ValueError as e:
+        raise BackupIntegrityError(f"Backup manifest is unreadable: {e}")
+
+
+def read_backup_manifest(container_path):
+    with open(container_path, "rb") as f:
+        return _read_manifest_header(f)
+
+
+def extract_backup_container(container_path, dest_path, progress=None):
+    """Decompress a container into dest_path and verify its SHA-256.
+
+    The output is hashed while it is written, so memory use stays at one
+    chunk. On a hash or size mismatch dest_path is removed and
+    BackupIntegrityError is raised. Returns the manifest.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    with open(container_path, "rb") as f:
+        manifest = _read_manifest_header(f)
+        reader = _open_decompressor(f, manifest.get("compression", "none"))
+        try:
+            with open(dest_path, "wb") as out:
+                while True:
+                    chunk = reader.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+                    if progress:
+                        progress(size, manifest.get("size") or size)
+        except DECOMPRESSION_ERRORS as e:
+            remove_file_quietly(dest_path)
+            raise BackupIntegrityError(f"Backup data is corrupted: {e}")
+        finally:
+            if reader is not f:
+                reader.close()
+
+    if sha.hexdigest() != manifest.get("sha256") or size != manifest.get("size"):
+        remove_file_quietly(dest_path)
+        raise BackupIntegrityError("Backup failed integrity check (SHA-256 mismatch)")
+    return manifest
+
+
+def download_dropbox_file(dbx, remote_path, local_path, chunk_size=STREAM_CHUNK_SIZE, progress=None):
+    """Stream a Dropbox file to disk one chunk at a time"""
+    metadata, response = dbx.files_download(remote_path)
+    try:
+        received = 0
+        with open(local_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                received += len(chunk)
+                if progress:
+                    progress(received, getattr(metadata, "size", 0) or received)
+    finally:
+        response.close()
+    return metadata
+
+
+def list_dropbox_folder(dbx, folder):
+    """All entries of a Dropbox folder, following has_more pagination"""
+    result = dbx.files_list_folder(folder)
+    entries = list(result.entries)
+    while result.has_more:
+        result = dbx.files_list_folder_continue(result.cursor)
+        entries.extend(result.entries)
+    return entries
+
+
+def create_staging_path(db_path=DB_NAME):
+    """Create an empty temp file next to db_path so it can later be renamed over it"""
+    db_dir = os.path.dirname(os.path.abspath(db_path))
+    fd, staged_path = tempfile.mkstemp(prefix="institute_restore_", suffix=".db", dir=db_dir)
+    os.close(fd)
+    return staged_path
+
+
+def validate_database(db_path, manifest=None):
+    """Check a staged database before it is allowed to replace the live one.
+
+    Runs PRAGMA integrity_check, rejects schemas newer than this app
+    understands, requires the core tables and, when a manifest is given,
+    compares per-table row counts. Raises BackupIntegrityError on failure.
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            check = conn.execute("PRAGMA integrity_check").fetchall()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupIntegrityError(f"Backup is not a valid SQLite database: {e}")
+
+    if check != [("ok",)]:
+        raise BackupIntegrityError(f"Backup failed SQLite integrity check: {check[0][0]}")
+    if version > SCHEMA_VERSION:
+        raise BackupIntegrityError(
+            f"Backup was made by a newer version of the app (schema v{version}, this app supports v{SCHEMA_VERSION})"
+        )
+    missing = [table for table in REQUIRED_TABLES if table not in tables]
+    if missing:
+        raise BackupIntegrityError(f"Backup is missing tables: {', '.join(missing)}")
+
+    if manifest and manifest.get("row_counts"):
+        actual_counts = get_table_row_counts(db_path)
+        for table, expected in manifest["row_counts"].items():
+            if actual_counts.get(table) != expected:
+                raise BackupIntegrityError(
+                    f"Row count mismatch in '{table}': manifest says {expected}, backup has {actual_counts.get(table)}"
+                )
+
+
+def save_pre_restore_copy(db_path=DB_NAME):
+    """Snapshot the current database next to it before a restore overwrites it"""
+    if not os.path.exists(db_path):
+        return None
+    safety_path = os.path.join(
+        os.path.dirname(os.path.abspath(db_path)),
+        f"institute_backup_before_restore_{datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)}.db"
+    )
+    snapshot_path = create_snapshot(db_path)
+    shutil.move(snapshot_path, safety_path)
+    return safety_path
+
+
+def install_database(staged_path, db_path=DB_NAME, manifest=None):
+    """Validate a staged database and make it the live one.
+
+    The copy goes through the SQLite backup API in a single step, so it
+    happens inside one write transaction on the live file: connections
+    held by open windows see either the old or the new database, never a
+    half-written mix, and nothing is overwritten underneath them.
+    """
+    validate_database(staged_path, manifest)
+    save_pre_restore_copy(db_path)
+
+    if not os.path.exists(db_path):
+        os.replace(staged_path, db_path)
+        return
+
+    source_conn = sqlite3.connect(staged_path)
+    try:
+        live_conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            source_conn.backup(live_conn)
+        finally:
+            live_conn.close()
+    finally:
+        source_conn.close()
+
+
+def restore_backup_file(backup_path, db_path=DB_NAME, progress=None):
+    """Unpack a container (or legacy raw .db copy), validate it and install it over db_path.
+
+    The backup is streamed into a staging file next to the database, so
+    neither the compressed nor the decompressed data is held in memory.
+    Returns the container manifest, or None for legacy backups.
+    """
+    staged_path = create_staging_path(db_path)
+    try:
+        if backup_path.endswith(BACKUP_EXTENSION):
+            manifest = extract_backup_container(backup_path, staged_path, progress)
+        else:
+            shutil.copyfile(backup_path, staged_path)
+            manifest = None
+        install_database(staged_path, db_path, manifest)
+    finally:
+        remove_file_quietly(staged_path)
+    return manifest
+
+
+class BackupSource:
+    """One consistent snapshot of the database shared by every backup destination.
+
+    In "full" mode the snapshot is also packed into a compressed container
+    once, so parallel destinations upload the same bytes instead of each
+    re-reading and re-compressing the live database.
+    """
+    def __init__(self, mode="full", compression=DEFAULT_COMPRESSION, db_path=DB_NAME, timestamp=None):
+        self.mode = mode
+        self.compression = compression
+        self.timestamp = timestamp or datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)
+        self.container_path = None
+        self.manifest = None
+        self.snapshot_path = create_snapshot(db_path)
+        try:
+            if mode == "full":
+                fd, self.container_path = tempfile.mkstemp(prefix="institute_backup_", suffix=BACKUP_EXTENSION)
+                os.close(fd)
+                self.manifest = write_backup_container(self.snapshot_path, self.container_path, compression)
+            self.sha256 = self.manifest["sha256"] if self.manifest else file_sha256(self.snapshot_path)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """Delete the temp files backing this source"""
+        for path in (self.snapshot_path, self.container_path):
+            if path:
+                remove_file_quietly(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
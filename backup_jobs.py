@@ -0,0 +1,572 @@
+"""Backup, restore and change shipping jobs shared by the settings window, the scheduler and cli.py.
+
+Nothing here imports Qt, so the jobs can run from the command line.
+"""
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from database import DB_NAME, initialize_db, get_latest_change_seq, record_restore_in_change_log
+from backup_engine import (
+    DEFAULT_COMPRESSION, LEGACY_BACKUP_EXTENSION, BackupIntegrityError, BackupSource,
+    restore_backup_file, install_database, read_backup_manifest, make_backup_filename, is_backup_filename,
+    parse_backup_timestamp, create_staging_path, remove_file_quietly
+)
+from backup_destinations import BackupDestinationError, LocalDestination, DropboxDestination
+from chunk_store import ChunkStore
+from log_shipping import ship_changes, prune_shipped_changes
+from backup_catalog import (
+    CATALOG_INDEX_NAME, CATALOG_TIME_FORMAT, record_backup, get_last_backup_sha256, add_backup_file,
+    get_backup_files, get_expired_backup_files, remove_backup_files, export_destination_index,
+    import_destination_index
+)
+
+DESTINATION_LABELS = {"local": "Local", "dropbox": "Dropbox"}
+
+class BackupJob:
+    """Backup, restore and log shipping runs, without any Qt dependency.
+
+    status(message) and progress(percent) are called as the job advances;
+    BackupWorker in backup_scheduler.py relays them as Qt signals, cli.py
+    prints them.
+    """
+    def __init__(self, operation_type, config, trigger="manual", destinations=None, status=None, progress=None):
+        self.status_callback = status
+        self.progress_callback = progress
+        self.operation_type = operation_type  # 'backup' or 'restore'
+        self.config = config
+        self.trigger = trigger  # 'manual', 'scheduled', 'cli' or 'continuous', recorded in the backup catalog
+        # Destinations keyed 'local'/'dropbox' to use instead of the configured ones,
+        # e.g. a FakeDropboxDestination for offline tests and benchmarks
+        self.destinations = dict(destinations or {})
+        self.destination_progress = {}
+        self.progress_lock = threading.Lock()
+        
+    def report_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+    
+    def report_progress(self, percent):
+        if self.progress_callback:
+            self.progress_callback(percent)
+    
+    def run(self):
+        """Run the operation; returns the results dict and never raises"""
+        try:
+            if self.operation_type == "backup":
+                self.report_status("Starting backup operations...")
+                started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                results = self.perform_backup()
+                self.record_history(started_at, results)
+            elif self.operation_type == "restore":
+                self.report_status("Starting restore operations...")
+                results = self.perform_restore()
+            elif self.operation_type == "ship":
+                results = self.perform_log_shipping()
+            else:
+                results = {"success": False, "message": "Invalid operation type"}
+            return results
+        except Exception as e:
+            return {"success": False, "message": f"Operation failed: {str(e)}"}
+    
+    def perform_backup(self):
+        """Perform backup on both local and Dropbox if configured"""
+        results = {
+            "success": True,
+            "local": {"success": False, "message": ""},
+            "dropbox": {"success": False, "message": ""},
+            "summary": ""
+        }
+        
+        # Check which destinations are configured
+        destinations = self.configured_destinations()
+        if not destinations:
+            return {
+                "success": False,
+                "message": "No backup methods configured. Please set up local path or Dropbox token."
+            }
+        local_path = any(key == "local" for key, _ in destinations)
+        dropbox_token = any(key == "dropbox" for key, _ in destinations)
+        
+        # Take one consistent snapshot that every destination backs up
+        self.report_status("Creating database snapshot...")
+        try:
+            source = BackupSource(self.config.get('backup_mode', 'full'),
+                                  self.config.get('compression', DEFAULT_COMPRESSION), DB_NAME)
+        except Exception as e:
+            return {"success": False, "message": f"Failed to create backup data: {str(e)}"}
+        
+        # Skip the run if the database is byte-for-byte what the last successful backup captured
+        if self.config.get('skip_unchanged') and source.sha256 == get_last_backup_sha256():
+            source.close()
+            self.report_status("No changes since the last backup, skipping")
+            results["skipped"] = True
+            results["summary"] = "Skipped: no changes since last backup"
+            return results
+        results["db_sha256"] = source.sha256
+        
+        # Fan the snapshot out to all destinations concurrently
+        try:
+            self.report_status(f"Performing {' and '.join(label for _, label in destinations)} backup...")
+            with ThreadPoolExecutor(max_workers=len(destinations)) as pool:
+                futures = {
+                    pool.submit(self.run_destination_backup, key, label, source): (key, label)
+                    for key, label in destinations
+                }
+                for future in as_completed(futures):
+                    key, label = futures[future]
+                    results[key] = future.result()
+                    if results[key]["success"]:
+                        self.report_status(f"✅ {label} backup successful: {results[key]['message']}")
+                    else:
+                        self.report_status(f"❌ {label} backup failed: {results[key]['message']}")
+        finally:
+            source.close()
+        
+        # Generate summary
+        local_status = "✅ Success" if results["local"]["success"] else "❌ Failed"
+        dropbox_status = "✅ Success" if results["dropbox"]["success"] else "❌ Failed"
+        
+        if local_path and dropbox_token:
+            results["summary"] = f"Local: {local_status} | Dropbox: {dropbox_status}"
+        elif local_path:
+            results["summary"] = f"Local: {local_status}"
+        else:
+            results["summary"] = f"Dropbox: {dropbox_status}"
+        
+        # Overall success if at least one backup succeeded
+        results["success"] = results["local"]["success"] or results["dropbox"]["success"]
+        
+        return results
+    
+    def configured_destinations(self):
+        """(key, label) for every destination set up in the config or passed in"""
+        destinations = []
+        if self.config.get('local_path', '').strip() or "local" in self.destinations:
+            destinations.append(("local", "Local"))
+        if self.config.get('dropbox_token', '').strip() or "dropbox" in self.destinations:
+            destinations.append(("dropbox", "Dropbox"))
+        return destinations
+    
+    def perform_log_shipping(self):
+        """Upload changes logged since the last shipment to every configured destination"""
+        results = {"success": False, "shipped": 0}
+        destinations = self.configured_destinations()
+        shipped_to = []
+        for key, label in destinations:
+            try:
+                destination = self.get_destination(key)
+                shipped = ship_changes(destination)
+                shipped_to.append(destination)
+                results[key] = {"success": True, "message": f"{shipped} changes shipped"}
+                results["shipped"] = max(results["shipped"], shipped)
+            except Exception as e:
+                results[key] = {"success": False, "message": f"{label} log shipping failed: {str(e)}"}
+        results["success"] = any(results[key]["success"] for key, _ in destinations)
+        if destinations and len(shipped_to) == len(destinations):
+            try:
+                results["pruned"] = prune_shipped_changes(shipped_to)
+            except Exception as e:
+                print(f"Warning: Could not prune the change log: {str(e)}")
+        return results
+    
+    def record_history(self, started_at, results):
+        """Add this backup run to the backup catalog"""
+        if results.get("skipped"):
+            return
+        try:
+            status = "success" if results.get("success") else "failed"
+            record_backup(started_at, self.trigger, status, results.get("db_sha256"),
+                          results.get("summary") or results.get("message", ""))
+        except Exception as e:
+            print(f"Warning: Could not record backup history: {e}")
+    
+    def run_destination_backup(self, key, label, source):
+        """Run one destination's backup on a pool thread, never letting it raise"""
+        try:
+            return self.destination_backup(key, source, progress=self.make_progress_reporter(key))
+        except Exception as e:
+            return {"success": False, "message": f"{label} backup failed: {str(e)}"}
+    
+    def make_progress_reporter(self, key):
+        """Progress callback for one destination; emits the average over all destinations"""
+        self.destination_progress[key] = 0
+        
+        def report(done, total):
+            if not total:
+                return
+            with self.progress_lock:
+                self.destination_progress[key] = int(done * 100 / total)
+                overall = sum(self.destination_progress.values()) // len(self.destination_progress)
+            self.report_progress(overall)
+        return report
+    
+    def make_phase_reporter(self, start, end):
+        """Progress callback mapping one restore phase onto the start..end slice of the bar"""
+        def report(done, total):
+            if total:
+                self.report_progress(start + int(min(done, total) * (end - start) / total))
+        return report
+    
+    def perform_restore(self):
+        """Perform restore operation"""
+        results = {
+            "success": True,
+            "message": "Restore completed successfully",
+            "local": {"success": False, "message": ""},
+            "dropbox": {"success": False, "message": ""}
+        }
+        
+        # A restore point picked in the settings window pins the destination and the backup
+        restore_point = self.config.get('restore_point')
+        previous_change_seq = get_latest_change_seq()
+        
+        # Try local restore first
+        local_path = self.config.get('local_path', '')
+        local_configured = (local_path and os.path.exists(local_path)) or "local" in self.destinations
+        if local_configured and (not restore_point or restore_point["destination"] == "local"):
+            try:
+                self.report_status("Attempting local restore...")
+                local_result = self.destination_restore("local", restore_point)
+                results["local"] = local_result
+                if local_result["success"]:
+                    self.report_status(f"✅ Local restore successful: {local_result['message']}")
+                else:
+                    self.report_status(f"❌ Local restore failed: {local_result['message']}")
+            except Exception as e:
+                error_msg = f"Local restore failed: {str(e)}"
+                results["local"] = {"success": False, "message": error_msg}
+                self.report_status(f"❌ {error_msg}")
+        
+        # Try Dropbox restore if local failed or not configured
+        if not results["local"]["success"] and (not restore_point or restore_point["destination"] == "dropbox"):
+            dropbox_token = self.config.get('dropbox_token', '')
+            if dropbox_token or "dropbox" in self.destinations:
+                try:
+                    self.report_status("Attempting Dropbox restore...")
+                    dropbox_result = self.destination_restore("dropbox", restore_point)
+                    results["dropbox"] = dropbox_result
+                    if dropbox_result["success"]:
+                        self.report_status(f"✅ Dropbox restore successful: {dropbox_result['message']}")
+                    else:
+                        self.report_status(f"❌ Dropbox restore failed: {dropbox_result['message']}")
+                except Exception as e:
+                    error_msg = f"Dropbox restore failed: {str(e)}"
+                    results["dropbox"] = {"success": False, "message": error_msg}
+                    self.report_status(f"❌ {error_msg}")
+        
+        # Determine overall success
+        if results["local"]["success"] or results["dropbox"]["success"]:
+            results["success"] = True
+            results["message"] = "Restore completed successfully"
+            # Bring a backup taken by an older version of the app up to the current schema
+            initialize_db()
+            # Start a new history in the change log so shipped changes are never replayed across the restore
+            record_restore_in_change_log(previous_change_seq)
+            self.report_progress(100)
+        else:
+            results["success"] = False
+            results["message"] = "Restore failed - no valid backups found"
+        
+        return results
+    
+    def get_destination(self, key):
+        """Destination for 'local' or 'dropbox', built from the config unless one was passed in"""
+        if key in self.destinations:
+            return self.destinations[key]
+        
+        if key == "local":
+            backup_dir = self.config.get('local_path', '').strip()
+            if not backup_dir:
+                raise BackupDestinationError("Local backup path not configured")
+            destination = LocalDestination(backup_dir)
+        else:
+            # Dropbox SDK is optional and slow to import, so only load it when Dropbox is used
+            try:
+                import dropbox
+            except ImportError:
+                raise BackupDestinationError("Dropbox SDK not installed. Run: pip install dropbox")
+            access_token = self.config.get('dropbox_token', '').strip()
+            if not access_token:
+                raise BackupDestinationError("Dropbox token not configured")
+            try:
+                destination = DropboxDestination(dropbox.Dropbox(access_token))
+            except Exception as e:
+                raise BackupDestinationError(f"Failed to initialize Dropbox client: {str(e)}")
+        
+        self.destinations[key] = destination
+        return destination
+    
+    def destination_restore(self, key, entry=None):
+        """Restore a cataloged backup from one destination (the newest one unless entry is given)"""
+        label = DESTINATION_LABELS[key]
+        try:
+            destination = self.get_destination(key)
+        except BackupDestinationError as e:
+            return {"success": False, "message": str(e)}
+        
+        try:
+            if entry is None:
+                entries = self.load_destination_catalog(destination)
+                if not entries:
+                    return {"success": False, "message": f"No backup files found in {label} backups"}
+                entry = entries[0]
+            print(f"Restoring {label} backup {entry['name']} taken {entry['created_at']}")
+            
+            # Incremental backups are rebuilt from the chunk store
+            if entry["backup_mode"] == "incremental":
+                return self.restore_from_chunk_store(ChunkStore(destination), entry["name"], label)
+            
+            # Read local files in place; stream anything else to a temp file first
+            backup_path = destination.local_path(entry["name"])
+            download_path = None
+            if backup_path is None:
+                fd, download_path = tempfile.mkstemp(suffix=os.path.splitext(entry["name"])[1])
+                os.close(fd)
+                backup_path = download_path
+            try:
+                if download_path:
+                    destination.get_file(entry["name"], download_path, progress=self.make_phase_reporter(0, 50))
+                elif not os.path.exists(backup_path):
+                    raise FileNotFoundError(backup_path)
+                
+                # Decompress into a staging file, check it, then install it over the live database
+                # (a safety copy of the current database is taken just before the install)
+                try:
+                    restore_backup_file(backup_path, DB_NAME,
+                                        progress=self.make_phase_reporter(50 if download_path else 0, 90))
+                except BackupIntegrityError as e:
+                    return {"success": False, "message": f"Backup {entry['name']} is invalid: {str(e)}"}
+            finally:
+                if download_path:
+                    remove_file_quietly(download_path)
+            
+            return {"success": True, "message": f"Restored from {label} backup: {entry['name']}"}
+        
+        except FileNotFoundError:
+            remove_backup_files(key, [entry["name"]])
+            return {"success": False, "message": f"Backup {entry['name']} no longer exists in {label} backups"}
+        except Exception as e:
+            return {"success": False, "message": f"{label} restore failed: {str(e)}"}
+    
+    def destination_backup(self, key, source, progress=None):
+        """Write the shared snapshot to one destination, then catalog it and apply retention"""
+        label = DESTINATION_LABELS[key]
+        max_revisions = self.config.get('max_revisions', 5)
+        backup_mode = self.config.get('backup_mode', 'full')
+        
+        # Check if database file exists
+        if not os.path.exists(DB_NAME):
+            return {"success": False, "message": f"Database file '{DB_NAME}' not found in current directory"}
+        
+        try:
+            destination = self.get_destination(key)
+            # Need at least 2x the database size
+            destination.prepare(required_space=os.path.getsize(DB_NAME) * 2)
+        except BackupDestinationError as e:
+            return {"success": False, "message": str(e)}
+        
+        try:
+            if backup_mode == 'incremental':
+                # Store only the chunks that changed since the last revision
+                store = ChunkStore(destination, source.compression)
+                stats = self.create_incremental_backup(store, max_revisions, source, progress)
+                backup_name, backup_size, manifest = stats["revision"], stats["bytes_uploaded"], stats["manifest"]
+                message = f"{label} incremental backup created: {self.describe_incremental_backup(stats)}"
+            else:
+                # Stream the compressed snapshot; destinations write it atomically
+                backup_name = make_backup_filename(source.timestamp)
+                destination.put_file(backup_name, source.container_path, progress=progress)
+                backup_size, manifest = os.path.getsize(source.container_path), source.manifest
+                message = f"{label} backup created: {backup_name} ({source.compression}, {backup_size // 1024} KB)"
+                stats = None
+        except PermissionError as e:
+            return {"success": False, "message": f"Permission denied writing {label} backup: {str(e)}"}
+        except Exception as e:
+            return {"success": False, "message": f"{label} backup failed: {str(e)}"}
+        
+        # Catalog the backup and drop the ones beyond the revision limit
+        try:
+            self.update_backup_index(destination, backup_name, source.timestamp, stats)
+            self.catalog_backup(destination, backup_name, backup_mode, backup_size, manifest)
+        except Exception as e:
+            # Don't fail the backup if cleanup fails, but log it
+            print(f"Warning: Could not update {label} backup catalog: {str(e)}")
+        
+        if progress:
+            progress(1, 1)
+        return {"success": True, "message": message}
+    
+    def backup_created_at(self, name, fallback=None):
+        """Catalog timestamp for a backup, taken from its name when possible"""
+        moment = parse_backup_timestamp(name) or fallback or datetime.now()
+        return moment.strftime(CATALOG_TIME_FORMAT)
+    
+    def catalog_backup(self, destination, name, backup_mode, size, manifest):
+        """Add a finished backup to the catalog, apply retention and mirror the index to the destination"""
+        self.load_destination_catalog(destination)
+        add_backup_file(destination.key, name, backup_mode, self.backup_created_at(name), size, manifest)
+        
+        # Retention works from the catalog, so the destination never has to be listed.
+        # Expired incremental revisions have already been pruned by the chunk store.
+        expired = get_expired_backup_files(destination.key, backup_mode, self.config.get('max_revisions', 5))
+        if backup_mode == "full":
+            for expired_name in expired:
+                try:
+                    destination.delete(expired_name)
+                    print(f"Removed old backup: {expired_name}")
+                except Exception as e:
+                    print(f"Failed to remove {expired_name}: {str(e)}")
+        remove_backup_files(destination.key, expired)
+        
+        self.write_destination_index(destination)
+    
+    def load_destination_catalog(self, destination):
+        """Catalog entries for a destination, rebuilt from its mirrored index (or, once, a listing) if missing"""
+        entries = get_backup_files(destination.key)
+        if entries:
+            return entries
+        
+        try:
+            imported = import_destination_index(destination.key, destination.get_bytes(CATALOG_INDEX_NAME))
+        except Exception:
+            imported = 0  # No index yet, e.g. backups made before the catalog existed
+        if not imported:
+            self.scan_destination(destination)
+            self.write_destination_index(destination)
+        return get_backup_files(destination.key)
+    
+    def scan_destination(self, destination):
+        """Catalog every backup found by listing a destination; only needed once per destination"""
+        for filename in destination.list():
+            if not is_backup_filename(filename):
+                continue
+            manifest = None
+            local_path = destination.local_path(filename)
+            if local_path and not filename.endswith(LEGACY_BACKUP_EXTENSION):
+                try:
+                    manifest = read_backup_manifest(local_path)
+                except Exception:
+                    pass
+            add_backup_file(destination.key, filename, "full", self.backup_created_at(filename), None, manifest)
+        
+        store = ChunkStore(destination)
+        for revision_name in store.list_revisions():
+            try:
+                manifest = store.read_revision(revision_name)["manifest"]
+            except Exception:
+                manifest = None
+            add_backup_file(destination.key, revision_name, "incremental", self.backup_created_at(revision_name),
+                            None, manifest)
+    
+    def write_destination_index(self, destination):
+        """Mirror the destination's catalog entries into an index file stored with its backups"""
+        destination.put_bytes(CATALOG_INDEX_NAME, export_destination_index(destination.key))
+    
+    def create_incremental_backup(self, store, max_revisions, source, progress=None):
+        """Add the shared snapshot to a chunk store as a new revision"""
+        stats = store.backup(source.snapshot_path, source.timestamp, progress=progress)
+        
+        # Drop expired revisions and unreferenced chunks
+        try:
+            stats["removed_chunks"] = store.prune(max_revisions)
+        except Exception as e:
+            # Don't fail the backup if cleanup fails, but log it
+            print(f"Warning: Failed to prune old revisions: {str(e)}")
+        return stats
+    
+    def describe_incremental_backup(self, stats):
+        """One-line summary of an incremental backup for status messages"""
+        return (f"{stats['revision']} ({stats['new_chunks']} of {stats['total_chunks']} chunks changed, "
+                f"{stats['bytes_uploaded'] // 1024} KB written)")
+    
+    def restore_from_chunk_store(self, store, revision_name, source_label):
+        """Rebuild a revision from a chunk store, verify it and install it"""
+        staged_path = create_staging_path(DB_NAME)
+        try:
+            manifest = store.restore(revision_name, staged_path, progress=self.make_phase_reporter(0, 90))
+            install_database(staged_path, DB_NAME, manifest)
+        except BackupIntegrityError as e:
+            return {"success": False, "message": f"Revision {revision_name} is invalid: {str(e)}"}
+        finally:
+            remove_file_quietly(staged_path)
+        
+        return {"success": True, "message": f"Restored from {source_label} revision: {revision_name}"}
+
+    def get_last_backup_timestamp(self):
+        """Get timestamp of last successful backup"""
+        try:
+            if os.path.exists("backup_index.json"):
+                with open("backup_index.json", "r") as f:
+                    index = json.load(f)
+                    return index.get('last_backup_timestamp')
+        except:
+            pass
+        return None
+    
+    def update_backup_index(self, destination, backup_filename, timestamp, stats=None):
+        """Update the Dropbox backup index file"""
+        if destination.key != "dropbox":
+            return
+        try:
+            index_data = {
+                'last_backup_timestamp': timestamp,
+                'last_backup_file': backup_filename,
+                'backup_count': self.get_backup_count() + 1
+            }
+            if stats:
+                index_data['backup_mode'] = 'incremental'
+                index_data['total_chunks'] = stats['total_chunks']
+                index_data['new_chunks'] = stats['new_chunks']
+            
+            # Save locally
+            with open("backup_index.json", "w") as f:
+                json.dump(index_data, f)
+            
+            # Upload to Dropbox
+            index_json = json.dumps(index_data)
+            destination.put_bytes("backup_index.json", index_json.encode('utf-8'))
+            
+        except Exception as e:
+            print(f"Warning: Could not update backup index: {e}")
+    
+    def get_backup_count(self):
+        """Get current backup count"""
+        try:
+            if os.path.exists("backup_index.json"):
+                with open("backup_index.json", "r") as f:
+                    index = json.load(f)
+                    return index.get('backup_count', 0)
+        except:
+            pass
+        return 0
+
+def load_backup_config():
+    """Read backup configuration from settings.json and secure storage, without the settings window"""
+    config = {
+        'local_path': '',
+        'max_revisions': 5,
+        'compression': DEFAULT_COMPRESSION,
+        'backup_mode': 'full',
+        'auto_backup_enabled': False,
+        'auto_backup_interval_minutes': 60,
+        'auto_backup_after_changes': 0,
+        'continuous_shipping': False
+    }
+    try:
+        if os.path.exists("settings.json"):
+            with open("settings.json", "r") as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"Warning: Could not read settings: {e}")
+    
+    try:
+        import keyring
+        dropbox_token = keyring.get_password("institute_app", "dropbox_token")
+        config['dropbox_token'] = dropbox_token or config.get('dropbox_token', "")
+    except:
+        config['dropbox_token'] = config.get('dropbox_token', "")
+    return config
@@ -0,0 +1,184 @@
+"""Background backups and change shipping, started by app.py after the main menu first paints.
+
+Only the schedule in settings.json is read at startup; the backup modules
+(backup_jobs and everything behind it) are imported when a backup or a
+shipping run is actually due, so a desk without automatic backups never
+loads them.
+"""
+import os
+import json
+import sqlite3
+import time
+from PyQt5.QtCore import QThread, QObject, QTimer, pyqtSignal
+from database import DB_NAME
+
+SCHEDULE_DEFAULTS = {
+    'auto_backup_enabled': False,
+    'auto_backup_interval_minutes': 60,
+    'auto_backup_after_changes': 0,
+    'continuous_shipping': False
+}
+
+def load_schedule_settings():
+    """The automatic backup settings from settings.json, without the backup modules or secure storage"""
+    config = dict(SCHEDULE_DEFAULTS)
+    try:
+        if os.path.exists("settings.json"):
+            with open("settings.json", "r") as f:
+                settings = json.load(f)
+            config.update((key, settings[key]) for key in SCHEDULE_DEFAULTS if key in settings)
+    except Exception as e:
+        print(f"Warning: Could not read settings: {e}")
+    return config
+
+def load_destination_config():
+    """The full backup configuration, or None when no destination is set up"""
+    from backup_jobs import load_backup_config
+    config = load_backup_config()
+    if not config.get('local_path', '').strip() and not config.get('dropbox_token', '').strip():
+        return None
+    return config
+
+class BackupWorker(QThread):
+    """Runs a BackupJob on a background thread, relaying its status and progress as signals"""
+    progress = pyqtSignal(int)
+    status = pyqtSignal(str)
+    finished = pyqtSignal(dict)  # Changed to emit detailed results
+
+    def __init__(self, operation_type, config, trigger="manual", destinations=None):
+        super().__init__()
+        from backup_jobs import BackupJob
+        self.job = BackupJob(operation_type, config, trigger, destinations,
+                             status=self.status.emit, progress=self.progress.emit)
+
+    def run(self):
+        self.finished.emit(self.job.run())
+
+class BackupScheduler(QObject):
+    """Runs backups in the background on an interval or after a number of database changes.
+
+    Changes are detected cheaply by polling PRAGMA data_version on a
+    long-lived connection, which increments whenever another connection
+    commits. Each poll that sees a new version counts as one change.
+    Scheduled runs also compare the snapshot hash against the last
+    successful backup in the catalog and skip if nothing changed.
+    With continuous shipping on, every poll that sees new commits also
+    uploads the logged changes, keeping the recovery point a few seconds old.
+    """
+    POLL_INTERVAL_MS = 5000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.worker = None
+        self.shipper = None
+        self.shipped_data_version = None
+        self.watch_conn = None
+        self.watch_inode = None
+        self.last_data_version = None
+        # Unknown at startup, so assume one change and let the hash check decide
+        self.changes_since_backup = 1
+        self.last_run = time.monotonic()
+        self.config = {}
+        self.reload_settings()
+
+    def reload_settings(self):
+        """Re-read settings and start or stop polling accordingly"""
+        self.config = load_schedule_settings()
+        if self.config.get('auto_backup_enabled') or self.config.get('continuous_shipping'):
+            self.timer.start(self.POLL_INTERVAL_MS)
+        else:
+            self.timer.stop()
+
+    def read_data_version(self):
+        """Current data_version, reconnecting if the database file was replaced (e.g. by a restore)"""
+        try:
+            inode = os.stat(DB_NAME).st_ino
+        except OSError:
+            return None
+        if self.watch_conn is None or inode != self.watch_inode:
+            if self.watch_conn is not None:
+                self.watch_conn.close()
+                self.changes_since_backup += 1
+            self.watch_conn = sqlite3.connect(DB_NAME)
+            self.watch_inode = inode
+            self.last_data_version = None
+        return self.watch_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self):
+        version = self.read_data_version()
+        if version is None:
+            return
+        if self.last_data_version is not None and version != self.last_data_version:
+            self.changes_since_backup += 1
+        self.last_data_version = version
+
+        if self.config.get('continuous_shipping') and version != self.shipped_data_version:
+            self.ship_changes(version)
+
+        if not self.config.get('auto_backup_enabled'):
+            return
+        if self.worker is not None and self.worker.isRunning():
+            return
+
+        interval = self.config.get('auto_backup_interval_minutes', 60) * 60
+        change_threshold = self.config.get('auto_backup_after_changes', 0)
+        elapsed = time.monotonic() - self.last_run
+
+        if self.changes_since_backup == 0:
+            return
+        if (interval and elapsed >= interval) or (change_threshold and self.changes_since_backup >= change_threshold):
+            self.run_backup()
+
+    def run_backup(self):
+        config = load_destination_config()
+        if config is None:
+            return
+        config['skip_unchanged'] = True
+
+        self.last_run = time.monotonic()
+        self.changes_since_backup = 0
+        self.worker = BackupWorker("backup", config, trigger="scheduled")
+        self.worker.finished.connect(self.backup_finished)
+        # Low priority so the UI stays responsive while the backup runs
+        self.worker.start(QThread.LowestPriority)
+
+    def ship_changes(self, version):
+        if self.shipper is not None and self.shipper.isRunning():
+            return
+        config = load_destination_config()
+        if config is None:
+            return
+
+        self.shipped_data_version = version
+        self.shipper = BackupWorker("ship", config, trigger="continuous")
+        self.shipper.finished.connect(self.shipping_finished)
+        self.shipper.start(QThread.LowestPriority)
+
+    def shipping_finished(self, results):
+        if not results.get("success"):
+            # Retry on the next poll
+            self.shipped_data_version = None
+            print(f"Change shipping failed: {results.get('message') or results}")
+
+    def backup_finished(self, results):
+        if results.get("skipped"):
+            return
+        if not results.get("success"):
+            # Try again on the next interval
+            self.changes_since_backup += 1
+            print(f"Scheduled backup failed: {results.get('summary') or results.get('message', '')}")
+
+backup_scheduler = None
+
+def start_backup_scheduler():
+    global backup_scheduler
+    if backup_scheduler is None:
+        backup_scheduler = BackupScheduler()
+    return backup_scheduler
+
+def reload_backup_scheduler():
+    """Apply changed settings to the running scheduler, if any"""
+    if backup_scheduler is not None:
+        backup_scheduler.reload_settings()
@@ -0,0 +1,289 @@
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QTableWidget,
+    QTableWidgetItem, QHeaderView, QMessageBox, QShortcut
+)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QIntValidator, QKeySequence
+from database import PAYMENT_MODES
+from data_source import data_source
+from change_events import tables_changed
+from receipt_printer import RECEIPTS_DIR, receipt_queue
+
+
+class BatchPaymentEntry(QWidget):
+    """Grid for entering many payments in a row, saved together in one transaction.
+
+    Student IDs can be scanned or typed; each entry is checked against
+    balances cached in memory (less whatever is already queued for the same
+    enrollment), so adding a row never touches the database. Commit records
+    the whole grid at once and hands the receipts to the background receipt
+    queue.
+    """
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setSpacing(10)
+
+        hint = QLabel("Scan or type a student ID and press Enter, then type the amount and press Enter. "
+                      "Nothing is saved until you commit.")
+        hint.setProperty("role", "hint")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        entry_layout = QHBoxLayout()
+        self.student_input = QLineEdit()
+        self.student_input.setPlaceholderText("Student ID")
+        self.student_input.setFixedHeight(45)
+        self.student_input.returnPressed.connect(self.student_entered)
+        self.student_input.textChanged.connect(self.update_course_choices)
+        entry_layout.addWidget(self.student_input, stretch=2)
+
+        self.course_combo = QComboBox()
+        self.course_combo.setFixedHeight(45)
+        entry_layout.addWidget(self.course_combo, stretch=3)
+
+        self.amount_input = QLineEdit()
+        self.amount_input.setPlaceholderText("Amount")
+        self.amount_input.setValidator(QIntValidator(1, 10 ** 9, self))
+        self.amount_input.setFixedHeight(45)
+        self.amount_input.returnPressed.connect(self.add_entry)
+        entry_layout.addWidget(self.amount_input, stretch=1)
+
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(PAYMENT_MODES)
+        self.mode_combo.setFixedHeight(45)
+        entry_layout.addWidget(self.mode_combo, stretch=1)
+
+        add_button = QPushButton("Add")
+        add_button.setFixedHeight(45)
+        add_button.clicked.connect(self.add_entry)
+        entry_layout.addWidget(add_button)
+        layout.addLayout(entry_layout)
+
+        self.message_label = QLabel("")
+        self.message_label.setProperty("role", "hint")
+        layout.addWidget(self.message_label)
+
+        self.grid = QTableWidget()
+        self.grid.setColumnCount(6)
+        self.grid.setHorizontalHeaderLabels(["Student ID", "Student", "Course", "Amount", "Mode", "Balance After"])
+        self.grid.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.grid.setSelectionBehavior(QTableWidget.SelectRows)
+        self.grid.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        QShortcut(QKeySequence.Delete, self.grid, self.remove_selected)
+        layout.addWidget(self.grid, stretch=1)
+
+        button_layout = QHBoxLayout()
+        remove_button = QPushButton("Remove Selected")
+        remove_button.setFixedHeight(45)
+        remove_button.clicked.connect(self.remove_selected)
+        button_layout.addWidget(remove_button)
+        self.commit_button = QPushButton("Commit Payments")
+        self.commit_button.setProperty("role", "success")
+        self.commit_button.setFixedHeight(45)
+        self.commit_button.clicked.connect(self.commit_entries)
+        button_layout.addWidget(self.commit_button)
+        layout.addLayout(button_layout)
+
+        self.receipts_label = QLabel("")
+        self.receipts_label.setProperty("role", "hint")
+        layout.addWidget(self.receipts_label)
+
+        self.setLayout(layout)
+
+        self.balances = {}               # enrollment id -> (id, student code, name, course, fee, paid)
+        self.enrollments_by_student = {}  # upper-case student code -> [enrollment ids]
+        self.entries = []                 # {"enrollment_id", "code", "name", "course", "amount", "mode"} in entry order
+        self.receipts_pending = set()  # receipt numbers this window queued that are not rendered yet
+        self.receipts_queued = 0
+        self.receipts_done = 0
+        self.update_commit_button()
+
+        # Reload balances when payments are recorded anywhere, at most once per burst
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(300)
+        self.reload_timer.timeout.connect(self.load_balances)
+        self.load_balances()
+        data_source().rows_changed.connect(self.apply_changes)
+        receipt_queue().rendered.connect(self.receipt_rendered)
+        receipt_queue().failed.connect(self.receipt_failed)
+
+    def apply_changes(self, changes):
+        if tables_changed(changes) & {"students", "enrollments", "payments"}:
+            self.reload_timer.start()
+
+    def load_balances(self):
+        data_source().call("get_enrollment_balances", on_result=self.set_balances,
+                           on_error=self.show_message, context=self)
+
+    def set_balances(self, rows):
+        self.balances = {row[0]: row for row in rows}
+        self.enrollments_by_student = {}
+        for row in rows:
+            if row[1]:
+                self.enrollments_by_student.setdefault(row[1].upper(), []).append(row[0])
+        self.update_course_choices()
+        self.refresh_grid()
+
+    def pending(self, enrollment_id, before=None):
+        """Balance left on an enrollment after the queued entries (those before index `before`, if given)"""
+        balance = self.balances.get(enrollment_id)
+        if balance is None:
+            return 0  # Enrollment removed meanwhile, e.g. unenrolled at another desk
+        _, _, _, _, fee, paid = balance
+        queued = sum(entry["amount"] for entry in self.entries[:before] if entry["enrollment_id"] == enrollment_id)
+        return fee - paid - queued
+
+    def update_course_choices(self):
+        self.course_combo.clear()
+        for enrollment_id in self.enrollments_by_student.get(self.student_input.text().strip().upper(), []):
+            if enrollment_id not in self.balances:
+                continue
+            course = self.balances[enrollment_id][3]
+            self.course_combo.addItem(f"{course} (pending ₹{self.pending(enrollment_id)})", enrollment_id)
+        # Preselect the first course that still has something to pay
+        for index in range(self.course_combo.count()):
+            if self.pending(self.course_combo.itemData(index)) > 0:
+                self.course_combo.setCurrentIndex(index)
+                break
+
+    def student_entered(self):
+        code = self.student_input.text().strip().upper()
+        if code not in self.enrollments_by_student:
+            self.show_message(f"No enrollments found for student ID '{self.student_input.text().strip()}'.")
+            self.student_input.selectAll()
+            return
+        self.show_message("")
+        self.amount_input.setFocus()
+
+    def add_entry(self):
+        enrollment_id = self.course_combo.currentData()
+        if enrollment_id is None:
+            self.show_message("Enter a student ID with an enrollment first.")
+            self.student_input.setFocus()
+            return
+        amount = int(self.amount_input.text()) if self.amount_input.text() else 0
+        if amount <= 0:
+            self.show_message("Amount must be greater than 0.")
+            self.amount_input.setFocus()
+            return
+        pending = self.pending(enrollment_id)
+        if amount > pending:
+            self.show_message(f"Cannot pay more than the pending ₹{pending} for this course.")
+            self.amount_input.selectAll()
+            return
+
+        _, code, name, course, _, _ = self.balances[enrollment_id]
+        self.entries.append({"enrollment_id": enrollment_id, "code": code, "name": name, "course": course,
+                             "amount": amount, "mode": self.mode_combo.currentText()})
+        self.refresh_grid()
+        self.grid.scrollToBottom()
+        self.show_message("")
+        # Ready for the next scan; the payment mode is kept for the next entry
+        self.amount_input.clear()
+        self.student_input.clear()
+        self.student_input.setFocus()
+
+    def remove_selected(self):
+        rows = sorted({index.row() for index in self.grid.selectedIndexes()}, reverse=True)
+        for row in rows:
+            del self.entries[row]
+        if rows:
+            self.refresh_grid()
+            self.update_course_choices()
+
+    def refresh_grid(self):
+        self.grid.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            enrollment_id = entry["enrollment_id"]
+            balance = self.balances.get(enrollment_id)
+            after = self.pending(enrollment_id, before=row + 1) if balance else None
+            values = [
+                balance[1] if balance else "",
+                balance[2] if balance else "",
+                balance[3] if balance else "(enrollment removed)",
+                f"₹{entry['amount']}",
+                entry["mode"],
+                f"₹{after}" if after is not None else "",
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if after is None or after < 0:
+                    # No longer valid, e.g. another desk took a payment for the same course meanwhile
+                    item.setForeground(Qt.red)
+                self.grid.setItem(row, col, item)
+        self.update_commit_button()
+
+    def update_commit_button(self):
+        total = sum(entry["amount"] for entry in self.entries)
+        self.commit_button.setText(f"Commit {len(self.entries)} Payments (₹{total})" if self.entries
+                                   else "Commit Payments")
+        self.commit_button.setEnabled(bool(self.entries))
+
+    def commit_entries(self):
+        invalid = [row + 1 for row, entry in enumerate(self.entries)
+                   if entry["enrollment_id"] not in self.balances
+                   or self.pending(entry["enrollment_id"], before=row + 1) < 0]
+        if invalid:
+            QMessageBox.warning(self, "Check Entries",
+                                f"Row(s) {', '.join(map(str, invalid))} exceed the pending balance. "
+                                "Remove or correct them before committing.")
+            return
+        today = datetime.now().strftime("%Y-%m-%d")
+        entries = list(self.entries)
+        payments = [(entry["enrollment_id"], entry["amount"], today, entry["mode"]) for entry in entries]
+        self.commit_button.setEnabled(False)
+        data_source().call("add_payments", payments,
+                           on_result=lambda receipt_nos: self.committed(entries, receipt_nos, today),
+                           on_error=self.commit_failed, context=self)
+
+    def committed(self, entries, receipt_nos, date):
+        for entry, receipt_no in zip(entries, receipt_nos):
+            # A reload while the call was in flight may have dropped the enrollment; the payment stands anyway
+            balance = self.balances.get(entry["enrollment_id"])
+            if balance is not None:
+                # Count the payment now rather than when the reload comes back
+                enrollment_id, code, name, course, fee, paid = balance
+                self.balances[enrollment_id] = (enrollment_id, code, name, course, fee, paid + entry["amount"])
+            payment = (None, receipt_no, entry["code"], entry["name"], entry["course"], entry["amount"], date)
+            receipt_queue().add(payment, entry["mode"])
+        self.receipts_pending.update(receipt_nos)
+        self.receipts_queued += len(receipt_nos)
+        committed_ids = {id(entry) for entry in entries}
+        self.entries = [entry for entry in self.entries if id(entry) not in committed_ids]
+        self.refresh_grid()
+        self.show_message(f"Recorded {len(receipt_nos)} payments (₹{sum(entry['amount'] for entry in entries)}).")
+        self.update_receipts_label()
+        self.student_input.setFocus()
+
+    def commit_failed(self, message):
+        self.update_commit_button()
+        QMessageBox.critical(self, "Payments Not Recorded", f"No payment was recorded:\n{message}")
+
+    def receipt_rendered(self, receipt_no, filename):
+        # The queue is shared, so skip receipts other windows asked for
+        if receipt_no not in self.receipts_pending:
+            return
+        self.receipts_pending.discard(receipt_no)
+        self.receipts_done += 1
+        self.update_receipts_label()
+
+    def receipt_failed(self, receipt_no, message):
+        if receipt_no not in self.receipts_pending:
+            return
+        self.receipts_pending.discard(receipt_no)
+        self.receipts_done += 1
+        self.show_message(f"Receipt {receipt_no} could not be created: {message}")
+        self.update_receipts_label()
+
+    def update_receipts_label(self):
+        if self.receipts_done < self.receipts_queued:
+            self.receipts_label.setText(f"Saving receipts: {self.receipts_done} of {self.receipts_queued}...")
+        else:
+            self.receipts_label.setText(f"{self.receipts_done} receipts saved in {RECEIPTS_DIR}/")
+
+    def show_message(self, message):
+        self.message_label.setText(message)
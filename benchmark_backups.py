@@ -0,0 +1,112 @@
+"""Offline throughput benchmark for the backup pipeline.
+
+Builds a synthetic institute.db in a scratch directory and times full and
+incremental backups and restores against a local folder and a simulated
+Dropbox (FakeDropboxDestination with configurable latency and bandwidth).
+
+    python benchmark_backups.py --students 20000 --latency 0.05 --bandwidth 2
+"""
+import os
+import sys
+import time
+import sqlite3
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_database(students, payments_per_student):
+    import database
+    database.initialize_db()
+    conn = sqlite3.connect(database.DB_NAME)
+    c = conn.cursor()
+    c.execute("INSERT INTO courses (name, fee, duration) VALUES ('Benchmark Course', 12000, 6)")
+    for n in range(students):
+        c.execute("INSERT INTO students (student_id, name, phone, email, address) VALUES (?, ?, ?, ?, ?)",
+                  (f"STU{n:06d}", f"Student {n}", f"98{n:08d}", f"student{n}@example.com", f"{n} Main Street"))
+        c.execute("""INSERT INTO enrollments (student_id, student_name, course_name, course_fee, course_duration, enrollment_date)
+                     VALUES (?, ?, 'Benchmark Course', 12000, '6', '2024-01-01')""", (c.lastrowid, f"Student {n}"))
+        enrollment_id = c.lastrowid
+        for p in range(payments_per_student):
+            c.execute("INSERT INTO payments (enrollment_id, amount, receipt_no, date) VALUES (?, ?, ?, ?)",
+                      (enrollment_id, 1000, f"RCP-{n:06d}-{p:02d}", "2024-02-01"))
+    conn.commit()
+    conn.close()
+
+
+def append_payments(count):
+    import database
+    conn = sqlite3.connect(database.DB_NAME)
+    stamp = time.time_ns()
+    conn.executemany("INSERT INTO payments (enrollment_id, amount, receipt_no, date) VALUES (1, 500, ?, '2024-03-01')",
+                     [(f"RCP-NEW-{stamp}-{i}",) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def timed(label, func, db_size):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    ok = "ok" if result.get("success") else f"FAILED ({result.get('message') or result})"
+    print(f"  {label:<34} {elapsed:8.2f}s  {db_size / 1024 / 1024 / elapsed:8.1f} MB/s  {ok}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--payments", type=int, default=4, help="payments per student")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated Dropbox seconds per request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="simulated Dropbox MB/s (default unlimited)")
+    parser.add_argument("--compression", default="gzip")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="backup_bench_")
+    os.chdir(workdir)
+
+    import database
+    from backup_jobs import BackupJob
+    from backup_destinations import LocalDestination, FakeDropboxDestination
+    from backup_catalog import get_backup_files
+
+    build_database(args.students, args.payments)
+    db_size = os.path.getsize(database.DB_NAME)
+    print(f"Database: {db_size / 1024 / 1024:.1f} MB in {workdir}")
+
+    bandwidth = args.bandwidth * 1024 * 1024 if args.bandwidth else None
+    for mode in ("full", "incremental"):
+        print(f"\n{mode} backups (latency {args.latency * 1000:.0f} ms, "
+              f"bandwidth {f'{args.bandwidth} MB/s' if bandwidth else 'unlimited'})")
+        destinations = {
+            "local": LocalDestination(os.path.join(workdir, f"local_{mode}")),
+            "dropbox": FakeDropboxDestination(os.path.join(workdir, f"dropbox_{mode}"), args.latency, bandwidth)
+        }
+        config = {"max_revisions": 5, "compression": args.compression, "backup_mode": mode}
+
+        def run(operation, keys, restore_point=None):
+            job = BackupJob(operation, dict(config, restore_point=restore_point),
+                            destinations={key: destinations[key] for key in keys})
+            return job.perform_backup() if operation == "backup" else job.perform_restore()
+
+        for key in ("local", "dropbox"):
+            timed(f"{key} first backup", lambda: run("backup", [key]), db_size)
+            append_payments(100)
+            timed(f"{key} backup after 100 payments", lambda: run("backup", [key]), db_size)
+        timed("local + dropbox in parallel", lambda: run("backup", ["local", "dropbox"]), db_size)
+
+        dropbox_requests = destinations["dropbox"].dbx.request_sizes
+        print(f"  simulated Dropbox: {len(dropbox_requests)} requests, {sum(dropbox_requests) / 1024 / 1024:.1f} MB sent")
+
+        for key in ("local", "dropbox"):
+            latest = get_backup_files(key, mode, limit=1)[0]
+            timed(f"{key} restore", lambda: run("restore", [key], latest), db_size)
+
+    os.chdir(os.path.dirname(workdir))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from database import CAPTURED_TABLES, subscribe_changes
+
+
+class ChangeEvents(QObject):
+    """Relays database row changes to windows as a Qt signal.
+
+    Writes can happen on worker threads (restores, for instance); connected
+    slots still run on the GUI thread because the signal is queued across
+    threads.
+    """
+    # List of (seq, table_name, row_id, op) change journal entries
+    rows_changed = pyqtSignal(list)
+
+
+_change_events = None
+
+
+def change_events():
+    """The application-wide ChangeEvents instance, subscribed to database.py on first use"""
+    global _change_events
+    if _change_events is None:
+        _change_events = ChangeEvents()
+        subscribe_changes(_change_events.rows_changed.emit)
+    return _change_events
+
+
+def tables_changed(changes):
+    """Names of the tables touched by changes; a restore marker touches every table"""
+    tables = set()
+    for _, table_name, _, op in changes:
+        if op == "RESTORE":
+            return set(CAPTURED_TABLES)
+        tables.add(table_name)
+    return tables
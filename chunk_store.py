@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from backup_engine import (
+    DEFAULT_COMPRESSION, BACKUP_PREFIX, BACKUP_TIMESTAMP_FORMAT, BackupIntegrityError,
+    build_manifest, compress_bytes, decompress_bytes, remove_file_quietly
+)
+
+# Fixed chunk size for page-level deltas; a multiple of SQLite's default 4 KB page
+# so a changed page dirties exactly one chunk
+CHUNK_SIZE = 64 * 1024
+
+CHUNKS_DIR = "chunks"
+REVISIONS_DIR = "revisions"
+REVISION_EXTENSION = ".json"
+
+CHUNK_EXTENSIONS = {"gzip": ".gz", "xz": ".xz", "zstd": ".zst", "none": ".raw"}
+
+
+def make_revision_name(timestamp):
+    return f"{BACKUP_PREFIX}{timestamp}{REVISION_EXTENSION}"
+
+
+class ChunkStore:
+    """Content-addressed backup store built from fixed-size database chunks.
+
+    Each backup is a small revision manifest listing the SHA-256 of every
+    chunk of the snapshot in order. Only chunks not referenced by the
+    previous revision are uploaded, so an append-mostly database costs a
+    handful of chunks per backup instead of a full copy. Chunks and
+    revisions live under the chunks/ and revisions/ folders of any
+    BackupDestination.
+    """
+    def __init__(self, destination, compression=DEFAULT_COMPRESSION, chunk_size=CHUNK_SIZE):
+        self.destination = destination
+        self.compression = compression
+        self.chunk_size = chunk_size
+
+    def list_revisions(self):
+        """Revision names, oldest first"""
+        names = [n for n in self.destination.list(REVISIONS_DIR)
+                 if n.startswith(BACKUP_PREFIX) and n.endswith(REVISION_EXTENSION)]
+        return sorted(names)
+
+    def read_revision(self, revision_name):
+        try:
+            return json.loads(self.destination.get_bytes(f"{REVISIONS_DIR}/{revision_name}").decode("utf-8"))
+        except ValueError as e:
+            raise BackupIntegrityError(f"Revision {revision_name} is unreadable: {e}")
+
+    def backup(self, snapshot_path, timestamp=None, progress=None):
+        """Store a snapshot as a new revision and return upload statistics"""
+        timestamp = timestamp or datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)
+        revisions = self.list_revisions()
+        known_chunks = set()
+        if revisions:
+            try:
+                known_chunks.update(self.read_revision(revisions[-1])["chunks"])
+            except Exception as e:
+                # Fall back to uploading everything; chunk writes are idempotent
+                print(f"Warning: Could not read previous revision: {e}")
+
+        extension = CHUNK_EXTENSIONS[self.compression]
+        total_size = os.path.getsize(snapshot_path)
+        chunk_keys = []
+        new_chunks = 0
+        bytes_uploaded = 0
+
+        with open(snapshot_path, "rb") as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                key = hashlib.sha256(data).hexdigest() + extension
+                if key not in known_chunks:
+                    payload = compress_bytes(data, self.compression)
+                    self.destination.put_bytes(f"{CHUNKS_DIR}/{key}", payload)
+                    known_chunks.add(key)
+                    new_chunks += 1
+                    bytes_uploaded += len(payload)
+                chunk_keys.append(key)
+                if progress:
+                    progress(f.tell(), total_size)
+
+        revision = {
+            "manifest": build_manifest(snapshot_path, self.compression),
+            "chunk_size": self.chunk_size,
+            "chunk_compression": self.compression,
+            "chunks": chunk_keys
+        }
+        revision_name = make_revision_name(timestamp)
+        self.destination.put_bytes(f"{REVISIONS_DIR}/{revision_name}", json.dumps(revision).encode("utf-8"))
+
+        return {
+            "revision": revision_name,
+            "total_chunks": len(chunk_keys),
+            "new_chunks": new_chunks,
+            "bytes_uploaded": bytes_uploaded,
+            "database_size": total_size,
+            "manifest": revision["manifest"]
+        }
+
+    def restore(self, revision_name, dest_path, progress=None):
+        """Rebuild the database of a revision into dest_path and verify its SHA-256"""
+        revision = self.read_revision(revision_name)
+        manifest = revision["manifest"]
+        compression = revision.get("chunk_compression", "none")
+        sha = hashlib.sha256()
+        chunks = revision["chunks"]
+
+        try:
+            with open(dest_path, "wb") as out:
+                for index, key in enumerate(chunks):
+                    data = decompress_bytes(self.destination.get_bytes(f"{CHUNKS_DIR}/{key}"), compression)
+                    if hashlib.sha256(data).hexdigest() != key.split(".")[0]:
+                        raise BackupIntegrityError(f"Chunk {key} is corrupted")
+                    sha.update(data)
+                    out.write(data)
+                    if progress:
+                        progress(index + 1, len(chunks))
+        except Exception:
+            remove_file_quietly(dest_path)
+            raise
+
+        if sha.hexdigest() != manifest.get("sha256"):
+            remove_file_quietly(dest_path)
+            raise BackupIntegrityError("Backup failed integrity check (SHA-256 mismatch)")
+        return manifest
+
+    def prune(self, max_revisions):
+        """Drop revisions beyond max_revisions and delete chunks no longer referenced"""
+        revisions = self.list_revisions()
+        expired = revisions[:-max_revisions] if len(revisions) > max_revisions else []
+        if not expired:
+            return 0
+
+        for revision_name in expired:
+            self.destination.delete(f"{REVISIONS_DIR}/{revision_name}")
+
+        live_chunks = set()
+        for revision_name in revisions[-max_revisions:]:
+            live_chunks.update(self.read_revision(revision_name)["chunks"])
+
+        removed = 0
+        for key in self.destination.list(CHUNKS_DIR):
+            if key not in live_chunks:
+                self.destination.delete(f"{CHUNKS_DIR}/{key}")
+                removed += 1
+        return removed
@@ -0,0 +1,274 @@
+"""Command-line interface for bulk jobs, without the PyQt windows.
+
+    python cli.py students list [--search TEXT] [--format csv|json]
+    python cli.py students import FILE          CSV with columns name,phone[,email,address]; - reads stdin
+    python cli.py enrollments STUDENT           enrollment ids, fees and amounts paid
+    python cli.py payments add ENROLLMENT_ID AMOUNT [--date YYYY-MM-DD] [--mode MODE] [--receipt]
+    python cli.py payments import FILE [--receipts]   CSV with columns enrollment_id,amount[,date,mode]
+    python cli.py history STUDENT [--course TEXT] [--format csv|json] [--output FILE]
+    python cli.py receipts RECEIPT_NO... [--dir DIR]   PDF receipts; - reads receipt numbers from stdin
+    python cli.py dues [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--format csv|json]   unpaid installments
+    python cli.py dues --overdue                installments due before today and still unpaid
+    python cli.py backup | restore | ship       run the configured backup jobs (see Settings)
+    python cli.py restore --yes                 restore without asking (required when not run from a terminal)
+
+Modules are imported per command, so the CLI starts quickly; only the
+receipt commands load Qt, without opening any window. Exit status is 1
+when any row or job failed.
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+from datetime import datetime
+
+import database
+
+RECEIPTS_DIR = "receipts"
+_qt_app = None  # created on the first receipt; kept so Qt is not torn down in between
+STUDENT_FIELDS = ("id", "student_id", "name", "phone", "email", "address")
+ENROLLMENT_FIELDS = ("enrollment_id", "course_name", "course_fee", "paid")
+PAYMENT_FIELDS = ("payment_id", "receipt_no", "student_id", "name", "course_name", "amount", "date", "mode")
+DUE_FIELDS = ("enrollment_id", "student_id", "name", "course_name", "installment_no", "due_date", "owed")
+
+
+def open_input(path):
+    return sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+
+
+def read_rows(path, required):
+    """CSV rows as dicts; the first line must name the columns"""
+    with open_input(path) as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in required if column not in (reader.fieldnames or ())]
+        if missing:
+            raise SystemExit(f"{path}: missing column(s) {', '.join(missing)}")
+        return [{key: (value or "").strip() for key, value in row.items() if key} for row in reader]
+
+
+def write_rows(fields, rows, output_format="csv", output=None):
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        if output_format == "json":
+            json.dump([dict(zip(fields, row)) for row in rows], out, indent=2, ensure_ascii=False)
+            out.write("\n")
+        else:
+            writer = csv.writer(out)
+            writer.writerow(fields)
+            writer.writerows(rows)
+    finally:
+        if output:
+            out.close()
+
+
+def record_payment(enrollment_id, amount, date, mode="Cash"):
+    """add_payment() with the checks the Record Payment window makes; returns the receipt number"""
+    enrollment = database.get_enrollment(enrollment_id)
+    if enrollment is None:
+        raise ValueError(f"enrollment {enrollment_id} not found")
+    if amount <= 0:
+        raise ValueError("amount must be greater than 0")
+    fee, paid = enrollment[4] or 0, enrollment[5]
+    if paid + amount > fee:
+        raise ValueError(f"cannot pay more than total fee (pending ₹{fee - paid})")
+    if mode not in database.PAYMENT_MODES:
+        raise ValueError(f"mode must be one of {', '.join(database.PAYMENT_MODES)}")
+    return database.add_payment(enrollment_id, amount, date, mode)
+
+
+def write_receipt_pdf(payment, directory=RECEIPTS_DIR):
+    """PDF receipt for a (payment_id, receipt_no, student_id, name, course, amount, date, mode) row.
+
+    Drawn by receipt_printer, so it matches the receipts the windows print;
+    Qt runs without a display unless QT_QPA_PLATFORM says otherwise.
+    """
+    global _qt_app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QGuiApplication
+    from receipt_printer import receipt_path, write_receipt_pdf as draw_receipt
+    if QGuiApplication.instance() is None:
+        _qt_app = QGuiApplication(sys.argv[:1])
+
+    filename = receipt_path(payment[1], directory)
+    if not draw_receipt(payment, filename, payment[7]):
+        raise SystemExit(f"Could not write {filename}")
+    return filename
+
+
+def cmd_students_list(args):
+    rows = database.get_students_page(args.search or "", -1, 0)
+    write_rows(STUDENT_FIELDS, rows, args.format, args.output)
+
+
+def cmd_students_import(args):
+    failures = 0
+    for line, row in enumerate(read_rows(args.file, ("name", "phone")), start=2):
+        if not row["name"] or not row["phone"]:
+            print(f"line {line}: name and phone are required", file=sys.stderr)
+            failures += 1
+            continue
+        student_id = database.add_student(row["name"], row["phone"], row.get("email", ""), row.get("address", ""))
+        print(f"{student_id}\t{row['name']}")
+    return failures
+
+
+def cmd_enrollments(args):
+    write_rows(ENROLLMENT_FIELDS, database.get_enrollments_by_student_identifier(args.student), args.format)
+
+
+def cmd_payments_add(args):
+    date = args.date or datetime.now().strftime("%Y-%m-%d")
+    try:
+        receipt_no = record_payment(args.enrollment_id, args.amount, date, args.mode)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(receipt_no)
+    if args.receipt:
+        print(write_receipt_pdf(database.get_receipt(receipt_no), args.dir))
+    return 0
+
+
+def cmd_payments_import(args):
+    today = datetime.now().strftime("%Y-%m-%d")
+    failures = 0
+    for line, row in enumerate(read_rows(args.file, ("enrollment_id", "amount")), start=2):
+        try:
+            receipt_no = record_payment(int(row["enrollment_id"]), int(row["amount"]), row.get("date") or today,
+                                        row.get("mode") or "Cash")
+        except ValueError as e:
+            print(f"line {line}: {e}", file=sys.stderr)
+            failures += 1
+            continue
+        if args.receipts:
+            write_receipt_pdf(database.get_receipt(receipt_no), args.dir)
+        print(f"{receipt_no}\t{row['enrollment_id']}\t{row['amount']}")
+    return failures
+
+
+def cmd_history(args):
+    write_rows(PAYMENT_FIELDS, database.get_payment_history(args.student, args.course), args.format, args.output)
+
+
+def cmd_receipts(args):
+    receipt_numbers = args.receipt_no
+    if receipt_numbers == ["-"]:
+        receipt_numbers = [line.strip() for line in sys.stdin if line.strip()]
+    failures = 0
+    for receipt_no in receipt_numbers:
+        payment = database.get_receipt(receipt_no)
+        if payment is None:
+            print(f"{receipt_no}: receipt not found", file=sys.stderr)
+            failures += 1
+            continue
+        print(write_receipt_pdf(payment, args.dir))
+    return failures
+
+
+def cmd_dues(args):
+    if args.overdue:
+        rows = database.get_overdue_fees()
+    else:
+        rows = database.get_fee_dues(args.start, args.end)
+    write_rows(DUE_FIELDS, rows, args.format, args.output)
+
+
+def confirm_restore(args):
+    """restore replaces the live database, so it needs --yes or an answer typed at a terminal"""
+    if args.yes:
+        return True
+    if not sys.stdin.isatty():
+        print(f"restore replaces {database.DB_NAME}; pass --yes to confirm", file=sys.stderr)
+        return False
+    answer = input(f"Replace {database.DB_NAME} with the latest backup? [y/N] ")
+    return answer.strip().lower() in ("y", "yes")
+
+
+def cmd_backup_job(args):
+    from backup_jobs import BackupJob, load_backup_config
+
+    if args.command == "restore" and not confirm_restore(args):
+        return 1
+
+    job = BackupJob(args.command, load_backup_config(), trigger="cli",
+                    status=lambda message: print(message, file=sys.stderr))
+    results = job.run()
+    print(results.get("summary") or results.get("message") or json.dumps(results))
+    return 0 if results.get("success") else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Institute Management System command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    students = commands.add_parser("students", help="list or import students").add_subparsers(
+        dest="action", required=True)
+    students_list = students.add_parser("list")
+    students_list.add_argument("--search")
+    students_list.add_argument("--format", choices=("csv", "json"), default="csv")
+    students_list.add_argument("--output")
+    students_list.set_defaults(handler=cmd_students_list)
+    students_import = students.add_parser("import", help="add students from a CSV file (- for stdin)")
+    students_import.add_argument("file")
+    students_import.set_defaults(handler=cmd_students_import)
+
+    enrollments = commands.add_parser("enrollments", help="a student's enrollments with amounts paid")
+    enrollments.add_argument("student", help="student id or name")
+    enrollments.add_argument("--format", choices=("csv", "json"), default="csv")
+    enrollments.set_defaults(handler=cmd_enrollments)
+
+    payments = commands.add_parser("payments", help="record payments").add_subparsers(dest="action", required=True)
+    payments_add = payments.add_parser("add")
+    payments_add.add_argument("enrollment_id", type=int)
+    payments_add.add_argument("amount", type=int)
+    payments_add.add_argument("--date", help="YYYY-MM-DD (default today)")
+    payments_add.add_argument("--mode", default="Cash", choices=database.PAYMENT_MODES)
+    payments_add.add_argument("--receipt", action="store_true", help="also write the PDF receipt")
+    payments_add.add_argument("--dir", default=RECEIPTS_DIR)
+    payments_add.set_defaults(handler=cmd_payments_add)
+    payments_import = payments.add_parser("import", help="record payments from a CSV file (- for stdin)")
+    payments_import.add_argument("file")
+    payments_import.add_argument("--receipts", action="store_true", help="also write PDF receipts")
+    payments_import.add_argument("--dir", default=RECEIPTS_DIR)
+    payments_import.set_defaults(handler=cmd_payments_import)
+
+    history = commands.add_parser("history", help="export payment history")
+    history.add_argument("student", help="student id or name (partial matches)")
+    history.add_argument("--course")
+    history.add_argument("--format", choices=("csv", "json"), default="csv")
+    history.add_argument("--output")
+    history.set_defaults(handler=cmd_history)
+
+    receipts = commands.add_parser("receipts", help="write PDF receipts")
+    receipts.add_argument("receipt_no", nargs="+", help="receipt numbers, or - to read them from stdin")
+    receipts.add_argument("--dir", default=RECEIPTS_DIR)
+    receipts.set_defaults(handler=cmd_receipts)
+
+    dues = commands.add_parser("dues", help="unpaid installments by due date")
+    dues.add_argument("--from", dest="start", help="YYYY-MM-DD (default: no lower bound)")
+    dues.add_argument("--to", dest="end", help="YYYY-MM-DD, inclusive (default: no upper bound)")
+    dues.add_argument("--overdue", action="store_true", help="only installments due before today")
+    dues.add_argument("--format", choices=("csv", "json"), default="csv")
+    dues.add_argument("--output")
+    dues.set_defaults(handler=cmd_dues)
+
+    for name, help_text in (("backup", "back up to the configured destinations"),
+                            ("restore", "restore the latest backup"),
+                            ("ship", "ship logged changes to the configured destinations")):
+        job = commands.add_parser(name, help=help_text)
+        if name == "restore":
+            job.add_argument("--yes", action="store_true", help="do not ask before replacing the database")
+        job.set_defaults(handler=cmd_backup_job)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    database.initialize_db()
+    failures = args.handler(args)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
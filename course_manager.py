@@ -1,14 +1,40 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QSizePolicy, QHeaderView, QAbstractItemView, QTabWidget
+    QTableView, QMessageBox, QSizePolicy, QHeaderView, QAbstractItemView, QTabWidget, QCheckBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-from database import get_courses, add_course, delete_course, course_exists
-from student_manager import StudentManager
-from enroll_student import EnrollStudent
-from record_payment import RecordPayment
-from view_payment_history import ViewPaymentHistory
+from data_source import data_source, SyncedRows
+from table_models import FilteredTableModel, EditBuffer, delete_action
+
+COURSE_COLUMNS = ("id", "name", "fee", "duration")
+
+
+def course_name_error(name):
+    if not name:
+        return "Course name is required."
+    if name.isdigit():
+        return "Course name cannot be only numbers."
+    if not any(c.isalpha() for c in name):
+        return "Course name must contain letters."
+    if not name.replace(' ', '').isalnum():
+        return "Course name must not contain special characters."
+    return None
+
+
+def fee_error(fee):
+    if not fee.isdigit():
+        return "Fee must be a number."
+    if int(fee) <= 0 or int(fee) > 1000000:
+        return "Fee must be between 1 and 1,000,000."
+    return None
+
+
+def duration_error(duration):
+    if not duration.isdigit():
+        return "Duration must be an integer (months)."
+    if int(duration) <= 0 or int(duration) > 60:
+        return "Duration must be between 1 and 60 months."
+    return None
 
 
 class CourseManager(QWidget):
@@ -16,72 +42,6 @@ class CourseManager(QWidget):
         super().__init__()
         self.setWindowTitle("Course Manager")
         self.setGeometry(150, 150, 800, 700)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QLabel {
-                color: #2c3e50;
-                font-weight: 600;
-                font-size: 12px;
-                margin: 5px 0px;
-            }
-            QLineEdit {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 10px;
-                font-size: 12px;
-                color: #495057;
-            }
-            QLineEdit:focus {
-                border-color: #3498db;
-                background-color: #f8f9fa;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 12px 20px;
-                border-radius: 6px;
-                font-size: 12px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-            }
-            QTableWidget {
-                background-color: white;
-                alternate-background-color: #f8f9fa;
-                gridline-color: #dee2e6;
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-            }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #f1f3f4;
-            }
-            QTableWidget::item:selected {
-                background-color: #3498db;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2c3e50;
-                color: white;
-                padding: 12px;
-                border: none;
-                font-weight: bold;
-                font-size: 11px;
-            }
-            QHeaderView::section:hover {
-                background-color: #34495e;
-            }
-        """)
 
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -89,45 +49,12 @@ class CourseManager(QWidget):
 
         # Title section
         title_label = QLabel("📚 Course Management")
-        title_label.setStyleSheet("""
-            font-size: 18px;
-            font-weight: bold;
-            color: #2c3e50;
-            margin: 10px 0px 20px 0px;
-            padding: 15px;
-            background-color: white;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-        """)
+        title_label.setProperty("role", "title")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
 
         # Create tab widget
         self.tab_widget = QTabWidget()
-        self.tab_widget.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-                background-color: white;
-            }
-            QTabBar::tab {
-                background-color: #f8f9fa;
-                color: #495057;
-                padding: 12px 20px;
-                margin-right: 2px;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-                font-weight: bold;
-            }
-            QTabBar::tab:selected {
-                background-color: white;
-                color: #2c3e50;
-                border-bottom: 2px solid #3498db;
-            }
-            QTabBar::tab:hover {
-                background-color: #e9ecef;
-            }
-        """)
         layout.addWidget(self.tab_widget)
 
         # Create tabs
@@ -135,7 +62,10 @@ class CourseManager(QWidget):
         self.create_add_tab()
 
         self.setLayout(layout)
-        self.refresh_course_list()
+        # Rows by id, kept current from the change journal after the first full load
+        self.courses = SyncedRows("courses", COURSE_COLUMNS, parent=self)
+        self.courses.updated.connect(self.update_course_model)
+        self.update_course_model(None)
 
     def create_listing_tab(self):
         """Create the listing tab with search and table"""
@@ -149,15 +79,23 @@ class CourseManager(QWidget):
         self.search_input.setPlaceholderText("Search by course name...")
         self.search_input.textChanged.connect(self.filter_courses)
         self.search_input.setFixedHeight(45)
-        self.search_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.search_input)
 
-        self.course_table = QTableWidget()
-        self.course_table.setColumnCount(5)
-        self.course_table.setHorizontalHeaderLabels(["ID", "Name", "Fee", "Duration (months)", "Delete"])
-        self.course_table.setEditTriggers(QTableWidget.DoubleClicked | QTableWidget.SelectedClicked)
-        self.course_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.course_table.setSelectionMode(QTableWidget.SingleSelection)
+        # Cell edits are saved together, a couple of seconds after the last one or on Save
+        self.edit_buffer = EditBuffer(self.validate_course_edit, self.save_course_edits, parent=self)
+        self.edit_buffer.failed.connect(lambda message: QMessageBox.warning(self, "Input Error", message))
+        self.edit_buffer.edits_changed.connect(self.update_edit_status)
+        self.course_model = FilteredTableModel(
+            [("ID", 0, None), ("Name", 1, None), ("Fee", 2, lambda fee: f"₹{fee}"), ("Duration (months)", 3, None)],
+            search_fields=(1,),
+            action=delete_action("Delete this course"),
+            editable_columns=(1, 2, 3),
+            edit_buffer=self.edit_buffer
+        )
+        self.course_table = QTableView()
+        self.course_table.setModel(self.course_model)
+        self.course_table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked)
+        self.course_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.course_table.setSortingEnabled(True)
         self.course_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.course_table.verticalHeader().setDefaultSectionSize(35)
@@ -166,10 +104,23 @@ class CourseManager(QWidget):
         # Set fixed width for the delete column
         header.setSectionResizeMode(4, QHeaderView.Fixed)
         self.course_table.setColumnWidth(4, 60)
-        self.course_table.itemChanged.connect(self.handle_item_changed)
+        self.course_table.clicked.connect(self.handle_table_click)
         self.course_table.setSelectionMode(QAbstractItemView.NoSelection)  # Only allow row selection via delete button
         layout.addWidget(self.course_table, stretch=1)
 
+        edit_layout = QHBoxLayout()
+        self.edit_status = QLabel("Double-click a cell to edit it.")
+        self.edit_status.setProperty("role", "hint")
+        edit_layout.addWidget(self.edit_status, stretch=1)
+        self.discard_button = QPushButton("Discard")
+        self.discard_button.clicked.connect(self.edit_buffer.discard)
+        edit_layout.addWidget(self.discard_button)
+        self.save_button = QPushButton("Save Changes")
+        self.save_button.clicked.connect(self.edit_buffer.flush)
+        edit_layout.addWidget(self.save_button)
+        layout.addLayout(edit_layout)
+        self.update_edit_status()
+
         listing_tab.setLayout(layout)
         self.tab_widget.addTab(listing_tab, "📋 Listing")
 
@@ -182,34 +133,27 @@ class CourseManager(QWidget):
 
         # Form section with better grouping
         form_group = QLabel("Add New Course")
-        form_group.setStyleSheet("""
-            font-size: 14px;
-            font-weight: bold;
-            color: #34495e;
-            margin: 15px 0px 10px 0px;
-            padding: 8px 0px;
-            border-bottom: 2px solid #3498db;
-        """)
+        form_group.setProperty("role", "section")
         layout.addWidget(form_group)
 
         self.course_input = QLineEdit()
         self.course_input.setPlaceholderText("Enter course name")
         self.course_input.setFixedHeight(45)
-        self.course_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.course_input)
 
         self.fee_input = QLineEdit()
         self.fee_input.setPlaceholderText("Enter course fee")
         self.fee_input.setFixedHeight(45)
-        self.fee_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.fee_input)
 
         self.duration_input = QLineEdit()
         self.duration_input.setPlaceholderText("Enter duration (e.g., 3 months)")
         self.duration_input.setFixedHeight(45)
-        self.duration_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.duration_input)
 
+        self.installments_check = QCheckBox("Collect the fee in monthly installments over the duration")
+        layout.addWidget(self.installments_check)
+
         self.add_button = QPushButton("Add Course")
         self.add_button.clicked.connect(self.handle_add_course)
         self.add_button.setFixedHeight(45)
@@ -231,156 +175,82 @@ class CourseManager(QWidget):
             QMessageBox.warning(self, "Input Error", "All fields are required.")
             return
 
-        # Validate course name
-        if name.isdigit():
-            QMessageBox.warning(self, "Input Error", "Course name cannot be only numbers.")
-            return
-        if not any(c.isalpha() for c in name):
-            QMessageBox.warning(self, "Input Error", "Course name must contain letters.")
-            return
-        if not name.replace(' ', '').isalnum():
-            QMessageBox.warning(self, "Input Error", "Course name must not contain special characters.")
-            return
-        if course_exists(name):
-            QMessageBox.warning(self, "Input Error", "A course with this name already exists.")
+        error = course_name_error(name) or fee_error(fee) or duration_error(duration)
+        if error is None and any(course[1].lower() == name.lower() for course in self.courses.rows_by_id.values()):
+            error = "A course with this name already exists."
+        if error:
+            QMessageBox.warning(self, "Input Error", error)
             return
 
-        # Validate fee
-        if not fee.isdigit():
-            QMessageBox.warning(self, "Input Error", "Fee must be a number.")
-            return
-        fee_int = int(fee)
-        if fee_int <= 0 or fee_int > 1000000:
-            QMessageBox.warning(self, "Input Error", "Fee must be between 1 and 1,000,000.")
-            return
-
-        # Validate duration
-        if not duration.isdigit():
-            QMessageBox.warning(self, "Input Error", "Duration must be an integer (months).")
-            return
-        duration_int = int(duration)
-        if duration_int <= 0 or duration_int > 60:
-            QMessageBox.warning(self, "Input Error", "Duration must be between 1 and 60 months.")
-            return
+        self.add_button.setEnabled(False)
+        data_source().call("add_course", name, int(fee), int(duration),
+                           int(duration) if self.installments_check.isChecked() else None,
+                           on_result=self.course_added, on_error=self.add_failed, context=self)
 
-        add_course(name, fee_int, duration_int)
+    def course_added(self, result):
+        self.add_button.setEnabled(True)
         self.course_input.clear()
         self.fee_input.clear()
         self.duration_input.clear()
-        self.refresh_course_list()
+        self.installments_check.setChecked(False)
         
         # Switch to listing tab to show the newly added course
         self.tab_widget.setCurrentIndex(0)
 
-    def refresh_course_list(self):
-        self.all_courses = get_courses()
-        self.course_table.blockSignals(True)
-        self.filter_courses()
-        self.course_table.blockSignals(False)
-
-    def add_delete_button(self, row, course_id):
-        btn = QPushButton()
-        icon = QIcon.fromTheme('user-trash')
-        if icon.isNull():
-            icon = QIcon.fromTheme('edit-delete')
-        if icon.isNull():
-            icon = QIcon.fromTheme('window-close')
-        if icon.isNull():
-            btn.setText("🗑️")
-        else:
-            btn.setIcon(icon)
-            btn.setText("")
-        btn.setToolTip('Delete this course')
-        btn.setFlat(True)
-        btn.setFixedSize(28, 20)
-        btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                border: none;
-                padding: 0px;
-                margin: 0px;
-            }
-            QPushButton:hover {
-                background-color: #ffebee;
-                border-radius: 3px;
-            }
-            QPushButton:pressed {
-                background-color: #ffcdd2;
-            }
-        """)
-        btn.clicked.connect(lambda _, cid=course_id: self.confirm_delete_course(cid))
-        self.course_table.setCellWidget(row, 4, btn)
+    def add_failed(self, message):
+        self.add_button.setEnabled(True)
+        QMessageBox.critical(self, "Course Not Added", message)
+
+    def update_course_model(self, changed):
+        courses_by_id = self.courses.rows_by_id
+        if changed is None:
+            self.course_model.set_records(courses_by_id[cid] for cid in sorted(courses_by_id))
+        elif changed:
+            self.course_model.update_records(courses_by_id, changed)
 
     def filter_courses(self):
-        filter_text = self.search_input.text().strip().lower() if hasattr(self, 'search_input') else ''
-        self.course_table.blockSignals(True)
-        self.course_table.setRowCount(0)
-        for course in getattr(self, 'all_courses', get_courses()):
-            course_id, name, fee, duration = course
-            if filter_text and filter_text not in name.lower():
-                continue
-            row_idx = self.course_table.rowCount()
-            self.course_table.insertRow(row_idx)
-            self.course_table.setItem(row_idx, 0, QTableWidgetItem(str(course_id)))
-            self.course_table.setItem(row_idx, 1, QTableWidgetItem(name))
-            self.course_table.setItem(row_idx, 2, QTableWidgetItem(f"₹{fee}"))
-            self.course_table.setItem(row_idx, 3, QTableWidgetItem(str(duration)))
-            self.add_delete_button(row_idx, course_id)
-        self.course_table.blockSignals(False)
+        self.course_model.set_filter(self.search_input.text())
+
+    def handle_table_click(self, index):
+        if index.column() == self.course_model.columnCount() - 1:
+            self.confirm_delete_course(self.course_model.record_at(index.row())[0])
 
     def confirm_delete_course(self, course_id):
         reply = QMessageBox.question(self, 'Confirm Delete', 'Are you sure you want to delete this course?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            delete_course(course_id)
-            self.refresh_course_list()
-
-    def handle_item_changed(self, item):
-        # Prevent editing ID column
-        if item.column() == 0:
-            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-            return
-        row = item.row()
-        course_id = int(self.course_table.item(row, 0).text())
-        name = self.course_table.item(row, 1).text().strip()
-        fee = self.course_table.item(row, 2).text().replace('₹', '').strip()
-        duration = self.course_table.item(row, 3).text().strip()
-
-        # Update database
-        from database import get_connection
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("UPDATE courses SET name=?, fee=?, duration=? WHERE id=?", (name, fee, duration, course_id))
-        conn.commit()
-        conn.close()
-        self.refresh_course_list()
-
-
-# Keep reference alive
-open_windows = []
-def open_course_manager():
-    cm_window = CourseManager()
-    cm_window.show()
-    cm_window.raise_()
-    open_windows.append(cm_window)
-
-def open_student_manager():
-    sm_window = StudentManager()
-    sm_window.show()
-    sm_window.raise_()
-    open_windows.append(sm_window)
-    
-def open_enroll_window():
-    enroll_window = EnrollStudent()
-    enroll_window.show()
-    open_windows.append(enroll_window)
-    
-def open_payment_window():
-    payment_window = RecordPayment()
-    payment_window.show()
-    open_windows.append(payment_window)
-    
-def open_payment_history():
-    win = ViewPaymentHistory()
-    win.show()
-    open_windows.append(win)
\ No newline at end of file
+            data_source().call("delete_course", course_id, on_error=self.show_error, context=self)
+
+    def validate_course_edit(self, course_id, field, text):
+        """(value to store, None) for an accepted cell edit, else (None, error message)"""
+        column = COURSE_COLUMNS[field]
+        if column == "name":
+            error = course_name_error(text)
+            # Other courses' names, including renames not saved yet
+            names = {str(self.edit_buffer.value(other_id, field, course[1])).lower()
+                     for other_id, course in self.courses.rows_by_id.items() if other_id != course_id}
+            if error is None and text.lower() in names:
+                error = "A course with this name already exists."
+            return (None, error) if error else (text, None)
+        text = text.replace('₹', '').strip()
+        error = fee_error(text) if column == "fee" else duration_error(text)
+        return (None, error) if error else (int(text), None)
+
+    def save_course_edits(self, edits):
+        data_source().call("update_rows", "courses", {
+            course_id: {COURSE_COLUMNS[field]: value for field, value in fields.items()}
+            for course_id, fields in edits.items()
+        }, on_error=lambda message: self.edit_buffer.failed.emit(f"Changes were not saved: {message}"), context=self)
+
+    def show_error(self, message):
+        QMessageBox.critical(self, "Error", message)
+
+    def update_edit_status(self):
+        count = self.edit_buffer.pending_count()
+        self.edit_status.setText(f"{count} unsaved change(s)" if count else "Double-click a cell to edit it.")
+        self.save_button.setEnabled(bool(count))
+        self.discard_button.setEnabled(bool(count))
+
+    def closeEvent(self, event):
+        self.edit_buffer.flush()
+        super().closeEvent(event)
@@ -0,0 +1,142 @@
+import time
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QTabWidget
+)
+from PyQt5.QtCore import Qt, QTimer
+from analytics import fee_summary, outstanding_by_course, collections_by_day, collections_by_month, dues_aging
+from report_snapshot import refresh_snapshot, open_snapshot
+from database import get_overdue_fees
+from change_events import change_events, tables_changed
+
+
+class NumberItem(QTableWidgetItem):
+    """Table item showing formatted text but sorting by its numeric value"""
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.value = value
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        if isinstance(other, NumberItem):
+            return self.value < other.value
+        return super().__lt__(other)
+
+
+class Dashboard(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Fee Dashboard")
+        self.setGeometry(200, 200, 900, 650)
+
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(25, 25, 25, 25)
+
+        # Title section
+        title_label = QLabel("📈 Fee Dashboard")
+        title_label.setProperty("role", "title")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+
+        # Summary figures
+        summary_layout = QHBoxLayout()
+        self.summary_labels = {}
+        for key, caption in [("fees", "Total Fees"), ("paid", "Collected"), ("outstanding", "Outstanding"),
+                             ("enrollments_with_dues", "Enrollments with Dues")]:
+            box = QVBoxLayout()
+            caption_label = QLabel(caption)
+            caption_label.setProperty("role", "field")
+            caption_label.setAlignment(Qt.AlignCenter)
+            box.addWidget(caption_label)
+            value_label = QLabel("-")
+            value_label.setProperty("role", "info")
+            value_label.setAlignment(Qt.AlignCenter)
+            box.addWidget(value_label)
+            self.summary_labels[key] = value_label
+            summary_layout.addLayout(box)
+        layout.addLayout(summary_layout)
+
+        self.tab_widget = QTabWidget()
+        self.course_table = self.add_report_tab("📚 By Course", ["Course", "Enrollments", "Fees", "Collected", "Outstanding"])
+        self.aging_table = self.add_report_tab("⏳ Dues Aging", ["Since Enrollment", "Enrollments", "Outstanding"])
+        self.month_table = self.add_report_tab("🗓️ Monthly", ["Month", "Payments", "Collected"])
+        self.day_table = self.add_report_tab("📅 Daily", ["Date", "Payments", "Collected"])
+        self.overdue_table = self.add_report_tab(
+            "🔔 Overdue", ["Student ID", "Student", "Course", "Installment", "Due Date", "Owed"])
+        layout.addWidget(self.tab_widget, stretch=1)
+
+        self.timing_label = QLabel("")
+        self.timing_label.setProperty("role", "hint")
+        layout.addWidget(self.timing_label)
+
+        self.setLayout(layout)
+
+        # Coalesce bursts of changes (e.g. a restore) into one reload
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(300)
+        self.reload_timer.timeout.connect(self.refresh)
+        self.refresh()
+        change_events().rows_changed.connect(self.apply_changes)
+
+    def add_report_tab(self, title, headers):
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectRows)
+        table.setSortingEnabled(True)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tab_widget.addTab(table, title)
+        return table
+
+    def apply_changes(self, changes):
+        if tables_changed(changes) & {"enrollments", "payments"}:
+            self.reload_timer.start()
+
+    def refresh(self):
+        start = time.perf_counter()
+        # Reports read the memory-mapped snapshot; only rows added since the last refresh come from the database
+        refreshed = refresh_snapshot()
+        ledger = open_snapshot().ledger()
+        loaded = time.perf_counter()
+
+        summary = fee_summary(ledger)
+        courses = outstanding_by_course(ledger)
+        aging = dues_aging(ledger)
+        months = collections_by_month(ledger)
+        days = collections_by_day(ledger)
+        # Read from the open-dues index rather than the snapshot
+        overdue = get_overdue_fees()
+        computed = time.perf_counter()
+
+        for key, label in self.summary_labels.items():
+            value = summary[key]
+            label.setText(f"₹{value:,}" if key != "enrollments_with_dues" else f"{value:,}")
+        self.fill_table(self.course_table, [
+            (row["course"], row["enrollments"], row["fees"], row["paid"], row["outstanding"]) for row in courses
+        ], money_columns=(2, 3, 4))
+        self.fill_table(self.aging_table, aging, money_columns=(2,))
+        self.fill_table(self.month_table, reversed(months), money_columns=(2,))
+        self.fill_table(self.day_table, reversed(days), money_columns=(2,))
+        self.fill_table(self.overdue_table, [row[1:] for row in overdue], money_columns=(5,))
+
+        self.timing_label.setText(
+            f"{summary['enrollments']:,} enrollments, {summary['payments']:,} payments - "
+            f"snapshot refreshed ({refreshed['mode']}) in {(loaded - start) * 1000:.0f} ms, "
+            f"reports computed in {(computed - loaded) * 1000:.1f} ms")
+
+    def fill_table(self, table, rows, money_columns=()):
+        table.setSortingEnabled(False)
+        table.setRowCount(0)
+        for values in rows:
+            row_idx = table.rowCount()
+            table.insertRow(row_idx)
+            for col, value in enumerate(values):
+                if isinstance(value, int):
+                    item = NumberItem(f"₹{value:,}" if col in money_columns else f"{value:,}", value)
+                else:
+                    item = QTableWidgetItem(str(value))
+                table.setItem(row_idx, col, item)
+        table.setSortingEnabled(True)
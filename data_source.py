@@ -0,0 +1,334 @@
+"""Where the windows get their data: this PC's database, or a shared api_server.py.
+
+Windows ask data_source() for database.py operations by name and get the
+result back through a Qt signal, on the GUI thread:
+
+    data_source().call("get_payment_history", student_key, course_key,
+                       on_result=self.show_payments, on_error=self.show_error, context=self)
+
+LocalDataSource runs the function from database.py at once, as the windows
+always have. HttpDataSource (used when INSTITUTE_API_URL is set, e.g.
+http://192.168.1.10:8000) sends the calls to the API server from a
+background asyncio thread, so the GUI never waits on the network: calls
+made within a few milliseconds of each other go out as one /api/batch
+request, and up to max_in_flight batches are on the wire at once. A write
+is only sent after every earlier call has been answered, and later calls
+wait for it, so results never reflect an order the window did not ask for.
+Both sources emit rows_changed with change journal entries, like
+change_events(); the HTTP source polls the server's journal for it.
+SyncedRows keeps a window's {id: row} copy of a table current from them.
+"""
+import os
+import json
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import database
+from change_events import change_events
+
+READ_OPERATIONS = (
+    "get_all_students", "get_courses", "get_all_courses", "get_table_rows", "get_rows_by_ids",
+    "get_student_enrollments", "get_student_enrollment_dates",
+    "get_enrollments_by_student_identifier", "get_enrollment", "get_total_paid", "get_payment_history",
+    "get_receipt", "get_enrollment_balances", "get_fee_dues", "get_overdue_fees", "course_exists", "can_unenroll",
+    "get_changes_since", "get_latest_change_seq",
+)
+WRITE_OPERATIONS = (
+    "add_student", "delete_student", "add_course", "delete_course", "update_rows", "enroll_student",
+    "unenroll_student", "add_payment", "add_payments",
+)
+# Operations returning a single row (or None) rather than a list of rows
+ROW_OPERATIONS = ("get_enrollment", "get_receipt")
+
+
+class DataSource(QObject):
+    """Runs database.py operations and delivers their results on the GUI thread"""
+    finished = pyqtSignal(int, object)  # request id, result
+    failed = pyqtSignal(int, str)       # request id, error message
+    # List of (seq, table_name, row_id, op) change journal entries
+    rows_changed = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.next_id = 0
+        self.callbacks = {}
+        self.finished.connect(self.deliver_result)
+        self.failed.connect(self.deliver_error)
+
+    def call(self, operation, *args, on_result=None, on_error=None, context=None):
+        """Run operation(*args); on_result(result) or on_error(message) is called on the GUI thread.
+
+        Callbacks are dropped if context (usually the calling window) has
+        been deleted by the time the result arrives. Returns a request id.
+        """
+        if operation not in READ_OPERATIONS and operation not in WRITE_OPERATIONS:
+            raise ValueError(f"Unknown data source operation: {operation}")
+        self.next_id += 1
+        request_id = self.next_id
+        self.callbacks[request_id] = (on_result, on_error, context)
+        self.submit(request_id, operation, args)
+        return request_id
+
+    def submit(self, request_id, operation, args):
+        raise NotImplementedError
+
+    def take_callbacks(self, request_id):
+        on_result, on_error, context = self.callbacks.pop(request_id, (None, None, None))
+        if context is not None and sip.isdeleted(context):
+            return None, None
+        return on_result, on_error
+
+    def deliver_result(self, request_id, result):
+        on_result, _ = self.take_callbacks(request_id)
+        if on_result:
+            on_result(result)
+
+    def deliver_error(self, request_id, message):
+        _, on_error = self.take_callbacks(request_id)
+        if on_error:
+            on_error(message)
+        else:
+            print(f"⚠️ Data source request failed: {message}")
+
+
+class LocalDataSource(DataSource):
+    """Calls database.py directly; results are delivered before call() returns"""
+    def __init__(self):
+        super().__init__()
+        change_events().rows_changed.connect(self.rows_changed)
+
+    def submit(self, request_id, operation, args):
+        try:
+            result = getattr(database, operation)(*args)
+        except Exception as e:
+            self.failed.emit(request_id, str(e))
+            return
+        self.finished.emit(request_id, result)
+
+
+class HttpDataSource(DataSource):
+    """Sends operations to api_server.py in batches from a background asyncio loop"""
+    def __init__(self, base_url, token=None, batch_size=50, batch_delay=0.005, max_in_flight=4,
+                 poll_interval=3.0, timeout=30):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        # Loop state, only touched from the loop thread
+        self.pending = []
+        self.flush_scheduled = False
+        self.in_flight = set()
+        self.last_write = None
+        self.change_seq = None
+
+        self.loop = asyncio.new_event_loop()
+        # Blocking HTTP requests run here; max_in_flight of them can overlap
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="data-source-http")
+        self.thread = threading.Thread(target=self.run_loop, name="data-source", daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        if self.poll_interval:
+            self.loop.create_task(self.poll_changes())
+        self.loop.run_forever()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
+
+    def submit(self, request_id, operation, args):
+        self.loop.call_soon_threadsafe(self.enqueue, request_id, operation, list(args))
+
+    # Everything below runs on the loop thread
+
+    def enqueue(self, request_id, operation, args):
+        self.pending.append((request_id, operation, args))
+        if not self.flush_scheduled:
+            # Give calls made by the same GUI action a moment to join this batch
+            self.flush_scheduled = True
+            self.loop.call_later(self.batch_delay, self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        while self.pending:
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            writes = any(operation in WRITE_OPERATIONS for _, operation, _ in batch)
+            if writes:
+                waits_for = list(self.in_flight)
+            else:
+                waits_for = [self.last_write] if self.last_write and not self.last_write.done() else []
+            task = self.loop.create_task(self.send_batch(batch, waits_for))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+            if writes:
+                self.last_write = task
+
+    async def send_batch(self, batch, waits_for):
+        if waits_for:
+            await asyncio.wait(waits_for)
+        calls = [{"op": operation, "args": args} for _, operation, args in batch]
+        try:
+            results = await self.loop.run_in_executor(self.executor, self.post_batch, calls)
+        except (OSError, ValueError) as e:
+            for request_id, _, _ in batch:
+                self.failed.emit(request_id, f"Server unreachable: {e}")
+            return
+        for (request_id, operation, _), outcome in zip(batch, results):
+            if "error" in outcome:
+                self.failed.emit(request_id, outcome["error"])
+            else:
+                self.finished.emit(request_id, decode_result(operation, outcome.get("result")))
+
+    def post_batch(self, calls):
+        body = json.dumps({"calls": calls}).encode("utf-8")
+        request = urllib.request.Request(f"{self.base_url}/api/batch", data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                results = json.loads(response.read().decode("utf-8"))["results"]
+        except urllib.error.HTTPError as e:
+            raise ValueError(f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')[:200]}")
+        if len(results) != len(calls):
+            raise ValueError("Batch response does not match the request")
+        return results
+
+    async def poll_changes(self):
+        """Relay the server's change journal as rows_changed, so windows see other desks' writes"""
+        while True:
+            try:
+                if self.change_seq is None:
+                    self.change_seq = (await self.fetch("get_latest_change_seq")) or 0
+                while True:
+                    changes = await self.fetch("get_changes_since", self.change_seq, None, 1000)
+                    if not changes:
+                        break
+                    changes = [tuple(change) for change in changes]
+                    self.change_seq = changes[-1][0]
+                    self.rows_changed.emit(changes)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not poll changes from {self.base_url}: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def fetch(self, operation, *args):
+        outcome = (await self.loop.run_in_executor(
+            self.executor, self.post_batch, [{"op": operation, "args": list(args)}]))[0]
+        if "error" in outcome:
+            raise ValueError(outcome["error"])
+        return outcome["result"]
+
+
+class SyncedRows(QObject):
+    """An {id: row} copy of a captured table, loaded through data_source() and kept current from rows_changed.
+
+    updated is emitted with the set of changed ids, or None after a full
+    (re)load. One request is in flight at a time; journal entries arriving
+    meanwhile are merged into the next, so rows are never applied out of order.
+    """
+    updated = pyqtSignal(object)
+
+    def __init__(self, table, columns, parent=None):
+        super().__init__(parent)
+        self.table = table
+        self.columns = columns
+        self.rows_by_id = {}
+        self.change_seq = None
+        self.queued = []
+        self.busy = False
+        data_source().rows_changed.connect(self.apply_changes)
+        self.reload()
+
+    def reload(self):
+        self.busy = True
+        self.queued = []  # The reload reads every row after these changes
+        source = data_source()
+        # One batch, so the rows are read after the sequence number and no later change can be missed
+        source.call("get_latest_change_seq", on_result=self.set_change_seq, on_error=self.request_failed, context=self)
+        source.call("get_table_rows", self.table, self.columns,
+                    on_result=self.set_rows, on_error=self.request_failed, context=self)
+
+    def set_change_seq(self, seq):
+        self.change_seq = seq or 0
+
+    def set_rows(self, rows):
+        self.rows_by_id = {row[0]: row for row in rows}
+        self.finish(None)
+
+    def apply_changes(self, changes):
+        self.queued.extend(changes)
+        if not self.busy:
+            self.apply_queued()
+
+    def apply_queued(self):
+        if self.change_seq is None:
+            self.reload()  # The first load failed
+            return
+        changes = [change for change in self.queued if change[0] > self.change_seq]
+        self.queued = []
+        if not changes:
+            return
+        self.change_seq = max(change[0] for change in changes)
+        latest_ops = database.latest_row_ops(self.table, changes)
+        if latest_ops is None:
+            self.reload()
+        elif latest_ops:
+            self.busy = True
+            live_ids = [row_id for row_id, op in latest_ops.items() if op != "DELETE"]
+            data_source().call("get_rows_by_ids", self.table, self.columns, live_ids,
+                               on_result=lambda rows: self.set_changed_rows(latest_ops, rows),
+                               on_error=self.request_failed, context=self)
+
+    def set_changed_rows(self, latest_ops, rows):
+        for row_id in latest_ops:
+            self.rows_by_id.pop(row_id, None)  # deleted, or deleted again before the rows were read
+        for row in rows:
+            self.rows_by_id[row[0]] = row
+        self.finish(set(latest_ops))
+
+    def finish(self, changed):
+        self.busy = False
+        self.updated.emit(changed)
+        if self.queued:
+            self.apply_queued()
+
+    def request_failed(self, message):
+        print(f"⚠️ Could not load {self.table}: {message}")
+        # Reload in full on the next change rather than keep rows that may be stale
+        self.busy = False
+        self.change_seq = None
+
+
+def decode_result(operation, result):
+    """Rows arrive as JSON lists; give them back as tuples, as database.py returns them"""
+    if operation in ROW_OPERATIONS:
+        return tuple(result) if result is not None else None
+    if isinstance(result, list):
+        return [tuple(item) if isinstance(item, list) else item for item in result]
+    return result
+
+
+_data_source = None
+
+
+def data_source():
+    """The application-wide data source: HttpDataSource when INSTITUTE_API_URL is set, else LocalDataSource"""
+    global _data_source
+    if _data_source is None:
+        url = os.environ.get("INSTITUTE_API_URL")
+        if url:
+            _data_source = HttpDataSource(url, token=os.environ.get("INSTITUTE_API_TOKEN"))
+        else:
+            _data_source = LocalDataSource()
+    return _data_source
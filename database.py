@@ -1,76 +1,760 @@
+import os
 import sqlite3
-from datetime import datetime
+import calendar
+import functools
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 import uuid
 
 DB_NAME="institute.db"
 
+# Bump whenever the schema changes; stored in PRAGMA user_version and backup manifests
+SCHEMA_VERSION = 6
+
+# Tables whose row changes are captured in change_log, with the columns recorded for replay
+CAPTURED_TABLES = {
+    "courses": ("id", "name", "fee", "duration"),
+    "students": ("id", "student_id", "name", "phone", "email", "address"),
+    "enrollments": ("id", "student_id", "student_name", "course_name", "course_fee", "course_duration", "enrollment_date",
+                    "course_id"),
+    "payments": ("id", "enrollment_id", "amount", "receipt_no", "date", "mode"),
+    "installment_plans": ("id", "course_id", "installments", "interval_months")
+}
+
+PAYMENT_MODES = ("Cash", "Cheque", "UPI", "Card", "Bank Transfer")
+
+# In-process listeners for row changes, see subscribe_changes()
+_change_listeners = []
+_published_seq = None
+_publish_lock = threading.Lock()
+
 def generate_receipt_no():
     # Format: RCP-YYYYMMDD-XXXX
     return f"RCP-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
 
+def allocate_receipt_nos(conn, count):
+    """count receipt numbers not used yet today, read in one range scan of the receipt_no index.
+
+    Random suffixes alone start colliding after a few hundred receipts in a
+    day, so suffixes already taken are skipped.
+    """
+    prefix = f"RCP-{datetime.now().strftime('%Y%m%d')}-"
+    used = {row[0] for row in conn.execute(
+        "SELECT receipt_no FROM payments WHERE receipt_no >= ? AND receipt_no < ?", (prefix, prefix[:-1] + "."))}
+    receipt_nos = []
+    while len(receipt_nos) < count:
+        if len(used) >= 16 ** 4:
+            raise ValueError("No receipt numbers left for today")
+        receipt_no = generate_receipt_no()
+        if receipt_no not in used:
+            used.add(receipt_no)
+            receipt_nos.append(receipt_no)
+    return receipt_nos
+
+class PooledConnection(sqlite3.Connection):
+    """Connection handed out by get_connection() while pooling is on; close() returns it to the pool"""
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        _connection_pool.release(self)
+
+    def discard(self):
+        sqlite3.Connection.close(self)
+
+class ConnectionPool:
+    """Idle connections to DB_NAME kept open for reuse across calls and threads.
+
+    Reused connections keep SQLite's parsed schema and page cache, which
+    matters for a server answering many small queries. When the database
+    file is replaced (a restore swaps in a new file) the idle connections,
+    which still point at the old file, are dropped.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.idle = []
+        self.file_id = None
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        file_id = database_file_id()
+        with self.lock:
+            stale = []
+            if file_id != self.file_id:
+                stale, self.idle = self.idle, []
+                self.file_id = file_id
+            conn = self.idle.pop() if self.idle else None
+        for old_conn in stale:
+            old_conn.discard()
+        if conn is None:
+            conn = sqlite3.connect(DB_NAME, factory=PooledConnection, check_same_thread=False)
+            conn.file_id = file_id
+        return conn
+
+    def release(self, conn):
+        with self.lock:
+            if conn.file_id == self.file_id and len(self.idle) < self.size and conn not in self.idle:
+                self.idle.append(conn)
+                return
+        conn.discard()
+
+_connection_pool = None
+
+def database_file_id():
+    try:
+        stat = os.stat(DB_NAME)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+def database_file_state():
+    """Identity of DB_NAME plus SQLite's file change counter, which every committed write bumps.
+
+    The counter (header offset 24) is only kept in rollback journal mode,
+    so a WAL file's size and time are added for databases in WAL mode.
+    """
+    try:
+        with open(DB_NAME, "rb") as f:
+            stat = os.fstat(f.fileno())
+            header = f.read(28)
+    except OSError:
+        return None
+    state = (stat.st_dev, stat.st_ino, header[24:28])
+    try:
+        wal = os.stat(DB_NAME + "-wal")
+    except OSError:
+        return state
+    return state + (wal.st_mtime_ns, wal.st_size)
+
+class ReadCache:
+    """Size-bounded LRU cache of reads from tables that rarely change (courses, students).
+
+    Entries are keyed by function and arguments and remember the tables
+    they were read from. The write functions here drop the entries of the
+    tables they change. Writes made by other processes (the CLI, a restore
+    from the scheduler) are noticed when the database file's change counter
+    moves; the change journal then tells which tables to drop.
+    """
+    def __init__(self, size=128):
+        self.size = size
+        self.entries = OrderedDict()  # key -> (tables, value), least recently used first
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so a read that raced with a write is not stored
+        self.generation = 0
+        self.file_state = None
+        self.change_seq = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, key):
+        """(True, value) for a cached entry, else (False, generation to hand to store())"""
+        self.check_file()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, self.generation
+
+    def store(self, key, tables, value, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (tables, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables=None):
+        """Drop the entries read from any of tables (every entry if tables is None)"""
+        with self.lock:
+            self.generation += 1
+            stale = [key for key, (entry_tables, _) in self.entries.items()
+                     if tables is None or not entry_tables.isdisjoint(tables)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+
+    def check_file(self):
+        state = database_file_state()
+        if state is not None and state == self.file_state:
+            return
+        conn = get_connection()
+        try:
+            if self.change_seq is None or self.file_state is None or state is None or state[:2] != self.file_state[:2]:
+                # First use, or the file was replaced: nothing cached can be trusted
+                tables = None
+                seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+            else:
+                rows = conn.execute("""
+                    SELECT table_name, MAX(seq) FROM change_log WHERE seq > ? GROUP BY table_name
+                """, (self.change_seq,)).fetchall()
+                tables = {table_name for table_name, _ in rows}
+                seq = max([row[1] for row in rows], default=self.change_seq)
+                oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+                if "" in tables or (oldest and self.change_seq < oldest - 1):
+                    tables = None  # restore marker, or the entries since the last check were pruned
+        except sqlite3.Error:
+            # No change journal yet (initialize_db() has not run): cache nothing for long
+            self.invalidate()
+            return
+        finally:
+            conn.close()
+        if tables is None or tables:
+            self.invalidate(tables)
+        with self.lock:
+            self.file_state, self.change_seq = state, seq
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+_read_cache = ReadCache()
+
+def cached_read(*tables):
+    """Serve the decorated read from the read cache; its entries are dropped when one of tables changes"""
+    tables = frozenset(tables)
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            key = (function.__name__,) + args
+            found, value = _read_cache.lookup(key)
+            if not found:
+                generation = value
+                value = function(*args)
+                _read_cache.store(key, tables, value, generation)
+            # Callers get their own list, so changing it cannot change the cached rows
+            return list(value) if isinstance(value, list) else value
+        return wrapper
+    return decorate
+
+def invalidate_reads(*tables):
+    """Drop cached reads of tables (all of them if none are named); for code writing to the database directly"""
+    _read_cache.invalidate(set(tables) or None)
+
+def get_read_cache_stats():
+    """Hit, miss, eviction and invalidation counts of the read cache, for diagnostics"""
+    return _read_cache.stats()
+
+def enable_connection_pool(size=8):
+    """Make get_connection() reuse connections; meant for long-running processes such as api_server.py"""
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = ConnectionPool(size)
+
 def get_connection():
+    if _connection_pool is not None:
+        return _connection_pool.acquire()
     return sqlite3.connect(DB_NAME)
 
 def initialize_db():
+    """Create any missing tables, indexes and triggers in a single transaction"""
     conn = sqlite3.connect(DB_NAME)
+    # Without an explicit transaction every CREATE statement commits (and syncs) on its own
+    conn.execute("BEGIN")
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                fee INTEGER,
+                duration INTEGER  -- Duration in months
+            )
+        """)
+        create_students_table(conn)
+        create_enrollments_table(conn)
+        upgrade_enrollments_table(conn)
+        create_payments_table(conn)
+        upgrade_payments_table(conn)
+        rollup_missing = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_collections'").fetchone()
+        create_daily_collections_table(conn)
+        if rollup_missing:
+            # New install, or a database (or restored backup) from before the rollup existed
+            fill_daily_collections(conn)
+        dues_missing = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='fee_dues'").fetchone()
+        create_installment_tables(conn)
+        if dues_missing:
+            # Enrollments made before installment plans existed: the whole fee falls due on enrollment
+            fill_fee_dues(conn)
+        create_change_log_table(conn)
+        create_change_triggers(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_schema_version(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return version
+
+def get_table_row_counts(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
     c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS courses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            fee INTEGER,
-            duration INTEGER  -- Duration in months
-        )
-    """)
-    conn.commit()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    tables = [row[0] for row in c.fetchall()]
+    counts = {}
+    for table in tables:
+        c.execute(f'SELECT COUNT(*) FROM "{table}"')
+        counts[table] = c.fetchone()[0]
     conn.close()
+    return counts
     
-    # create_courses_table()
-    create_students_table()
-    create_enrollments_table()
-    create_payments_table()
-    
-def create_payments_table():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""
+def create_payments_table(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS payments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             enrollment_id INTEGER,
             amount INTEGER,
             receipt_no TEXT UNIQUE,
-            date TEXT
+            date TEXT,
+            mode TEXT  -- Cash, Cheque, ... (NULL for payments recorded before modes existed)
         )
     """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_enrollment ON payments(enrollment_id)")
+
+def upgrade_payments_table(conn):
+    """Add columns introduced after the payments table was first created"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(payments)")}
+    if "mode" not in columns:
+        conn.execute("ALTER TABLE payments ADD COLUMN mode TEXT")
+        # The change triggers record a fixed column list; let create_change_triggers() rebuild them
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS payments_{op}_log")
+
+def create_installment_tables(conn):
+    """Installment plans per course, and the due schedule generated from them for each enrollment"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS installment_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL UNIQUE,
+            installments INTEGER NOT NULL,
+            interval_months INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fee_dues (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            enrollment_id INTEGER NOT NULL,
+            installment_no INTEGER NOT NULL,
+            due_date TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            due_total INTEGER NOT NULL,  -- fee due up to and including this installment
+            settled INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (enrollment_id, installment_no)
+        )
+    """)
+    # Only unpaid installments are indexed, so a due-date range over them never touches settled ones
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fee_dues_open ON fee_dues(due_date) WHERE settled = 0")
+
+def add_months(date, months):
+    """YYYY-MM-DD date months later, on the last day of the month where the day does not exist"""
+    year, month, day = (int(part) for part in date.split("-"))
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    day = min(day, calendar.monthrange(year, month + 1)[1])
+    return f"{year:04d}-{month + 1:02d}-{day:02d}"
+
+def installment_schedule(fee, start_date, installments=1, interval_months=1):
+    """(installment_no, due_date, amount, due_total) rows splitting fee into installments from start_date.
+
+    The first installment takes any remainder. Returns no rows when there
+    is no fee or the date is not a YYYY-MM-DD date.
+    """
+    try:
+        datetime.strptime(start_date or "", "%Y-%m-%d")
+    except ValueError:
+        return []
+    if not fee or fee <= 0:
+        return []
+    installments = max(1, min(installments or 1, fee))
+    amount, remainder = divmod(fee, installments)
+    schedule = []
+    due_total = 0
+    for number in range(installments):
+        part = amount + (remainder if number == 0 else 0)
+        due_total += part
+        schedule.append((number + 1, add_months(start_date, number * interval_months), part, due_total))
+    return schedule
+
+def add_fee_dues(conn, enrollment_id, course_id, fee, date):
+    """Generate an enrollment's due schedule from its course's installment plan (one due without a plan)"""
+    plan = conn.execute("SELECT installments, interval_months FROM installment_plans WHERE course_id = ?",
+                        (course_id,)).fetchone() or (1, 1)
+    conn.executemany("""
+        INSERT OR REPLACE INTO fee_dues (enrollment_id, installment_no, due_date, amount, due_total)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(enrollment_id,) + row for row in installment_schedule(fee, date, *plan)])
+
+def settle_fee_dues(conn, enrollment_id):
+    """Mark the installments the enrollment's payments now cover as settled"""
+    conn.execute("""
+        UPDATE fee_dues SET settled = 1
+        WHERE enrollment_id = ? AND settled = 0
+            AND due_total <= (SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = ?)
+    """, (enrollment_id, enrollment_id))
+
+def fill_fee_dues(conn):
+    """Add schedules for enrollments without one, drop orphaned dues and recompute which are settled"""
+    link_enrollment_courses(conn)
+    for enrollment_id, course_id, fee, date in conn.execute("""
+        SELECT id, course_id, course_fee, enrollment_date FROM enrollments e
+        WHERE NOT EXISTS (SELECT 1 FROM fee_dues d WHERE d.enrollment_id = e.id)
+    """).fetchall():
+        add_fee_dues(conn, enrollment_id, course_id, fee, date)
+    conn.execute("DELETE FROM fee_dues WHERE enrollment_id NOT IN (SELECT id FROM enrollments)")
+    conn.execute("""
+        UPDATE fee_dues SET settled = due_total <= (
+            SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = fee_dues.enrollment_id)
+    """)
+
+def rebuild_fee_dues(db_path=DB_NAME):
+    """Bring fee_dues in line with enrollments and payments, e.g. after replaying logged changes"""
+    conn = sqlite3.connect(db_path)
+    try:
+        create_installment_tables(conn)
+        fill_fee_dues(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_daily_collections_table(conn):
+    """Per day and course payment totals, kept current by add_payment"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_collections (
+            date TEXT NOT NULL,
+            course_name TEXT NOT NULL,
+            payments INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            PRIMARY KEY (date, course_name)
+        ) WITHOUT ROWID
+    """)
+
+def fill_daily_collections(conn):
+    conn.execute("DELETE FROM daily_collections")
+    conn.execute("""
+        INSERT INTO daily_collections (date, course_name, payments, amount)
+        SELECT IFNULL(p.date, ''), IFNULL(e.course_name, ''), COUNT(*), IFNULL(SUM(p.amount), 0)
+        FROM payments p
+        LEFT JOIN enrollments e ON e.id = p.enrollment_id
+        GROUP BY 1, 2
+    """)
+
+def rebuild_daily_collections(db_path=DB_NAME):
+    """Recompute the daily_collections rollup from the payments table"""
+    conn = sqlite3.connect(db_path)
+    try:
+        create_daily_collections_table(conn)
+        fill_daily_collections(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def add_to_daily_collections(conn, enrollment_id, amount, date):
+    conn.execute("""
+        INSERT INTO daily_collections (date, course_name, payments, amount)
+        SELECT IFNULL(?, ''), IFNULL((SELECT course_name FROM enrollments WHERE id = ?), ''), 1, IFNULL(?, 0)
+        WHERE true
+        ON CONFLICT (date, course_name) DO UPDATE
+        SET payments = payments + 1, amount = amount + excluded.amount
+    """, (date, enrollment_id, amount))
+
+def create_change_log_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER,
+            op TEXT NOT NULL,  -- 'INSERT', 'UPDATE', 'DELETE' or 'RESTORE'
+            row_data TEXT,     -- JSON image of the row after the change; NULL for deletes
+            changed_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log(table_name, seq)")
+
+def create_change_triggers(conn):
+    """Capture every committed row change of CAPTURED_TABLES into change_log"""
+    for table, columns in CAPTURED_TABLES.items():
+        row_image = "json_object(" + ", ".join(f"'{col}', NEW.{col}" for col in columns) + ")"
+        for op, row_id, row_data in (("INSERT", "NEW.id", row_image),
+                                     ("UPDATE", "NEW.id", row_image),
+                                     ("DELETE", "OLD.id", "NULL")):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{op.lower()}_log AFTER {op} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op, row_data, changed_at)
+                    VALUES ('{table}', {row_id}, '{op}', {row_data}, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'));
+                END
+            """)
+
+def drop_change_triggers(conn):
+    for table in CAPTURED_TABLES:
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_{op}_log")
+
+def get_latest_change_seq(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()
+    except sqlite3.OperationalError:
+        row = None  # Database predates the change log
+    conn.close()
+    return (row[0] if row else None) or 0
+
+def get_change_log_floor(db_path=DB_NAME):
+    """Sequence number up to which change_log entries may have been pruned; later entries are all kept"""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()
+    except sqlite3.OperationalError:
+        row = None  # Database predates the change log
+    conn.close()
+    return row[0] - 1 if row and row[0] else 0
+
+def prune_change_log(through_seq, before, db_path=DB_NAME):
+    """Delete change_log entries up to through_seq that were logged before `before`; returns the count.
+
+    Only a run of the oldest entries is deleted, so the journal stays
+    complete after get_change_log_floor(), and the newest entry is always
+    kept so sequence numbers carry on from it.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cutoff = conn.execute("""
+            SELECT MIN(?, IFNULL((SELECT MIN(seq) FROM change_log WHERE changed_at >= ?),
+                                 (SELECT MAX(seq) FROM change_log)) - 1,
+                       (SELECT MAX(seq) FROM change_log) - 1)
+        """, (through_seq, before)).fetchone()[0]
+        if cutoff is None:
+            return 0
+        deleted = conn.execute("DELETE FROM change_log WHERE seq <= ?", (cutoff,)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return deleted
+
+def get_changes_since(seq, tables=None, limit=None):
+    """Change journal entries after seq, oldest first, as (seq, table_name, row_id, op) tuples.
+
+    When tables is given only their changes are returned, plus any restore
+    markers (op 'RESTORE'), which mean every table may have changed. If the
+    entries after seq have been pruned (see prune_change_log), a restore
+    marker numbered get_change_log_floor() comes first, so callers reload
+    in full rather than miss changes.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    oldest = c.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+    pruned = [(oldest - 1, "", None, "RESTORE")] if oldest and seq < oldest - 1 else []
+    query = "SELECT seq, table_name, row_id, op FROM change_log WHERE seq > ?"
+    params = [seq]
+    if tables:
+        query += f" AND (table_name IN ({', '.join('?' * len(tables))}) OR op = 'RESTORE')"
+        params.extend(tables)
+    query += " ORDER BY seq"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    c.execute(query, params)
+    changes = pruned + c.fetchall()
+    conn.close()
+    return changes[:limit] if limit else changes
+
+def get_rows_by_ids(table, columns, ids):
+    """Rows of table with the given ids; columns[0] must be the id column"""
+    ids = list(ids)
+    rows = []
+    conn = get_connection()
+    c = conn.cursor()
+    # Stay well under SQLite's limit on bound parameters
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        c.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {columns[0]} IN ({', '.join('?' * len(batch))})", batch)
+        rows.extend(c.fetchall())
+    conn.close()
+    return rows
+
+def get_table_rows(table, columns):
+    conn = get_connection()
+    rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall()
+    conn.close()
+    return rows
+
+def latest_row_ops(table, changes):
+    """{row id: last op} for table's rows in change journal entries, or None if a restore means reloading it all"""
+    if any(op == "RESTORE" for _, _, _, op in changes):
+        return None
+    # Only the last operation on each row matters
+    latest_ops = {}
+    for _, table_name, row_id, op in changes:
+        if table_name == table:
+            latest_ops[row_id] = op
+    return latest_ops
+
+def apply_row_changes(rows_by_id, table, columns, changes):
+    """Apply change journal entries to an {id: row} cache of table.
+
+    Only the rows the entries touch are re-read. Returns the set of changed
+    ids, or None when the whole table had to be reloaded (after a restore).
+    """
+    latest_ops = latest_row_ops(table, changes)
+    if latest_ops is None:
+        rows_by_id.clear()
+        rows_by_id.update((row[0], row) for row in get_table_rows(table, columns))
+        return None
+
+    for row_id, op in latest_ops.items():
+        if op == "DELETE":
+            rows_by_id.pop(row_id, None)
+    live_ids = [row_id for row_id, op in latest_ops.items() if op != "DELETE"]
+    for row in get_rows_by_ids(table, columns, live_ids):
+        rows_by_id[row[0]] = row
+    return set(latest_ops)
+
+def refresh_rows(rows_by_id, table, columns, since_seq):
+    """Bring an {id: row} cache of table up to date using the change journal.
+
+    Returns the new sequence number and the result of apply_row_changes().
+    """
+    changes = get_changes_since(since_seq, (table,))
+    if not changes:
+        return since_seq, set()
+    return changes[-1][0], apply_row_changes(rows_by_id, table, columns, changes)
+
+def update_rows(table, edits):
+    """Apply {row id: {column: value}} edits to a captured table in one transaction.
+
+    Only the edited columns are written. Used by the table editors in the
+    Course and Student managers, which save a batch of cell edits at once.
+    """
+    columns = CAPTURED_TABLES[table]
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN")
+        for row_id, values in edits.items():
+            unknown = set(values) - set(columns[1:])
+            if unknown:
+                raise ValueError(f"Cannot edit {', '.join(sorted(unknown))} in {table}")
+            if table == "courses" and "duration" in values:
+                # A plan of monthly installments over the course keeps spanning its duration
+                conn.execute("""
+                    UPDATE installment_plans SET installments = ?
+                    WHERE course_id = ? AND installments = (SELECT duration FROM courses WHERE id = ?)
+                """, (values["duration"], row_id, row_id))
+            names = sorted(values)
+            conn.execute(f"UPDATE {table} SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+                         [values[name] for name in names] + [row_id])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    invalidate_reads(table)
+    publish_changes()
+
+def subscribe_changes(listener):
+    """Call listener(changes) after every write made through this module.
+
+    changes is the list of new change journal entries, (seq, table_name,
+    row_id, op) tuples, so listeners can update just the affected rows.
+    """
+    global _published_seq
+    with _publish_lock:
+        if _published_seq is None:
+            _published_seq = get_latest_change_seq()
+        _change_listeners.append(listener)
+
+def unsubscribe_changes(listener):
+    with _publish_lock:
+        if listener in _change_listeners:
+            _change_listeners.remove(listener)
+
+def publish_changes():
+    """Notify listeners of journal entries written since the last notification.
+
+    Write functions here call this after committing; code that writes to the
+    database directly should call it too.
+    """
+    global _published_seq
+    with _publish_lock:
+        if not _change_listeners:
+            return
+        changes = get_changes_since(_published_seq)
+        if not changes:
+            return
+        _published_seq = changes[-1][0]
+        listeners = list(_change_listeners)
+    for listener in listeners:
+        listener(changes)
+
+def record_restore_in_change_log(previous_seq):
+    """Mark a restore in change_log, numbered after every change the replaced database had logged.
+
+    Sequence numbers are never reused, so changes already shipped from the
+    replaced database cannot be mistaken for changes made after the restore.
+    """
+    conn = get_connection()
+    current_seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+    conn.execute("""
+        INSERT INTO change_log (seq, table_name, row_id, op, row_data, changed_at)
+        VALUES (?, '', NULL, 'RESTORE', NULL, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+    """, (max(previous_seq, current_seq) + 1,))
     conn.commit()
     conn.close()
+    invalidate_reads()
+    publish_changes()
 
-def add_course(name, fee, duration):
-    conn = sqlite3.connect(DB_NAME)
+def add_course(name, fee, duration, installments=None):
+    """Add a course; with installments, its fee is due in that many monthly installments"""
+    conn = get_connection()
     c = conn.cursor()
     c.execute("INSERT INTO courses (name, fee, duration) VALUES (?, ?, ?)", (name, fee, duration))
+    if installments and installments > 1:
+        c.execute("INSERT INTO installment_plans (course_id, installments) VALUES (?, ?)", (c.lastrowid, installments))
     conn.commit()
     conn.close()
+    invalidate_reads("courses")
+    publish_changes()
 
-def get_courses():
-    conn = sqlite3.connect(DB_NAME)
+@cached_read("courses")
+def get_courses(limit=-1, offset=0):
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT id, name, fee, duration FROM courses")
+    c.execute("SELECT id, name, fee, duration FROM courses ORDER BY id LIMIT ? OFFSET ?", (limit, offset))
     courses = c.fetchall()
     conn.close()
     return courses
 
 def delete_course(course_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("DELETE FROM courses WHERE id = ?", (course_id,))
+    c.execute("DELETE FROM installment_plans WHERE course_id = ?", (course_id,))
     conn.commit()
     conn.close()
+    invalidate_reads("courses")
+    publish_changes()
 
-def create_students_table():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""
+def create_students_table(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS students (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             student_id TEXT UNIQUE,
@@ -80,13 +764,11 @@ def create_students_table():
             address TEXT
         )
     """)
-    conn.commit()
-    conn.close()
     
 def generate_student_id():
     from datetime import datetime
     year = datetime.now().year
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     # Find the highest existing student_id number for this year
     c.execute("SELECT student_id FROM students WHERE student_id LIKE ? ORDER BY student_id DESC LIMIT 1", (f"STU{year}-%",))
@@ -106,7 +788,7 @@ def generate_student_id():
 
 def add_student(name, phone, email, address):
     student_id = generate_student_id()
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('''
         INSERT INTO students (student_id, name, phone, email, address)
@@ -114,9 +796,28 @@ def add_student(name, phone, email, address):
     ''', (student_id, name, phone, email, address))
     conn.commit()
     conn.close()
+    invalidate_reads("students")
+    publish_changes()
+    return student_id
+
+def get_students_page(search="", limit=100, offset=0):
+    """(id, student_id, name, phone, email, address) rows ordered by id, optionally matching search"""
+    conn = get_connection()
+    c = conn.cursor()
+    query = "SELECT id, student_id, name, phone, email, address FROM students"
+    params = []
+    if search:
+        query += " WHERE name LIKE ? OR student_id LIKE ? OR phone LIKE ? OR email LIKE ?"
+        params.extend([f"%{search}%"] * 4)
+    query += " ORDER BY id LIMIT ? OFFSET ?"
+    c.execute(query, params + [limit, offset])
+    rows = c.fetchall()
+    conn.close()
+    return rows
 
+@cached_read("students")
 def get_students():
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT id, name, phone, email, address FROM students")
     data = c.fetchall()
@@ -124,16 +825,16 @@ def get_students():
     return data
 
 def delete_student(student_id):
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("DELETE FROM students WHERE id = ?", (student_id,))
     conn.commit()
     conn.close()
+    invalidate_reads("students")
+    publish_changes()
     
-def create_enrollments_table():
-    conn = sqlite3.connect("institute.db")
-    c = conn.cursor()
-    c.execute("""
+def create_enrollments_table(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS enrollments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             student_id INTEGER,
@@ -141,46 +842,80 @@ def create_enrollments_table():
             course_name TEXT,
             course_fee INTEGER,
             course_duration TEXT,
-            enrollment_date TEXT
+            enrollment_date TEXT,
+            course_id INTEGER  -- courses.id at enrollment, which survives renaming the course
         )
     """)
-    conn.commit()
-    conn.close()
+
+def upgrade_enrollments_table(conn):
+    """Add columns introduced after the enrollments table was first created"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(enrollments)")}
+    if "course_id" not in columns:
+        conn.execute("ALTER TABLE enrollments ADD COLUMN course_id INTEGER")
+        link_enrollment_courses(conn)
+        # The change triggers record a fixed column list; let create_change_triggers() rebuild them
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS enrollments_{op}_log")
+
+def link_enrollment_courses(conn):
+    """Fill in course_id, by course name, for enrollments recorded without one"""
+    conn.execute("""
+        UPDATE enrollments SET course_id = (SELECT MIN(id) FROM courses WHERE name = enrollments.course_name)
+        WHERE course_id IS NULL
+    """)
     
 def enroll_student(student_id, student_name, course_name, fee, duration, date):
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
-        INSERT INTO enrollments (student_id, student_name, course_name, course_fee, course_duration, enrollment_date)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (student_id, student_name, course_name, fee, duration, date))
+        INSERT INTO enrollments (student_id, student_name, course_name, course_fee, course_duration, enrollment_date,
+            course_id)
+        VALUES (?, ?, ?, ?, ?, ?, (SELECT MIN(id) FROM courses WHERE name = ?))
+    """, (student_id, student_name, course_name, fee, duration, date, course_name))
+    enrollment_id = c.lastrowid
+    course_id = c.execute("SELECT course_id FROM enrollments WHERE id = ?", (enrollment_id,)).fetchone()[0]
+    add_fee_dues(conn, enrollment_id, course_id, fee, date)
     conn.commit()
     conn.close()
+    publish_changes()
     
+@cached_read("students")
 def get_all_students():
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT id, student_id, name FROM students")
     students = c.fetchall()
     conn.close()
     return students
 
+@cached_read("courses")
 def get_all_courses():
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT name, fee, duration FROM courses")
-    return c.fetchall()
+    courses = c.fetchall()
+    conn.close()
+    return courses
 
 def get_student_enrollments(student_id):
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT course_name FROM enrollments WHERE student_id = ?", (student_id,))
     rows = c.fetchall()
     conn.close()
     return [row[0] for row in rows]
 
-def get_enrollments_by_student_identifier(identifier):
-    conn = sqlite3.connect("institute.db")
+def get_student_enrollment_dates(student_id):
+    """(course_name, enrollment_date) for each of a student's enrollments"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT course_name, enrollment_date FROM enrollments WHERE student_id = ?", (student_id,))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def get_enrollments_by_student_identifier(identifier, limit=-1, offset=0):
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         SELECT e.id, e.course_name, e.course_fee,
@@ -189,68 +924,273 @@ def get_enrollments_by_student_identifier(identifier):
         LEFT JOIN payments p ON e.id = p.enrollment_id
         WHERE e.student_id = ? OR e.student_name LIKE ?
         GROUP BY e.id
-    """, (identifier, f"%{identifier}%"))
+        ORDER BY e.id
+        LIMIT ? OFFSET ?
+    """, (identifier, f"%{identifier}%", limit, offset))
     result = c.fetchall()
     conn.close()
     return result
 
-def add_payment(enrollment_id, amount, date):
-    conn = sqlite3.connect("institute.db")
+def add_payment(enrollment_id, amount, date, mode=None):
+    conn = get_connection()
     c = conn.cursor()
-    receipt_no = generate_receipt_no()
-    c.execute("INSERT INTO payments (enrollment_id, amount, date,receipt_no) VALUES (?, ?, ?,?)",
-              (enrollment_id, amount, date,receipt_no))
+    receipt_no = allocate_receipt_nos(conn, 1)[0]
+    c.execute("INSERT INTO payments (enrollment_id, amount, date, receipt_no, mode) VALUES (?, ?, ?, ?, ?)",
+              (enrollment_id, amount, date, receipt_no, mode))
+    # Same transaction, so the rollup and due schedule never disagree with payments
+    add_to_daily_collections(conn, enrollment_id, amount, date)
+    settle_fee_dues(conn, enrollment_id)
     conn.commit()
     conn.close()
+    publish_changes()
     
     return receipt_no  # return if you want to show it in UI or PDF
 
+def add_payments(payments):
+    """Record (enrollment_id, amount, date, mode) payments in one transaction; returns their receipt numbers.
+
+    Balances are checked again inside the transaction, so nothing is
+    recorded if any payment would take an enrollment past its fee (for
+    instance because another desk took a payment meanwhile).
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+    conn = get_connection()
+    try:
+        # Take the write lock up front: the balance check and the inserts must see the same data
+        conn.execute("BEGIN IMMEDIATE")
+        totals = {}
+        for enrollment_id, amount, _, _ in payments:
+            if amount <= 0:
+                raise ValueError("Amount must be greater than 0")
+            totals[enrollment_id] = totals.get(enrollment_id, 0) + amount
+        for enrollment_id, amount in totals.items():
+            row = conn.execute("""
+                SELECT IFNULL(course_fee, 0),
+                    (SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = e.id)
+                FROM enrollments e WHERE id = ?
+            """, (enrollment_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"Enrollment {enrollment_id} not found")
+            if row[1] + amount > row[0]:
+                raise ValueError(f"Enrollment {enrollment_id}: ₹{amount} exceeds the pending ₹{row[0] - row[1]}")
+        receipt_nos = allocate_receipt_nos(conn, len(payments))
+        conn.executemany("INSERT INTO payments (enrollment_id, amount, date, receipt_no, mode) VALUES (?, ?, ?, ?, ?)",
+                         [(enrollment_id, amount, date, receipt_no, mode)
+                          for (enrollment_id, amount, date, mode), receipt_no in zip(payments, receipt_nos)])
+        for enrollment_id, amount, date, _ in payments:
+            add_to_daily_collections(conn, enrollment_id, amount, date)
+        for enrollment_id in totals:
+            settle_fee_dues(conn, enrollment_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    publish_changes()
+    return receipt_nos
+
+def get_enrollment_balances():
+    """(enrollment id, student code, student name, course_name, fee, paid) for every enrollment, in one pass"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT e.id, s.student_id, IFNULL(s.name, e.student_name), e.course_name, IFNULL(e.course_fee, 0),
+            IFNULL(p.paid, 0)
+        FROM enrollments e
+        LEFT JOIN students s ON s.id = e.student_id
+        LEFT JOIN (SELECT enrollment_id, SUM(amount) AS paid FROM payments GROUP BY enrollment_id) p
+            ON p.enrollment_id = e.id
+        ORDER BY e.id
+    """)
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def set_installment_plan(course_id, installments, interval_months=1):
+    """Collect a course's fee in installments from now on (1 removes the plan); existing schedules are kept"""
+    conn = get_connection()
+    if installments and installments > 1:
+        conn.execute("""
+            INSERT INTO installment_plans (course_id, installments, interval_months) VALUES (?, ?, ?)
+            ON CONFLICT (course_id) DO UPDATE
+            SET installments = excluded.installments, interval_months = excluded.interval_months
+        """, (course_id, installments, interval_months))
+    else:
+        conn.execute("DELETE FROM installment_plans WHERE course_id = ?", (course_id,))
+    conn.commit()
+    conn.close()
+    publish_changes()
+
+def get_installment_plans():
+    """{course id: (installments, interval_months)} for courses paid in installments"""
+    conn = get_connection()
+    plans = {course_id: (installments, interval_months) for course_id, installments, interval_months in conn.execute(
+        "SELECT course_id, installments, interval_months FROM installment_plans")}
+    conn.close()
+    return plans
+
+def get_fee_dues(start_date=None, end_date=None, limit=-1, offset=0):
+    """Unpaid installments falling due from start_date to end_date (inclusive; None leaves that end open).
+
+    Rows are (enrollment id, student code, student name, course_name,
+    installment_no, due_date, amount still owed on the installment),
+    ordered by due date and paged by limit/offset. Only the index of open dues is range-scanned.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT d.enrollment_id, s.student_id, IFNULL(s.name, e.student_name), e.course_name, d.installment_no,
+            d.due_date, MIN(d.amount, d.due_total - (
+                SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = d.enrollment_id))
+        FROM fee_dues d
+        JOIN enrollments e ON e.id = d.enrollment_id
+        LEFT JOIN students s ON s.id = e.student_id
+        WHERE d.settled = 0 AND d.due_date >= ? AND d.due_date <= ?
+        ORDER BY d.due_date, d.id
+        LIMIT ? OFFSET ?
+    """, (start_date or "", end_date or "9999-12-31", limit, offset))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def get_overdue_fees(as_of=None):
+    """get_fee_dues() rows due before as_of (default today)"""
+    as_of = datetime.strptime(as_of, "%Y-%m-%d") if as_of else datetime.now()
+    return get_fee_dues(None, (as_of - timedelta(days=1)).strftime("%Y-%m-%d"))
+
+def get_daily_collections(start_date, end_date, course_name=None):
+    """(date, course_name, payments, amount) rows from the rollup for start_date..end_date inclusive"""
+    conn = get_connection()
+    c = conn.cursor()
+    if course_name:
+        c.execute("""
+            SELECT date, course_name, payments, amount FROM daily_collections
+            WHERE date BETWEEN ? AND ? AND course_name = ?
+            ORDER BY date
+        """, (start_date, end_date, course_name))
+    else:
+        c.execute("""
+            SELECT date, course_name, payments, amount FROM daily_collections
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date, course_name
+        """, (start_date, end_date))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def get_collections_by_course(start_date, end_date):
+    """(course_name, payments, amount) totals for start_date..end_date inclusive, read from the rollup"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT course_name, SUM(payments), SUM(amount) FROM daily_collections
+        WHERE date BETWEEN ? AND ?
+        GROUP BY course_name
+        ORDER BY SUM(amount) DESC
+    """, (start_date, end_date))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
 def get_total_paid(enrollment_id):
-    conn = sqlite3.connect("institute.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = ?", (enrollment_id,))
     total = c.fetchone()[0]
     conn.close()
     return total
 
-def get_payment_history(student_key, course_key=None):
-    conn = sqlite3.connect("institute.db")
+def get_payment_history(student_key, course_key=None, limit=-1, offset=0):
+    conn = get_connection()
     c = conn.cursor()
     
     if course_key:
         c.execute("""
-            SELECT p.id, p.receipt_no, s.student_id, s.name, e.course_name, p.amount, p.date
+            SELECT p.id, p.receipt_no, s.student_id, s.name, e.course_name, p.amount, p.date, p.mode
             FROM payments p
             JOIN enrollments e ON p.enrollment_id = e.id
             JOIN students s ON e.student_id = s.id
             WHERE (s.name LIKE ? OR s.student_id LIKE ?)
               AND e.course_name LIKE ?
-            ORDER BY p.date DESC
-        """, (f"%{student_key}%", f"%{student_key}%", f"%{course_key}%"))
+            ORDER BY p.date DESC, p.id DESC
+            LIMIT ? OFFSET ?
+        """, (f"%{student_key}%", f"%{student_key}%", f"%{course_key}%", limit, offset))
     else:
         c.execute("""
-            SELECT p.id, p.receipt_no, s.student_id, s.name, e.course_name, p.amount, p.date
+            SELECT p.id, p.receipt_no, s.student_id, s.name, e.course_name, p.amount, p.date, p.mode
             FROM payments p
             JOIN enrollments e ON p.enrollment_id = e.id
             JOIN students s ON e.student_id = s.id
             WHERE s.name LIKE ? OR s.student_id LIKE ?
-            ORDER BY p.date DESC
-        """, (f"%{student_key}%", f"%{student_key}%"))
+            ORDER BY p.date DESC, p.id DESC
+            LIMIT ? OFFSET ?
+        """, (f"%{student_key}%", f"%{student_key}%", limit, offset))
 
     result = c.fetchall()
     conn.close()
     return result
 
+def get_receipt(receipt_no):
+    """(p.id, receipt_no, s.student_id, s.name, course_name, amount, date, mode) for one receipt, or None"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT p.id, p.receipt_no, s.student_id, s.name, e.course_name, p.amount, p.date, p.mode
+        FROM payments p
+        JOIN enrollments e ON p.enrollment_id = e.id
+        JOIN students s ON e.student_id = s.id
+        WHERE p.receipt_no = ?
+    """, (receipt_no,))
+    row = c.fetchone()
+    conn.close()
+    return row
+
+def get_enrollment(enrollment_id):
+    """(id, student_id, student_name, course_name, course_fee, paid) for one enrollment, or None"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT e.id, e.student_id, e.student_name, e.course_name, e.course_fee,
+            (SELECT IFNULL(SUM(amount), 0) FROM payments WHERE enrollment_id = e.id)
+        FROM enrollments e
+        WHERE e.id = ?
+    """, (enrollment_id,))
+    row = c.fetchone()
+    conn.close()
+    return row
+
+@cached_read("courses")
 def course_exists(name):
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT 1 FROM courses WHERE LOWER(name) = LOWER(?)", (name,))
     exists = c.fetchone() is not None
     conn.close()
     return exists
 
+def get_course_by_name(name):
+    """(id, name, fee, duration) of the course with this name (any case), or None"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT id, name, fee, duration FROM courses WHERE LOWER(name) = LOWER(?) ORDER BY id LIMIT 1", (name,))
+    row = c.fetchone()
+    conn.close()
+    return row
+
+def get_student(student_id):
+    """(id, student_id, name, phone, email, address) for one student, or None"""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT id, student_id, name, phone, email, address FROM students WHERE id = ?", (student_id,))
+    row = c.fetchone()
+    conn.close()
+    return row
+
 def get_enrollment_id(student_id, course_name):
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT id FROM enrollments WHERE student_id = ? AND course_name = ?", (student_id, course_name))
     row = c.fetchone()
@@ -261,7 +1201,7 @@ def can_unenroll(student_id, course_name):
     enrollment_id = get_enrollment_id(student_id, course_name)
     if enrollment_id is None:
         return False
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT COUNT(*) FROM payments WHERE enrollment_id = ?", (enrollment_id,))
     count = c.fetchone()[0]
@@ -271,9 +1211,14 @@ def can_unenroll(student_id, course_name):
 def unenroll_student(student_id, course_name):
     if not can_unenroll(student_id, course_name):
         return False
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
+    c.execute("""
+        DELETE FROM fee_dues WHERE enrollment_id IN (
+            SELECT id FROM enrollments WHERE student_id = ? AND course_name = ?)
+    """, (student_id, course_name))
     c.execute("DELETE FROM enrollments WHERE student_id = ? AND course_name = ?", (student_id, course_name))
     conn.commit()
     conn.close()
+    publish_changes()
     return True
@@ -1,83 +1,22 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QSizePolicy, QHeaderView, QTabWidget
+    QTableWidget, QTableWidgetItem, QTableView, QMessageBox, QSizePolicy, QHeaderView, QAbstractItemView, QTabWidget
 )
 from PyQt5.QtGui import QColor
-from database import get_all_students, get_all_courses, enroll_student, get_student_enrollments, can_unenroll, unenroll_student
+from data_source import data_source, SyncedRows
+from change_events import tables_changed
+from table_models import FilteredTableModel
 from datetime import datetime
 from PyQt5.QtCore import Qt
 
+STUDENT_COLUMNS = ("id", "student_id", "name", "phone", "email")
+COURSE_COLUMNS = ("id", "name", "fee", "duration")
+
 class EnrollStudent(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Enroll Student")
         self.setGeometry(250, 250, 1000, 700)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QLabel {
-                color: #2c3e50;
-                font-weight: 600;
-                font-size: 12px;
-                margin: 5px 0px;
-            }
-            QLineEdit {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 10px;
-                font-size: 12px;
-                color: #495057;
-            }
-            QLineEdit:focus {
-                border-color: #3498db;
-                background-color: #f8f9fa;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 12px 20px;
-                border-radius: 6px;
-                font-size: 12px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-            }
-            QTableWidget {
-                background-color: white;
-                alternate-background-color: #f8f9fa;
-                gridline-color: #dee2e6;
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-            }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #f1f3f4;
-            }
-            QTableWidget::item:selected {
-                background-color: #3498db;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2c3e50;
-                color: white;
-                padding: 12px;
-                border: none;
-                font-weight: bold;
-                font-size: 11px;
-            }
-            QHeaderView::section:hover {
-                background-color: #34495e;
-            }
-        """)
 
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -85,16 +24,7 @@ class EnrollStudent(QWidget):
 
         # Title section
         title_label = QLabel("📝 Student Enrollment")
-        title_label.setStyleSheet("""
-            font-size: 18px;
-            font-weight: bold;
-            color: #2c3e50;
-            margin: 10px 0px 20px 0px;
-            padding: 15px;
-            background-color: white;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-        """)
+        title_label.setProperty("role", "title")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
 
@@ -107,35 +37,31 @@ class EnrollStudent(QWidget):
         left_section.setSpacing(10)
         
         student_section = QLabel("👨‍🎓 Select Student")
-        student_section.setStyleSheet("""
-            font-size: 14px;
-            font-weight: bold;
-            color: #34495e;
-            margin: 10px 0px 5px 0px;
-            padding: 8px 0px;
-            border-bottom: 2px solid #3498db;
-        """)
+        student_section.setProperty("role", "section")
         left_section.addWidget(student_section)
 
-        left_section.addWidget(QLabel("Search Student by Name:"))
+        left_section.addWidget(QLabel("Search Student:"))
         self.student_search = QLineEdit()
-        self.student_search.setPlaceholderText("Search by student name...")
+        self.student_search.setPlaceholderText("Search by name, student ID, phone or email...")
         self.student_search.textChanged.connect(self.filter_students)
         self.student_search.setFixedHeight(45)
-        self.student_search.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         left_section.addWidget(self.student_search)
 
-        self.student_table = QTableWidget()
-        self.student_table.setColumnCount(3)
-        self.student_table.setHorizontalHeaderLabels(["Student ID", "Name", "Select"])
-        self.student_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.student_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.student_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.student_model = FilteredTableModel(
+            [("Student ID", 1, None), ("Name", 2, None)],
+            search_fields=(1, 2, 3, 4),
+            action=("Select", "Select", None, None)
+        )
+        self.student_table = QTableView()
+        self.student_table.setModel(self.student_model)
+        self.student_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.student_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.student_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.student_table.setSortingEnabled(True)
         self.student_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         header = self.student_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
-        self.student_table.itemSelectionChanged.connect(self.refresh_course_list_for_student)
+        self.student_table.selectionModel().selectionChanged.connect(self.student_selection_changed)
         left_section.addWidget(self.student_table, stretch=1)
 
         # Right Section - Courses
@@ -143,14 +69,7 @@ class EnrollStudent(QWidget):
         right_section.setSpacing(10)
         
         course_section = QLabel("📚 Select Course")
-        course_section.setStyleSheet("""
-            font-size: 14px;
-            font-weight: bold;
-            color: #34495e;
-            margin: 10px 0px 5px 0px;
-            padding: 8px 0px;
-            border-bottom: 2px solid #3498db;
-        """)
+        course_section.setProperty("role", "section")
         right_section.addWidget(course_section)
 
         right_section.addWidget(QLabel("Search Course by Name:"))
@@ -158,7 +77,6 @@ class EnrollStudent(QWidget):
         self.course_search.setPlaceholderText("Search by course name...")
         self.course_search.textChanged.connect(self.filter_courses)
         self.course_search.setFixedHeight(45)
-        self.course_search.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         right_section.addWidget(self.course_search)
 
         self.course_table = QTableWidget()
@@ -197,41 +115,114 @@ class EnrollStudent(QWidget):
 
         self.setLayout(layout)
 
-        self.all_students = get_all_students()
-        self.all_courses = get_all_courses()
         self.selected_student_id = None
+        self.keeping_selection = False
         self.enrolled_courses = []
 
+        # Rows by id, kept current from the change journal after the first full load
+        self.students = SyncedRows("students", STUDENT_COLUMNS, parent=self)
+        self.courses = SyncedRows("courses", COURSE_COLUMNS, parent=self)
+        self.students.updated.connect(self.students_updated)
+        self.courses.updated.connect(self.courses_updated)
+        data_source().rows_changed.connect(self.apply_enrollment_changes)
         self.refresh_student_table()
         self.refresh_course_table()
 
+    def find_course_row(self, course_id):
+        for row in range(self.course_table.rowCount()):
+            if self.course_table.item(row, 0).data(Qt.UserRole) == course_id:
+                return row
+        return None
+
+    def set_course_row(self, row_idx, course):
+        course_id, name, fee, duration = course
+        name_item = QTableWidgetItem(name)
+        name_item.setData(Qt.UserRole, course_id)
+        self.course_table.setItem(row_idx, 0, name_item)
+        self.course_table.setItem(row_idx, 1, QTableWidgetItem(f"₹{fee}"))
+        self.course_table.setItem(row_idx, 2, QTableWidgetItem(str(duration)))
+
+    def students_updated(self, changed):
+        """Apply students loaded or changed elsewhere in the app to the student table"""
+        students_by_id = self.students.rows_by_id
+        if changed is None:
+            self.refresh_student_table()
+        elif changed:
+            self.keep_student_selection(lambda: self.student_model.update_records(students_by_id, changed))
+        if self.selected_student_id is not None and self.selected_student_id not in students_by_id:
+            # The selected student was deleted
+            self.selected_student_id = None
+            self.refresh_course_list_for_student()
+
+    def courses_updated(self, changed):
+        """Apply courses loaded or changed elsewhere in the app to the course table"""
+        if changed is not None and not changed:
+            return
+        if changed is None:
+            self.refresh_course_table()
+        elif changed:
+            # Rows move while sorting is on, so update them unsorted
+            self.course_table.setSortingEnabled(False)
+            for course_id in changed:
+                row_idx = self.find_course_row(course_id)
+                course = self.courses.rows_by_id.get(course_id)
+                if course is None:
+                    if row_idx is not None:
+                        self.course_table.removeRow(row_idx)
+                    continue
+                if row_idx is None:
+                    row_idx = self.course_table.rowCount()
+                    self.course_table.insertRow(row_idx)
+                    self.course_table.setItem(row_idx, 3, QTableWidgetItem(""))
+                self.set_course_row(row_idx, course)
+            self.course_table.setSortingEnabled(True)
+            self.filter_courses()
+        # Enrollment marks and joining dates for the selected student
+        if self.selected_student_id is not None:
+            self.refresh_course_list_for_student()
+
+    def apply_enrollment_changes(self, changes):
+        if self.selected_student_id is not None and "enrollments" in tables_changed(changes):
+            self.refresh_course_list_for_student()
+
     def refresh_student_table(self):
-        self.student_table.setRowCount(0)
-        for sid, student_id, name in self.all_students:
-            row_idx = self.student_table.rowCount()
-            self.student_table.insertRow(row_idx)
-            self.student_table.setItem(row_idx, 0, QTableWidgetItem(student_id))
-            self.student_table.setItem(row_idx, 1, QTableWidgetItem(name))
-            self.student_table.setItem(row_idx, 2, QTableWidgetItem("Select"))
-        self.filter_students()
+        students_by_id = self.students.rows_by_id
+        self.keep_student_selection(lambda: self.student_model.set_records(
+            students_by_id[sid] for sid in sorted(students_by_id)))
 
     def refresh_course_table(self):
+        self.course_table.setSortingEnabled(False)
         self.course_table.setRowCount(0)
-        for name, fee, duration in self.all_courses:
+        for course_id in sorted(self.courses.rows_by_id):
             row_idx = self.course_table.rowCount()
             self.course_table.insertRow(row_idx)
-            self.course_table.setItem(row_idx, 0, QTableWidgetItem(name))
-            self.course_table.setItem(row_idx, 1, QTableWidgetItem(f"₹{fee}"))
-            self.course_table.setItem(row_idx, 2, QTableWidgetItem(str(duration)))
+            self.set_course_row(row_idx, self.courses.rows_by_id[course_id])
             # Initialize joining date as empty - will be updated in refresh_course_list_for_student
             self.course_table.setItem(row_idx, 3, QTableWidgetItem(""))
+        self.course_table.setSortingEnabled(True)
         self.filter_courses()
 
     def filter_students(self):
-        filter_text = self.student_search.text().strip().lower()
-        for row in range(self.student_table.rowCount()):
-            name = self.student_table.item(row, 1).text().lower()
-            self.student_table.setRowHidden(row, filter_text not in name)
+        self.keep_student_selection(lambda: self.student_model.set_filter(self.student_search.text()))
+
+    def keep_student_selection(self, update):
+        """Run an update of the student model, keeping the selected student selected while it is shown"""
+        self.keeping_selection = True
+        try:
+            update()
+            row = self.student_model.row_of(self.selected_student_id)
+            if row is not None:
+                self.student_table.selectRow(row)
+        finally:
+            self.keeping_selection = False
+
+    def student_selection_changed(self):
+        if self.keeping_selection:
+            return
+        rows = self.student_table.selectionModel().selectedRows()
+        student = self.student_model.record_at(rows[0].row()) if rows else None
+        self.selected_student_id = student[0] if student else None
+        self.refresh_course_list_for_student()
 
     def filter_courses(self):
         filter_text = self.course_search.text().strip().lower()
@@ -240,37 +231,24 @@ class EnrollStudent(QWidget):
             self.course_table.setRowHidden(row, filter_text not in name)
 
     def refresh_course_list_for_student(self):
-        selected_row = self.student_table.currentRow()
-        if selected_row < 0:
-            self.selected_student_id = None
+        sid = self.selected_student_id
+        if sid is None:
             self.enrolled_courses = []
             self.refresh_course_table()  # Show all courses
             self.enroll_button.setEnabled(True)
             self.unenroll_button.setEnabled(True)
             return
-        # Find the actual student id
-        student_id_str = self.student_table.item(selected_row, 0).text()
-        # Find sid from all_students
-        sid = None
-        for s in self.all_students:
-            if s[1] == student_id_str:
-                sid = s[0]
-                break
-        self.selected_student_id = sid
-        self.enrolled_courses = get_student_enrollments(self.selected_student_id)
-        
         # Get enrollment details with dates for the selected student
-        from database import get_connection
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("""
-            SELECT course_name, enrollment_date 
-            FROM enrollments 
-            WHERE student_id = ?
-        """, (sid,))
-        enrollment_details = {row[0]: row[1] for row in c.fetchall()}
-        conn.close()
-        
+        data_source().call("get_student_enrollment_dates", sid,
+                           on_result=lambda rows: self.show_student_enrollments(sid, rows),
+                           on_error=self.show_error, context=self)
+
+    def show_student_enrollments(self, sid, rows):
+        if sid != self.selected_student_id:
+            return  # Another student was selected meanwhile
+        enrollment_details = {course_name: enrollment_date for course_name, enrollment_date in rows}
+        self.enrolled_courses = list(enrollment_details)
+
         for row in range(self.course_table.rowCount()):
             course_name = self.course_table.item(row, 0).text()
             orig_name = course_name.split(' (Already Enrolled)')[0]
@@ -293,18 +271,12 @@ class EnrollStudent(QWidget):
         self.unenroll_button.setEnabled(True)
 
     def enroll_selected(self):
-        student_row = self.student_table.currentRow()
+        sid = self.selected_student_id
         course_row = self.course_table.currentRow()
-        if student_row < 0 or course_row < 0:
+        if sid is None or course_row < 0:
             QMessageBox.warning(self, "Selection Error", "Please select both student and course.")
             return
-        student_id_str = self.student_table.item(student_row, 0).text()
-        student_name = self.student_table.item(student_row, 1).text()
-        sid = None
-        for s in self.all_students:
-            if s[1] == student_id_str:
-                sid = s[0]
-                break
+        student_name = self.students.rows_by_id[sid][2]
         course_name = self.course_table.item(course_row, 0).text().split(' (Already Enrolled)')[0]
         if course_name in self.enrolled_courses:
             QMessageBox.warning(self, "Already Enrolled", f"{student_name} is already enrolled in {course_name}.")
@@ -312,53 +284,49 @@ class EnrollStudent(QWidget):
         fee = int(self.course_table.item(course_row, 1).text().replace("₹", ""))
         duration = self.course_table.item(course_row, 2).text().split()[0]
         enrollment_date = datetime.now().strftime("%Y-%m-%d")
-        enroll_student(
-            student_id=sid,
-            student_name=student_name,
-            course_name=course_name,
-            fee=fee,
-            duration=duration,
-            date=enrollment_date
+        self.enroll_button.setEnabled(False)
+        data_source().call(
+            "enroll_student", sid, student_name, course_name, fee, duration, enrollment_date,
+            on_result=lambda result: self.enrolled(student_name, course_name),
+            on_error=self.show_error, context=self
         )
+
+    def enrolled(self, student_name, course_name):
+        self.enroll_button.setEnabled(True)
         QMessageBox.information(self, "Success", f"{student_name} enrolled in {course_name}.")
-        self.refresh_course_list_for_student()
 
     def unenroll_selected(self):
-        print('Unenroll button clicked')
-        student_row = self.student_table.currentRow()
+        sid = self.selected_student_id
         course_row = self.course_table.currentRow()
-        print('Student row:', student_row)
-        print('Course row:', course_row)
-        if student_row < 0 or course_row < 0:
+        if sid is None or course_row < 0:
             QMessageBox.warning(self, "Selection Error", "Please select both student and course.")
             return
-        student_id_str = self.student_table.item(student_row, 0).text()
-        student_name = self.student_table.item(student_row, 1).text()
-        sid = None
-        for s in self.all_students:
-            if s[1] == student_id_str:
-                sid = s[0]
-                break
+        student_name = self.students.rows_by_id[sid][2]
         course_name = self.course_table.item(course_row, 0).text().split(' (Already Enrolled)')[0]
-        print(f'Trying to unenroll student_id={sid}, course_name={course_name}')
-        print('enrolled_courses:', self.enrolled_courses)
-        print('course_name in enrolled_courses:', course_name in self.enrolled_courses)
         if course_name not in self.enrolled_courses:
             QMessageBox.warning(self, "Not Enrolled", f"{student_name} is not enrolled in {course_name}.")
             return
-        can_unenroll_result = can_unenroll(sid, course_name)
-        print('can_unenroll:', can_unenroll_result)
-        if not can_unenroll_result:
+        data_source().call("can_unenroll", sid, course_name,
+                           on_result=lambda allowed: self.confirm_unenroll(sid, course_name, allowed),
+                           on_error=self.show_error, context=self)
+
+    def confirm_unenroll(self, sid, course_name, allowed):
+        if not allowed:
             QMessageBox.warning(self, 'Cannot Unenroll', 'Cannot unenroll because payment has already been made.')
             return
         reply = QMessageBox.question(self, 'Confirm Unenroll', f'Are you sure you want to unenroll from {course_name}?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            unenroll_result = unenroll_student(sid, course_name)
-            print('unenroll_student result:', unenroll_result)
-            if unenroll_result:
-                QMessageBox.information(self, 'Unenrolled', f'Successfully unenrolled from {course_name}.')
-            else:
-                QMessageBox.warning(self, 'Cannot Unenroll', 'Unenrollment failed.')
-            self.refresh_course_list_for_student()
+            data_source().call("unenroll_student", sid, course_name,
+                               on_result=lambda result: self.unenrolled(course_name, result),
+                               on_error=self.show_error, context=self)
+
+    def unenrolled(self, course_name, result):
+        if result:
+            QMessageBox.information(self, 'Unenrolled', f'Successfully unenrolled from {course_name}.')
+        else:
+            QMessageBox.warning(self, 'Cannot Unenroll', 'Unenrollment failed.')
 
+    def show_error(self, message):
+        self.enroll_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", message)
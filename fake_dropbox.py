@@ -0,0 +1,176 @@
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+
+class FakeApiError(Exception):
+    """Stand-in for dropbox.exceptions.ApiError raised by FakeDropbox"""
+    pass
+
+
+class FakeDownloadResponse:
+    """Mimics the requests.Response returned by Dropbox download calls"""
+    def __init__(self, path, client=None):
+        self.path = path
+        self.client = client
+
+    @property
+    def content(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if self.client:
+            self.client._transfer(len(data))
+        return data
+
+    def iter_content(self, chunk_size=1024 * 1024):
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if self.client:
+                    self.client._transfer(len(chunk))
+                yield chunk
+
+    def close(self):
+        pass
+
+
+class FakeDropbox:
+    """Local-disk client implementing the subset of the Dropbox SDK used for backups.
+
+    Remote paths such as "/InstituteBackups/x.db" map to files under root_dir.
+    Every request payload size is recorded in request_sizes so callers can
+    check that large uploads really are chunked. latency (seconds per API
+    call) and bandwidth (bytes per second) simulate a remote link for
+    benchmarks.
+    """
+    def __init__(self, root_dir, list_page_size=1000, latency=0.0, bandwidth=None):
+        self.root_dir = root_dir
+        self.list_page_size = list_page_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.request_sizes = []
+        self.sessions_dir = os.path.join(root_dir, ".upload_sessions")
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+    def _request(self, payload_size=0):
+        """Account for one API round trip carrying payload_size bytes"""
+        self.request_sizes.append(payload_size)
+        if self.latency:
+            time.sleep(self.latency)
+        self._transfer(payload_size)
+
+    def _transfer(self, size):
+        if self.bandwidth and size:
+            time.sleep(size / self.bandwidth)
+
+    def _local_path(self, remote_path):
+        return os.path.join(self.root_dir, *[p for p in remote_path.split("/") if p])
+
+    def _file_metadata(self, remote_path):
+        local_path = self._local_path(remote_path)
+        return SimpleNamespace(
+            name=os.path.basename(local_path),
+            path_display=remote_path,
+            path_lower=remote_path.lower(),
+            size=os.path.getsize(local_path),
+            server_modified=datetime.utcfromtimestamp(os.path.getmtime(local_path))
+        )
+
+    def _write(self, data, remote_path):
+        local_path = self._local_path(remote_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(data)
+        return self._file_metadata(remote_path)
+
+    def files_upload(self, f, path, mode=None):
+        self._request(len(f))
+        return self._write(f, path)
+
+    def files_upload_session_start(self, f):
+        self._request(len(f))
+        session_id = uuid.uuid4().hex
+        with open(os.path.join(self.sessions_dir, session_id), "wb") as part:
+            part.write(f)
+        return SimpleNamespace(session_id=session_id)
+
+    def files_upload_session_append_v2(self, f, cursor, close=False):
+        self._request(len(f))
+        part_path = os.path.join(self.sessions_dir, cursor.session_id)
+        if not os.path.exists(part_path):
+            raise FakeApiError("upload_session/not_found")
+        if os.path.getsize(part_path) != cursor.offset:
+            raise FakeApiError("upload_session/incorrect_offset")
+        with open(part_path, "ab") as part:
+            part.write(f)
+
+    def files_upload_session_finish(self, f, cursor, commit):
+        self.files_upload_session_append_v2(f, cursor)
+        local_path = self._local_path(commit.path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        shutil.move(os.path.join(self.sessions_dir, cursor.session_id), local_path)
+        return self._file_metadata(commit.path)
+
+    def files_create_folder(self, path):
+        self._request()
+        local_path = self._local_path(path)
+        if os.path.exists(local_path):
+            raise FakeApiError(f"path/conflict/folder: {path}")
+        os.makedirs(local_path)
+        return SimpleNamespace(name=os.path.basename(local_path), path_display=path)
+
+    def files_create_folder_v2(self, path):
+        return SimpleNamespace(metadata=self.files_create_folder(path))
+
+    def _list_page(self, path, entries, start):
+        page = entries[start:start + self.list_page_size]
+        next_start = start + len(page)
+        return SimpleNamespace(
+            entries=page,
+            has_more=next_start < len(entries),
+            cursor=SimpleNamespace(path=path, entries=entries, start=next_start)
+        )
+
+    def files_list_folder(self, path):
+        self._request()
+        local_path = self._local_path(path)
+        if not os.path.isdir(local_path):
+            raise FakeApiError(f"path/not_found: {path}")
+        entries = []
+        for name in sorted(os.listdir(local_path)):
+            if os.path.isfile(os.path.join(local_path, name)):
+                entries.append(self._file_metadata(f"{path.rstrip('/')}/{name}"))
+        return self._list_page(path, entries, 0)
+
+    def files_list_folder_continue(self, cursor):
+        self._request()
+        return self._list_page(cursor.path, cursor.entries, cursor.start)
+
+    def files_download(self, path):
+        self._request()
+        local_path = self._local_path(path)
+        if not os.path.isfile(local_path):
+            raise FakeApiError(f"path/not_found: {path}")
+        return self._file_metadata(path), FakeDownloadResponse(local_path, self)
+
+    def files_download_to_file(self, download_path, path):
+        metadata, response = self.files_download(path)
+        shutil.copyfile(response.path, download_path)
+        return metadata
+
+    def files_delete(self, path):
+        self._request()
+        local_path = self._local_path(path)
+        if not os.path.isfile(local_path):
+            raise FakeApiError(f"path_lookup/not_found: {path}")
+        metadata = self._file_metadata(path)
+        os.remove(local_path)
+        return metadata
+
+    def files_delete_v2(self, path):
+        return SimpleNamespace(metadata=self.files_delete(path))
@@ -0,0 +1,279 @@
+"""Continuous change shipping and point-in-time replay.
+
+Triggers in database.py append every committed row change to change_log.
+ship_changes() uploads the rows not yet shipped to a backup destination as
+small compressed segments, and replay_to_point_in_time() rebuilds the
+database from the newest base backup before a chosen moment plus the
+shipped changes up to that moment. prune_shipped_changes() then drops the
+local entries that every destination already holds.
+
+    python log_shipping.py --local-path /backups --until "2024-05-01 17:30:00" --output restored.db
+"""
+import os
+import json
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+
+from database import (
+    DB_NAME, CAPTURED_TABLES, initialize_db, create_change_triggers, get_change_log_floor, prune_change_log,
+    drop_change_triggers, upgrade_enrollments_table, upgrade_payments_table, create_installment_tables, get_latest_change_seq,
+    record_restore_in_change_log, rebuild_daily_collections, rebuild_fee_dues
+)
+from backup_engine import (
+    BACKUP_EXTENSION, BackupIntegrityError, compress_bytes, decompress_bytes, extract_backup_container,
+    validate_database, install_database, remove_file_quietly
+)
+from backup_catalog import (
+    CATALOG_INDEX_NAME, CATALOG_TIME_FORMAT, get_backup_files, get_shipped_seq, set_shipped_seq
+)
+from chunk_store import ChunkStore
+
+SEGMENTS_DIR = "changes"
+SEGMENT_PREFIX = "changes_"
+SEGMENT_EXTENSION = ".jsonl.gz"
+
+# Upper bound on rows per segment so a burst of changes never builds one huge upload
+SEGMENT_MAX_ROWS = 5000
+
+CHANGE_COLUMNS = ("seq", "table_name", "row_id", "op", "row_data", "changed_at")
+
+
+def make_segment_name(after_seq, last_seq):
+    """Segment holding the changes with after_seq < seq <= last_seq"""
+    return f"{SEGMENT_PREFIX}{after_seq:012d}_{last_seq:012d}{SEGMENT_EXTENSION}"
+
+
+def parse_segment_name(name):
+    """Return (after_seq, last_seq) for a segment name, or None"""
+    if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_EXTENSION)):
+        return None
+    try:
+        after_seq, last_seq = name[len(SEGMENT_PREFIX):-len(SEGMENT_EXTENSION)].split("_")
+        return int(after_seq), int(last_seq)
+    except ValueError:
+        return None
+
+
+def read_changes(after_seq, limit=SEGMENT_MAX_ROWS, db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(CHANGE_COLUMNS)} FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+              (after_seq, limit))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(zip(CHANGE_COLUMNS, row)) for row in rows]
+
+
+def ship_changes(destination, db_path=DB_NAME):
+    """Upload change_log rows not yet shipped to destination; returns the number of rows shipped"""
+    # Entries pruned before this destination was set up cannot be shipped; the segment
+    # names then start after them, so replay sees the gap instead of skipping it
+    last_seq = max(get_shipped_seq(destination.key), get_change_log_floor(db_path))
+    shipped = 0
+    while True:
+        changes = read_changes(last_seq, db_path=db_path)
+        if not changes:
+            break
+        payload = "\n".join(json.dumps(change) for change in changes).encode("utf-8")
+        segment_name = make_segment_name(last_seq, changes[-1]["seq"])
+        destination.put_bytes(f"{SEGMENTS_DIR}/{segment_name}", compress_bytes(payload, "gzip"))
+        last_seq = changes[-1]["seq"]
+        set_shipped_seq(destination.key, last_seq)
+        shipped += len(changes)
+    return shipped
+
+
+def prune_shipped_changes(destinations, db_path=DB_NAME):
+    """Delete local change_log entries shipped to every destination and older than its oldest base backup.
+
+    Replay only needs a base backup plus the shipped segments, so these
+    entries are no longer needed here. Returns the number deleted.
+    """
+    if not destinations:
+        return 0
+    oldest_bases = []
+    for destination in destinations:
+        entries = get_backup_files(destination.key)
+        if not entries:
+            return 0  # Nothing to replay from yet
+        oldest_bases.append(entries[-1]["created_at"])
+    through_seq = min(get_shipped_seq(destination.key) for destination in destinations)
+    return prune_change_log(through_seq, min(oldest_bases), db_path)
+
+
+def read_segment(destination, segment_name):
+    data = decompress_bytes(destination.get_bytes(f"{SEGMENTS_DIR}/{segment_name}"), "gzip")
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+
+def list_segments(destination):
+    """(after_seq, last_seq, name) for every shipped segment, in replay order"""
+    segments = []
+    for name in destination.list(SEGMENTS_DIR):
+        bounds = parse_segment_name(name)
+        if bounds:
+            segments.append((bounds[0], bounds[1], name))
+    return sorted(segments)
+
+
+def load_catalog_entries(destination):
+    """Backups at a destination, newest first, from its mirrored index or the local catalog"""
+    try:
+        entries = json.loads(destination.get_bytes(CATALOG_INDEX_NAME).decode("utf-8")).get("backups", [])
+    except FileNotFoundError:
+        entries = get_backup_files(destination.key)
+    return sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+
+
+def restore_base(destination, entry, output_path):
+    """Write the database captured by a cataloged backup to output_path"""
+    if entry["backup_mode"] == "incremental":
+        ChunkStore(destination).restore(entry["name"], output_path)
+        return
+
+    backup_path = destination.local_path(entry["name"])
+    download_path = None
+    if backup_path is None:
+        fd, download_path = tempfile.mkstemp(suffix=os.path.splitext(entry["name"])[1])
+        os.close(fd)
+        destination.get_file(entry["name"], download_path)
+        backup_path = download_path
+    try:
+        if backup_path.endswith(BACKUP_EXTENSION):
+            extract_backup_container(backup_path, output_path)
+        else:
+            shutil.copyfile(backup_path, output_path)
+    finally:
+        if download_path:
+            remove_file_quietly(download_path)
+
+
+def apply_change(conn, change):
+    """Apply one logged row change and copy it into the rebuilt database's own change_log"""
+    table = change["table_name"]
+    if table not in CAPTURED_TABLES:
+        raise BackupIntegrityError(f"Change {change['seq']} refers to unknown table '{table}'")
+    columns = CAPTURED_TABLES[table]
+    if change["op"] == "DELETE":
+        conn.execute(f"DELETE FROM {table} WHERE id = ?", (change["row_id"],))
+    else:
+        row = json.loads(change["row_data"])
+        conn.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     [row.get(col) for col in columns])
+    conn.execute(f"INSERT INTO change_log ({', '.join(CHANGE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                 [change[col] for col in CHANGE_COLUMNS])
+
+
+def replay_to_point_in_time(destination, until=None, output_path="institute_replayed.db"):
+    """Rebuild the database as it was at `until` into output_path.
+
+    Starts from the newest cataloged backup taken at or before `until` and
+    applies shipped changes in sequence order. Replay stops early at a gap
+    in the shipped segments or at a restore marker, since changes after a
+    restore belong to a different history. Returns a summary dict.
+    """
+    until = until or datetime.now().strftime(CATALOG_TIME_FORMAT)
+    candidates = [entry for entry in load_catalog_entries(destination) if entry["created_at"] <= until]
+    if not candidates:
+        raise BackupIntegrityError(f"No base backup at or before {until}")
+    base = candidates[0]
+
+    remove_file_quietly(output_path)
+    restore_base(destination, base, output_path)
+
+    conn = sqlite3.connect(output_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='change_log'").fetchone():
+            raise BackupIntegrityError(f"Base backup {base['name']} was taken before change logging was enabled")
+        position = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+        base_seq = position
+        # Changes may carry columns and tables added after the base backup was taken
+        upgrade_enrollments_table(conn)
+        upgrade_payments_table(conn)
+        create_installment_tables(conn)
+        # Replayed rows are copied into change_log as logged, so keep the triggers from re-logging them
+        drop_change_triggers(conn)
+
+        applied = 0
+        last_change_at = base["created_at"]
+        stopped = None
+        for after_seq, last_seq, segment_name in list_segments(destination):
+            if last_seq <= position:
+                continue
+            if after_seq > position:
+                stopped = f"changes after #{position} are missing from the shipped log"
+                break
+            for change in read_segment(destination, segment_name):
+                if change["seq"] <= position:
+                    continue
+                if change["changed_at"] > until:
+                    stopped = "reached the requested time"
+                    break
+                if change["op"] == "RESTORE":
+                    stopped = (f"the database was restored at {change['changed_at']}; "
+                               "pick a time after the next backup to replay past it")
+                    break
+                apply_change(conn, change)
+                position = change["seq"]
+                last_change_at = change["changed_at"]
+                applied += 1
+            if stopped:
+                break
+
+        create_change_triggers(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    # Replayed enrollments and payments bypass database.py, so recompute the rollup and due schedules
+    rebuild_daily_collections(output_path)
+    rebuild_fee_dues(output_path)
+
+    validate_database(output_path)
+    return {
+        "base": base["name"],
+        "base_created_at": base["created_at"],
+        "base_seq": base_seq,
+        "applied": applied,
+        "last_seq": position,
+        "last_change_at": last_change_at,
+        "stopped": stopped or "reached the end of the shipped log"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild institute.db at a point in time from backups and shipped changes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--local-path", help="local backup directory")
+    source.add_argument("--dropbox-token", help="Dropbox access token")
+    parser.add_argument("--until", help=f"target time, {CATALOG_TIME_FORMAT.replace('%', '')} (default: now)")
+    parser.add_argument("--output", default="institute_replayed.db", help="where to write the rebuilt database")
+    parser.add_argument("--install", action="store_true",
+                        help=f"also replace {DB_NAME} with the result (a safety copy is kept)")
+    args = parser.parse_args()
+
+    from backup_destinations import LocalDestination, DropboxDestination
+    if args.local_path:
+        destination = LocalDestination(args.local_path)
+    else:
+        import dropbox
+        destination = DropboxDestination(dropbox.Dropbox(args.dropbox_token))
+
+    summary = replay_to_point_in_time(destination, args.until, args.output)
+    print(f"Base backup: {summary['base']} ({summary['base_created_at']}, change #{summary['base_seq']})")
+    print(f"Applied {summary['applied']} changes up to #{summary['last_seq']} ({summary['last_change_at']}); "
+          f"stopped: {summary['stopped']}")
+    print(f"Rebuilt database written to {args.output}")
+
+    if args.install:
+        previous_seq = get_latest_change_seq()
+        install_database(args.output, DB_NAME)
+        initialize_db()
+        record_restore_in_change_log(previous_seq)
+        print(f"Installed over {DB_NAME}")
+
+
+if __name__ == "__main__":
+    main()
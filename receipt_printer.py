@@ -0,0 +1,155 @@
+"""Course fee receipts as PDF files, drawn with QPainter.
+
+write_receipt_pdf() is used by the payment history window and cli.py (no
+widgets are needed, only a QGuiApplication); receipt_queue() renders
+receipts on a background thread (QPainter can draw to a QPrinter outside
+the GUI thread) so recording a batch of payments never waits for PDFs.
+"""
+import os
+import queue
+import threading
+
+from PyQt5.QtCore import QCoreApplication, QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QPainter, QFont, QPen, QFontMetrics
+from PyQt5.QtPrintSupport import QPrinter
+
+RECEIPTS_DIR = "receipts"
+
+
+def receipt_path(receipt_no, directory=RECEIPTS_DIR):
+    return os.path.join(directory, f"receipt_{receipt_no}.pdf")
+
+
+def write_receipt_pdf(payment, filename, mode=None):
+    """Draw the receipt for a (payment_id, receipt_no, student_id, name, course, amount, date, ...) row.
+
+    mode is the payment mode, when one was recorded. Returns False if the
+    PDF could not be created.
+    """
+    pay_id, receipt_no, student_id, name, course, amount, date = payment[:7]
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+    printer = QPrinter()
+    printer.setOutputFormat(QPrinter.PdfFormat)
+    printer.setOutputFileName(filename)
+
+    painter = QPainter()
+    if not painter.begin(printer):
+        return False
+
+    try:
+        painter.setRenderHint(QPainter.Antialiasing)
+        margin = 50
+        padding_right = 20
+        page_rect = printer.pageRect()
+        width = page_rect.width()
+        height = page_rect.height()
+        box_width = width - 2 * margin
+        box_height = min(400, height - 2 * margin)
+        painter.setPen(QPen(Qt.black, 2))
+        painter.drawRect(margin, margin, box_width, box_height)
+        painter.setFont(QFont("Arial", 10))
+        font_metrics = QFontMetrics(painter.font())
+        painter.setFont(QFont("Times", 14, QFont.Bold))
+        font_metrics = QFontMetrics(painter.font())
+        header_text = "COURSE FEE RECEIPT"
+        text_width = font_metrics.horizontalAdvance(header_text)
+        x_center = margin + box_width // 2 - text_width // 2
+        painter.drawText(x_center, margin + 60, header_text)
+        painter.setFont(QFont("Arial", 10))
+        font_metrics = QFontMetrics(painter.font())
+        institute_name = "PriorCoder Tech Studio"
+        text_width = font_metrics.horizontalAdvance(institute_name)
+        x_center = margin + box_width // 2 - text_width // 2
+        painter.drawText(x_center, margin + 75, institute_name)
+        address = "Gobind Nagar, St. No. 8, Chd Road, Ludhiana, Punjab - 141015"
+        text_width = font_metrics.horizontalAdvance(address)
+        x_center = margin + box_width // 2 - text_width // 2
+        painter.drawText(x_center, margin + 90, address)
+        painter.setFont(QFont("Arial", 10))
+        receipt_text = f"Receipt No: {receipt_no}"
+        receipt_text_width = font_metrics.horizontalAdvance(receipt_text)
+        x_receipt = width - margin - receipt_text_width - padding_right
+        painter.drawText(x_receipt, margin + 20, receipt_text)
+        date_text = f"Date: {date}"
+        date_text_width = font_metrics.horizontalAdvance(date_text)
+        x_date = width - margin - date_text_width - padding_right
+        painter.drawText(x_receipt, margin + 35, date_text)
+        y = margin + 140
+        spacing = 30
+        x = margin + 20
+        painter.setFont(QFont("Arial", 11))
+        painter.drawText(x, y, f"Received from: {name}")
+        y += spacing
+        painter.drawText(x, y, f"Student ID: {student_id}")
+        y += spacing
+        painter.drawText(x, y, f"The sum of: ₹{amount} /-")
+        y += spacing
+        painter.drawText(x, y, f"Being payment of: {course}")
+        y += spacing
+        if mode:
+            painter.drawText(x, y, f"Payment mode: {mode}    Cheque / Ref No: ________________")
+        else:
+            painter.drawText(x, y, "Cash / Cheque No: __________________________")
+        y += spacing * 2
+        painter.drawText(x, y, "Received by: _______________________        Signature: _______________________" )
+    finally:
+        painter.end()
+    return True
+
+
+class ReceiptQueue(QObject):
+    """Renders queued receipts one at a time on a background thread"""
+    rendered = pyqtSignal(str, str)  # receipt_no, filename
+    failed = pyqtSignal(str, str)    # receipt_no, error message
+
+    def __init__(self, directory=RECEIPTS_DIR):
+        super().__init__()
+        self.directory = directory
+        self.jobs = queue.Queue()
+        self.thread = None
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.finish)
+
+    def add(self, payment, mode=None):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="receipt-queue", daemon=True)
+            self.thread.start()
+        self.jobs.put((payment, mode))
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            payment, mode = job
+            receipt_no = payment[1]
+            try:
+                filename = receipt_path(receipt_no, self.directory)
+                if write_receipt_pdf(payment, filename, mode):
+                    self.rendered.emit(receipt_no, filename)
+                else:
+                    self.failed.emit(receipt_no, "Failed to create PDF")
+            except Exception as e:
+                self.failed.emit(receipt_no, str(e))
+
+    def finish(self):
+        """Render what is already queued before the application exits"""
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join(timeout=30)
+            self.thread = None
+
+
+_receipt_queue = None
+
+
+def receipt_queue():
+    global _receipt_queue
+    if _receipt_queue is None:
+        _receipt_queue = ReceiptQueue()
+    return _receipt_queue
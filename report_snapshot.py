@@ -0,0 +1,282 @@
+"""Columnar, memory-mappable snapshot of enrollments and payments for reporting.
+
+refresh_snapshot() exports the two tables into one .npy file per column
+under report_snapshot/, with course and student names dictionary-encoded
+as int32 codes. Reports then open the files with np.load(mmap_mode='r')
+(see open_snapshot()) and aggregate without querying institute.db or
+reading whole tables into memory.
+
+Refreshes are incremental: while change_log shows only inserts into
+enrollments and payments since the last refresh, the new rows (ids above
+the last exported id) are appended to the existing files in place. Any
+update, delete or restore rewrites the snapshot into a new generation
+directory, so readers that already opened the previous one are not
+disturbed.
+
+    python report_snapshot.py
+"""
+import io
+import os
+import json
+import shutil
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from database import DB_NAME
+from analytics import DAY_NUMBER_SQL, Ledger
+
+SNAPSHOT_DIR = "report_snapshot"
+SNAPSHOT_META = "snapshot.json"
+SNAPSHOT_VERSION = 1
+
+ENROLLMENT_COLUMNS = {
+    "id": np.int64,
+    "student_id": np.int64,
+    "student_name": np.int32,  # code into student_names.npy
+    "course_name": np.int32,   # code into course_names.npy
+    "fee": np.int64,
+    "day": np.int64,           # enrollment date as days since 1970-01-01, -1 if unknown
+}
+PAYMENT_COLUMNS = {
+    "id": np.int64,
+    "enrollment_id": np.int64,
+    "amount": np.int64,
+    "day": np.int64,           # payment date as days since 1970-01-01, -1 if unknown
+    "course_name": np.int32,   # course of the enrollment, so reports need no join
+}
+
+ENROLLMENTS_SQL = f"""
+    SELECT id, IFNULL(student_id, -1), IFNULL(student_name, ''), IFNULL(course_name, ''), IFNULL(course_fee, 0),
+           {DAY_NUMBER_SQL.format('enrollment_date')}
+    FROM enrollments WHERE id > ? ORDER BY id
+"""
+PAYMENTS_SQL = f"""
+    SELECT p.id, IFNULL(p.enrollment_id, -1), IFNULL(p.amount, 0), {DAY_NUMBER_SQL.format('p.date')},
+           IFNULL(e.course_name, '')
+    FROM payments p LEFT JOIN enrollments e ON e.id = p.enrollment_id
+    WHERE p.id > ? ORDER BY p.id
+"""
+
+
+def column_path(generation_dir, table, column):
+    return os.path.join(generation_dir, f"{table}.{column}.npy")
+
+
+def save_npy(path, array):
+    """np.save through a temporary file, so a reader never sees a half-written file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def append_npy(path, values, start):
+    """Write values from row start of a 1-D .npy file on, in place.
+
+    Rows already past start (left by an interrupted refresh) are
+    overwritten. The data is written before the header's shape is updated,
+    so readers opening the file meanwhile still see a consistent array.
+    Falls back to rewriting the file when the new header would not fit the
+    old one.
+    """
+    values = np.asarray(values)
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            header_size = f.tell()
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": fortran_order,
+                "shape": (start + len(values),),
+            })
+            if len(header.getvalue()) == header_size and len(shape) == 1 and start <= shape[0]:
+                f.seek(header_size + start * dtype.itemsize)
+                f.write(values.astype(dtype).tobytes())
+                f.truncate()
+                f.flush()
+                f.seek(0)
+                f.write(header.getvalue())
+                return
+    existing = np.load(path)
+    save_npy(path, np.concatenate([existing[:start], values.astype(existing.dtype)]))
+
+
+def encode(values, names, codes_by_name):
+    """int32 codes for values; names and codes_by_name are extended with unseen values"""
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        code = codes_by_name.get(value)
+        if code is None:
+            code = codes_by_name[value] = len(names)
+            names.append(value)
+        codes[i] = code
+    return codes
+
+
+def read_meta(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, SNAPSHOT_META)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION or not os.path.isdir(os.path.join(snapshot_dir, meta["generation"])):
+        return None
+    return meta
+
+
+def write_meta(snapshot_dir, meta):
+    path = os.path.join(snapshot_dir, SNAPSHOT_META)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_names(generation_dir, name):
+    path = os.path.join(generation_dir, f"{name}.npy")
+    if not os.path.exists(path):
+        return []
+    return [str(value) for value in np.load(path)]
+
+
+def export_rows(conn, generation_dir, meta, append):
+    """Export rows above the last exported ids; returns (enrollments added, payments added)"""
+    course_names = load_names(generation_dir, "course_names") if append else []
+    student_names = load_names(generation_dir, "student_names") if append else []
+    course_codes = {name: code for code, name in enumerate(course_names)}
+    student_codes = {name: code for code, name in enumerate(student_names)}
+
+    added = []
+    for table, columns, sql in (("enrollments", ENROLLMENT_COLUMNS, ENROLLMENTS_SQL),
+                                ("payments", PAYMENT_COLUMNS, PAYMENTS_SQL)):
+        state = meta[table]
+        rows = conn.execute(sql, (state["max_id"] if append else 0,)).fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        arrays = {}
+        for (column, dtype), column_values in zip(columns.items(), values):
+            if column == "course_name":
+                arrays[column] = encode(column_values, course_names, course_codes)
+            elif column == "student_name":
+                arrays[column] = encode(column_values, student_names, student_codes)
+            else:
+                arrays[column] = np.array(column_values, dtype=dtype)
+        for column, array in arrays.items():
+            path = column_path(generation_dir, table, column)
+            if append:
+                if len(array):
+                    append_npy(path, array, state["rows"])
+            else:
+                save_npy(path, array)
+        if rows:
+            state["rows"] = (state["rows"] if append else 0) + len(rows)
+            state["max_id"] = int(rows[-1][0])
+        added.append(len(rows))
+
+    save_npy(os.path.join(generation_dir, "course_names.npy"), np.array(course_names, dtype=str))
+    save_npy(os.path.join(generation_dir, "student_names.npy"), np.array(student_names, dtype=str))
+    return tuple(added)
+
+
+def refresh_snapshot(snapshot_dir=SNAPSHOT_DIR, db_path=DB_NAME):
+    """Bring the snapshot up to date with the database; returns a summary dict"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    meta = read_meta(snapshot_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        # One read transaction, so the exported rows and change_seq agree
+        conn.execute("BEGIN")
+        latest_seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+        if meta is not None and latest_seq == meta["change_seq"]:
+            return {"mode": "unchanged", "enrollments_added": 0, "payments_added": 0, "change_seq": latest_seq}
+
+        # Pruned entries could have hidden an update or delete, so a snapshot older than them is rebuilt
+        oldest_seq = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0] or 0
+        append = (meta is not None and oldest_seq - 1 <= meta["change_seq"] < latest_seq
+                  and not conn.execute("""
+            SELECT 1 FROM change_log
+            WHERE seq > ? AND (op = 'RESTORE' OR (table_name IN ('enrollments', 'payments') AND op != 'INSERT'))
+            LIMIT 1
+        """, (meta["change_seq"],)).fetchone())
+
+        previous_generation = meta["generation"] if meta else None
+        if not append:
+            number = meta["generation_number"] + 1 if meta else 1
+            meta = {
+                "version": SNAPSHOT_VERSION,
+                "generation_number": number,
+                "generation": f"gen{number:06d}",
+                "enrollments": {"rows": 0, "max_id": 0},
+                "payments": {"rows": 0, "max_id": 0},
+            }
+        generation_dir = os.path.join(snapshot_dir, meta["generation"])
+        os.makedirs(generation_dir, exist_ok=True)
+        enrollments_added, payments_added = export_rows(conn, generation_dir, meta, append)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    meta["change_seq"] = latest_seq
+    meta["refreshed_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    write_meta(snapshot_dir, meta)
+    if not append and previous_generation:
+        # Readers still mapping the old files keep them until they close (ignored where that blocks deletion)
+        shutil.rmtree(os.path.join(snapshot_dir, previous_generation), ignore_errors=True)
+    return {
+        "mode": "incremental" if append else "full",
+        "enrollments_added": enrollments_added,
+        "payments_added": payments_added,
+        "change_seq": latest_seq,
+    }
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a refreshed snapshot.
+
+    enrollments and payments map column names to arrays backed by the
+    .npy files; nothing is read from disk until a column is used. Rows
+    appended by a refresh after opening are not visible.
+    """
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.meta = read_meta(snapshot_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"No report snapshot in {snapshot_dir}; run refresh_snapshot() first")
+        generation_dir = os.path.join(snapshot_dir, self.meta["generation"])
+        self.enrollments = self.load_columns(generation_dir, "enrollments", ENROLLMENT_COLUMNS)
+        self.payments = self.load_columns(generation_dir, "payments", PAYMENT_COLUMNS)
+        self.course_names = np.load(os.path.join(generation_dir, "course_names.npy"))
+        self.student_names = np.load(os.path.join(generation_dir, "student_names.npy"), mmap_mode="r")
+
+    def load_columns(self, generation_dir, table, columns):
+        rows = self.meta[table]["rows"]
+        arrays = {}
+        for column in columns:
+            array = np.load(column_path(generation_dir, table, column), mmap_mode="r")
+            # Files may already hold rows appended after this meta was written
+            arrays[column] = array[:rows]
+        return arrays
+
+    def ledger(self):
+        """analytics.Ledger over the mapped columns, for the reports in analytics.py"""
+        return Ledger(
+            self.enrollments["id"],
+            self.course_names,
+            self.enrollments["course_name"],
+            self.enrollments["fee"],
+            self.enrollments["day"],
+            self.payments["enrollment_id"],
+            self.payments["amount"],
+            self.payments["day"],
+        )
+
+
+def open_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    return Snapshot(snapshot_dir)
+
+
+if __name__ == "__main__":
+    summary = refresh_snapshot()
+    print(f"Snapshot refreshed ({summary['mode']}): {summary['enrollments_added']} enrollments and "
+          f"{summary['payments_added']} payments exported, up to change #{summary['change_seq']}")
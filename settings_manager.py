@@ -1,23 +1,17 @@
 import os
-import shutil
 import json
-import sqlite3
-import keyring
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, 
     QMessageBox, QSpinBox, QFileDialog, QGroupBox, QTabWidget, QTextEdit,
-    QProgressBar, QSizePolicy, QFrame
+    QProgressBar, QSizePolicy, QFrame, QComboBox, QCheckBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
-
-# Dropbox imports (optional - will handle gracefully if not installed)
-try:
-    import dropbox
-    DROPBOX_AVAILABLE = True
-except ImportError:
-    DROPBOX_AVAILABLE = False
+from database import get_read_cache_stats
+from backup_engine import DEFAULT_COMPRESSION, available_compressions
+from backup_catalog import get_backup_files
+from backup_scheduler import BackupWorker, reload_backup_scheduler
 
 class LoadingOverlay(QFrame):
     """Professional loading overlay with spinner and message"""
@@ -25,12 +19,7 @@ class LoadingOverlay(QFrame):
         super().__init__(parent)
         # Make it a proper overlay within the parent window
         self.setWindowFlags(Qt.Widget)
-        self.setStyleSheet("""
-            QFrame {
-                background-color: rgba(0, 0, 0, 150);
-                border-radius: 10px;
-            }
-        """)
+        self.setObjectName("loadingOverlay")
         
         # Main layout
         layout = QVBoxLayout()
@@ -40,40 +29,19 @@ class LoadingOverlay(QFrame):
         # Simple loading indicator (no animation)
         self.loading_indicator = QLabel("⏳")
         self.loading_indicator.setFixedSize(60, 60)
-        self.loading_indicator.setStyleSheet("""
-            QLabel {
-                background-color: transparent;
-                font-size: 24px;
-                color: #3498db;
-                font-weight: bold;
-            }
-        """)
+        self.loading_indicator.setObjectName("loadingIndicator")
         self.loading_indicator.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.loading_indicator, 0, Qt.AlignCenter)
         
         # Loading text
         self.loading_label = QLabel("Backup in Progress...")
-        self.loading_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                background-color: transparent;
-            }
-        """)
+        self.loading_label.setObjectName("loadingMessage")
         self.loading_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.loading_label)
         
         # Warning message
         self.warning_label = QLabel("Please do not close this window")
-        self.warning_label.setStyleSheet("""
-            QLabel {
-                color: #f39c12;
-                font-size: 12px;
-                font-weight: 500;
-                background-color: transparent;
-            }
-        """)
+        self.warning_label.setObjectName("loadingWarning")
         self.warning_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.warning_label)
         
@@ -96,674 +64,11 @@ class LoadingOverlay(QFrame):
         """Update the loading message"""
         self.loading_label.setText(message)
 
-class BackupWorker(QThread):
-    progress = pyqtSignal(int)
-    status = pyqtSignal(str)
-    finished = pyqtSignal(dict)  # Changed to emit detailed results
-    
-    def __init__(self, operation_type, config):
-        super().__init__()
-        self.operation_type = operation_type  # 'backup' or 'restore'
-        self.config = config
-        
-    def run(self):
-        try:
-            if self.operation_type == "backup":
-                self.status.emit("Starting backup operations...")
-                results = self.perform_backup()
-            elif self.operation_type == "restore":
-                self.status.emit("Starting restore operations...")
-                results = self.perform_restore()
-            else:
-                results = {"success": False, "message": "Invalid operation type"}
-                
-            self.finished.emit(results)
-        except Exception as e:
-            self.finished.emit({"success": False, "message": f"Operation failed: {str(e)}"})
-    
-    def perform_backup(self):
-        """Perform backup on both local and Dropbox if configured"""
-        results = {
-            "success": True,
-            "local": {"success": False, "message": ""},
-            "dropbox": {"success": False, "message": ""},
-            "summary": ""
-        }
-        
-        # Check if local backup is configured
-        local_path = self.config.get('local_path', '').strip()
-        dropbox_token = self.config.get('dropbox_token', '').strip()
-        
-        if not local_path and not dropbox_token:
-            return {
-                "success": False,
-                "message": "No backup methods configured. Please set up local path or Dropbox token."
-            }
-        
-        # Perform local backup if configured
-        if local_path:
-            self.status.emit("Performing local backup...")
-            try:
-                results["local"] = self.local_backup()
-                if results["local"]["success"]:
-                    self.status.emit(f"✅ Local backup successful: {results['local']['message']}")
-                else:
-                    self.status.emit(f"❌ Local backup failed: {results['local']['message']}")
-            except Exception as e:
-                error_msg = f"Local backup failed: {str(e)}"
-                results["local"] = {"success": False, "message": error_msg}
-                self.status.emit(f"❌ {error_msg}")
-        
-        # Perform Dropbox backup if configured
-        if dropbox_token:
-            self.status.emit("Performing Dropbox backup...")
-            try:
-                results["dropbox"] = self.dropbox_backup()
-                if results["dropbox"]["success"]:
-                    self.status.emit(f"✅ Dropbox backup successful: {results['dropbox']['message']}")
-                else:
-                    self.status.emit(f"❌ Dropbox backup failed: {results['dropbox']['message']}")
-            except Exception as e:
-                error_msg = f"Dropbox backup failed: {str(e)}"
-                results["dropbox"] = {"success": False, "message": error_msg}
-                self.status.emit(f"❌ {error_msg}")
-        
-        # Generate summary
-        local_status = "✅ Success" if results["local"]["success"] else "❌ Failed"
-        dropbox_status = "✅ Success" if results["dropbox"]["success"] else "❌ Failed"
-        
-        if local_path and dropbox_token:
-            results["summary"] = f"Local: {local_status} | Dropbox: {dropbox_status}"
-        elif local_path:
-            results["summary"] = f"Local: {local_status}"
-        else:
-            results["summary"] = f"Dropbox: {dropbox_status}"
-        
-        # Overall success if at least one backup succeeded
-        results["success"] = results["local"]["success"] or results["dropbox"]["success"]
-        
-        return results
-    
-    def perform_restore(self):
-        """Perform restore operation"""
-        results = {
-            "success": True,
-            "message": "Restore completed successfully",
-            "local": {"success": False, "message": ""},
-            "dropbox": {"success": False, "message": ""}
-        }
-        
-        # Try local restore first
-        local_path = self.config.get('local_path', '')
-        if local_path and os.path.exists(local_path):
-            try:
-                self.status.emit("Attempting local restore...")
-                local_result = self.local_restore()
-                results["local"] = local_result
-                if local_result["success"]:
-                    self.status.emit(f"✅ Local restore successful: {local_result['message']}")
-                else:
-                    self.status.emit(f"❌ Local restore failed: {local_result['message']}")
-            except Exception as e:
-                error_msg = f"Local restore failed: {str(e)}"
-                results["local"] = {"success": False, "message": error_msg}
-                self.status.emit(f"❌ {error_msg}")
-        
-        # Try Dropbox restore if local failed or not configured
-        if not results["local"]["success"]:
-            dropbox_token = self.config.get('dropbox_token', '')
-            if dropbox_token:
-                try:
-                    self.status.emit("Attempting Dropbox restore...")
-                    dropbox_result = self.dropbox_restore()
-                    results["dropbox"] = dropbox_result
-                    if dropbox_result["success"]:
-                        self.status.emit(f"✅ Dropbox restore successful: {dropbox_result['message']}")
-                    else:
-                        self.status.emit(f"❌ Dropbox restore failed: {dropbox_result['message']}")
-                except Exception as e:
-                    error_msg = f"Dropbox restore failed: {str(e)}"
-                    results["dropbox"] = {"success": False, "message": error_msg}
-                    self.status.emit(f"❌ {error_msg}")
-        
-        # Determine overall success
-        if results["local"]["success"] or results["dropbox"]["success"]:
-            results["success"] = True
-            results["message"] = "Restore completed successfully"
-        else:
-            results["success"] = False
-            results["message"] = "Restore failed - no valid backups found"
-        
-        return results
-    
-    def local_restore(self):
-        """Restore from local backup"""
-        try:
-            backup_dir = self.config.get('local_path', '')
-            
-            if not backup_dir or not os.path.exists(backup_dir):
-                return {"success": False, "message": "Local backup directory not found"}
-            
-            # Find the most recent backup file
-            backup_files = []
-            for filename in os.listdir(backup_dir):
-                if filename.startswith("institute_backup_") and filename.endswith(".db"):
-                    file_path = os.path.join(backup_dir, filename)
-                    mtime = os.path.getmtime(file_path)
-                    # Also extract timestamp from filename as fallback
-                    try:
-                        # Extract timestamp from filename: institute_backup_YYYYMMDD_HHMMSS.db
-                        timestamp_str = filename.replace("institute_backup_", "").replace(".db", "")
-                        filename_timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                        backup_files.append((mtime, file_path, filename, filename_timestamp))
-                    except:
-                        # If timestamp parsing fails, just use file modification time
-                        backup_files.append((mtime, file_path, filename, None))
-            
-            if not backup_files:
-                return {"success": False, "message": "No backup files found in local directory"}
-            
-            # Sort by modification time (newest first), with filename timestamp as tiebreaker
-            backup_files.sort(key=lambda x: (x[0], x[3] if x[3] else datetime.min), reverse=True)
-            latest_backup_path = backup_files[0][1]
-            latest_backup_name = backup_files[0][2]
-            
-            # Debug: Log which backup is being restored
-            print(f"Found {len(backup_files)} backup files. Restoring from: {latest_backup_name}")
-            print(f"Backup files found: {[f[2] for f in backup_files[:3]]}")  # Show first 3
-            
-            # Create backup of current database before restore
-            current_db_path = "institute.db"
-            if os.path.exists(current_db_path):
-                backup_current_path = f"institute_backup_before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                shutil.copy2(current_db_path, backup_current_path)
-            
-            # Restore the database
-            shutil.copy2(latest_backup_path, current_db_path)
-            
-            # Verify the restored database is valid
-            try:
-                import sqlite3
-                test_conn = sqlite3.connect(current_db_path)
-                test_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                test_conn.close()
-            except Exception as e:
-                return {"success": False, "message": f"Restored database is corrupted: {str(e)}"}
-            
-            return {"success": True, "message": f"Restored from local backup: {latest_backup_name}"}
-            
-        except Exception as e:
-            return {"success": False, "message": f"Local restore failed: {str(e)}"}
-    
-    def dropbox_restore(self):
-        """Restore from Dropbox backup"""
-        try:
-            if not DROPBOX_AVAILABLE:
-                return {"success": False, "message": "Dropbox SDK not installed"}
-            
-            access_token = self.config.get('dropbox_token', '')
-            if not access_token:
-                return {"success": False, "message": "Dropbox token not configured"}
-            
-            # Initialize Dropbox client
-            dbx = dropbox.Dropbox(access_token)
-            
-            # List backup files in Dropbox
-            try:
-                result = dbx.files_list_folder("/InstituteBackups")
-                backup_files = []
-                
-                for entry in result.entries:
-                    if entry.name.startswith("institute_backup_") and entry.name.endswith(".db"):
-                        # Also extract timestamp from filename as fallback
-                        try:
-                            # Extract timestamp from filename: institute_backup_YYYYMMDD_HHMMSS.db
-                            timestamp_str = entry.name.replace("institute_backup_", "").replace(".db", "")
-                            filename_timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                            backup_files.append((entry.name, entry.server_modified, filename_timestamp))
-                        except:
-                            # If timestamp parsing fails, just use server modification time
-                            backup_files.append((entry.name, entry.server_modified, None))
-                
-                if not backup_files:
-                    return {"success": False, "message": "No backup files found in Dropbox"}
-                
-                # Sort by server modification time (newest first), with filename timestamp as tiebreaker
-                backup_files.sort(key=lambda x: (x[1], x[2] if x[2] else datetime.min), reverse=True)
-                latest_backup_name = backup_files[0][0]
-                
-                # Debug: Log which backup is being restored
-                print(f"Found {len(backup_files)} Dropbox backup files. Restoring from: {latest_backup_name}")
-                print(f"Dropbox backup files found: {[f[0] for f in backup_files[:3]]}")  # Show first 3
-                
-                # Download the latest backup
-                backup_path = f"/InstituteBackups/{latest_backup_name}"
-                metadata, response = dbx.files_download(backup_path)
-                
-                # Create backup of current database before restore
-                current_db_path = "institute.db"
-                if os.path.exists(current_db_path):
-                    backup_current_path = f"institute_backup_before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                    shutil.copy2(current_db_path, backup_current_path)
-                
-                # Write the downloaded backup to current database
-                with open(current_db_path, 'wb') as f:
-                    f.write(response.content)
-                
-                # Verify the restored database is valid
-                try:
-                    import sqlite3
-                    test_conn = sqlite3.connect(current_db_path)
-                    test_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                    test_conn.close()
-                except Exception as e:
-                    return {"success": False, "message": f"Restored database is corrupted: {str(e)}"}
-                
-                return {"success": True, "message": f"Restored from Dropbox backup: {latest_backup_name}"}
-                
-            except dropbox.exceptions.ApiError as e:
-                return {"success": False, "message": f"Dropbox API error: {str(e)}"}
-                
-        except Exception as e:
-            return {"success": False, "message": f"Dropbox restore failed: {str(e)}"}
-    
-    def local_backup(self):
-        try:
-            backup_dir = self.config.get('local_path', '')
-            max_revisions = self.config.get('max_revisions', 5)
-            
-            if not backup_dir:
-                return {"success": False, "message": "Local backup path not configured"}
-            
-            # Check if directory exists or can be created
-            try:
-                os.makedirs(backup_dir, exist_ok=True)
-            except PermissionError:
-                return {"success": False, "message": f"Permission denied: Cannot create directory '{backup_dir}'"}
-            except OSError as e:
-                return {"success": False, "message": f"Cannot access directory '{backup_dir}': {str(e)}"}
-            
-            # Generate backup filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"institute_backup_{timestamp}.db"
-            backup_path = os.path.join(backup_dir, backup_filename)
-            
-            # Check if database file exists
-            db_path = "institute.db"
-            if not os.path.exists(db_path):
-                return {"success": False, "message": f"Database file '{db_path}' not found in current directory"}
-            
-            # Check available disk space
-            try:
-                statvfs = os.statvfs(backup_dir)
-                free_space = statvfs.f_frsize * statvfs.f_bavail
-                db_size = os.path.getsize(db_path)
-                if free_space < db_size * 2:  # Need at least 2x the database size
-                    return {"success": False, "message": f"Insufficient disk space. Available: {free_space//1024//1024}MB, Required: {db_size//1024//1024}MB"}
-            except:
-                pass  # Skip disk space check if not available
-            
-            # Copy database file
-            try:
-                shutil.copy2(db_path, backup_path)
-            except PermissionError:
-                return {"success": False, "message": f"Permission denied: Cannot write to '{backup_path}'"}
-            except OSError as e:
-                return {"success": False, "message": f"Failed to copy database: {str(e)}"}
-            
-            # Clean up old backups
-            try:
-                self.cleanup_old_backups(backup_dir, max_revisions)
-            except Exception as e:
-                # Don't fail the backup if cleanup fails, but log it
-                print(f"Warning: Failed to cleanup old backups: {str(e)}")
-            
-            return {"success": True, "message": f"Local backup created: {backup_filename}"}
-            
-        except Exception as e:
-            return {"success": False, "message": f"Local backup failed: {str(e)}"}
-    
-    def cleanup_old_backups(self, backup_dir, max_revisions):
-        """Clean up old backup files to maintain revision limit"""
-        try:
-            # Get all backup files
-            backup_files = []
-            for filename in os.listdir(backup_dir):
-                if filename.startswith("institute_backup_") and filename.endswith(".db"):
-                    file_path = os.path.join(backup_dir, filename)
-                    # Get file modification time
-                    mtime = os.path.getmtime(file_path)
-                    backup_files.append((mtime, file_path, filename))
-            
-            # Sort by modification time (newest first)
-            backup_files.sort(reverse=True)
-            
-            # Remove excess backups
-            removed_count = 0
-            if len(backup_files) > max_revisions:
-                files_to_remove = backup_files[max_revisions:]
-                for _, file_path, filename in files_to_remove:
-                    try:
-                        os.remove(file_path)
-                        removed_count += 1
-                        print(f"Removed old backup: {filename}")
-                    except Exception as e:
-                        print(f"Failed to remove {filename}: {str(e)}")
-            
-            if removed_count > 0:
-                print(f"Cleanup completed: Removed {removed_count} old backup(s), keeping {max_revisions} most recent")
-                        
-        except Exception as e:
-            print(f"Cleanup failed: {str(e)}")
-    
-    def dropbox_backup(self):
-        try:
-            if not DROPBOX_AVAILABLE:
-                return {"success": False, "message": "Dropbox SDK not installed. Run: pip install dropbox"}
-            
-            access_token = self.config.get('dropbox_token', '')
-            max_revisions = self.config.get('max_revisions', 5)
-            
-            if not access_token:
-                return {"success": False, "message": "Dropbox token not configured"}
-            
-            # Initialize Dropbox client
-            try:
-                dbx = dropbox.Dropbox(access_token)
-            except Exception as e:
-                return {"success": False, "message": f"Failed to initialize Dropbox client: {str(e)}"}
-            
-            # Test connection and permissions first
-            try:
-                # Try to list files to test permissions
-                dbx.files_list_folder("")
-            except dropbox.exceptions.AuthError as e:
-                return {"success": False, "message": f"Invalid Dropbox token. Please check your token and try again.\n\nError details: {str(e)}"}
-            except dropbox.exceptions.ApiError as e:
-                if "scope" in str(e).lower() or "permitted" in str(e).lower():
-                    return {"success": False, "message": f"Missing Dropbox permissions. Please enable these scopes in your Dropbox app:\n\n- files.content.write\n- files.metadata.write\n- files.content.read\n- files.metadata.read\n\nThen generate a new token.\n\nError details: {str(e)}"}
-                else:
-                    return {"success": False, "message": f"Dropbox API error: {str(e)}"}
-            except Exception as e:
-                return {"success": False, "message": f"Failed to connect to Dropbox: {str(e)}"}
-            
-            # Generate incremental backup filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"institute_backup_{timestamp}.db"
-            
-            # Create incremental backup
-            try:
-                backup_data = self.create_incremental_backup()
-            except Exception as e:
-                return {"success": False, "message": f"Failed to create backup data: {str(e)}"}
-            
-            # Create backup folder if it doesn't exist
-            try:
-                dbx.files_create_folder("/InstituteBackups")
-            except dropbox.exceptions.ApiError as e:
-                if "conflict" not in str(e).lower():
-                    return {"success": False, "message": f"Failed to create backup folder: {str(e)}"}
-                # Folder already exists, which is fine
-            
-            # Upload to Dropbox
-            try:
-                backup_path = f"/InstituteBackups/{backup_filename}"
-                dbx.files_upload(backup_data, backup_path, mode=dropbox.files.WriteMode.overwrite)
-            except dropbox.exceptions.ApiError as e:
-                return {"success": False, "message": f"Failed to upload backup to Dropbox: {str(e)}"}
-            except Exception as e:
-                return {"success": False, "message": f"Upload failed: {str(e)}"}
-            
-            # Update backup index
-            try:
-                self.update_backup_index(dbx, backup_filename, timestamp)
-            except Exception as e:
-                # Don't fail the backup if index update fails
-                pass
-            
-            # Clean up old Dropbox backups
-            try:
-                self.cleanup_dropbox_backups(dbx, max_revisions)
-            except Exception as e:
-                # Don't fail the backup if cleanup fails
-                pass
-            
-            return {"success": True, "message": f"Dropbox backup uploaded successfully: {backup_filename}"}
-            
-        except Exception as e:
-            return {"success": False, "message": f"Dropbox backup failed: {str(e)}"}
-    
-    def create_incremental_backup(self):
-        """Create simple database backup (not compressed)"""
-        try:
-            import sqlite3
-            import tempfile
-            
-            # Source database path
-            source_db_path = "institute.db"
-            if not os.path.exists(source_db_path):
-                raise Exception("Database file not found")
-            
-            # Create temporary backup database
-            temp_backup_path = tempfile.mktemp(suffix='.db')
-            
-            try:
-                # Connect to source database
-                source_conn = sqlite3.connect(source_db_path)
-                
-                # Create backup database
-                backup_conn = sqlite3.connect(temp_backup_path)
-                
-                # Use SQLite's backup API to create a proper database file
-                def progress_callback(status, remaining, total):
-                    # Optional: Update progress if needed
-                    pass
-                
-                # Perform backup - creates a proper database file
-                source_conn.backup(backup_conn, pages=1, progress=progress_callback)
-                
-                # Close connections
-                source_conn.close()
-                backup_conn.close()
-                
-                # Read the backup file (don't compress - keep as regular database)
-                with open(temp_backup_path, 'rb') as f:
-                    backup_data = f.read()
-                
-                return backup_data
-                
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_backup_path)
-                except:
-                    pass
-            
-        except Exception as e:
-            # Clean up temporary file if it exists
-            try:
-                if 'temp_backup_path' in locals():
-                    os.unlink(temp_backup_path)
-            except:
-                pass
-            raise Exception(f"Failed to create backup: {str(e)}")
-    
-    def get_last_backup_timestamp(self):
-        """Get timestamp of last successful backup"""
-        try:
-            if os.path.exists("backup_index.json"):
-                with open("backup_index.json", "r") as f:
-                    index = json.load(f)
-                    return index.get('last_backup_timestamp')
-        except:
-            pass
-        return None
-    
-    def update_backup_index(self, dbx, backup_filename, timestamp):
-        """Update backup index file"""
-        try:
-            index_data = {
-                'last_backup_timestamp': timestamp,
-                'last_backup_file': backup_filename,
-                'backup_count': self.get_backup_count() + 1
-            }
-            
-            # Save locally
-            with open("backup_index.json", "w") as f:
-                json.dump(index_data, f)
-            
-            # Upload to Dropbox
-            index_json = json.dumps(index_data)
-            dbx.files_upload(index_json.encode('utf-8'), "/InstituteBackups/backup_index.json", 
-                           mode=dropbox.files.WriteMode.overwrite)
-            
-        except Exception as e:
-            print(f"Warning: Could not update backup index: {e}")
-    
-    def get_backup_count(self):
-        """Get current backup count"""
-        try:
-            if os.path.exists("backup_index.json"):
-                with open("backup_index.json", "r") as f:
-                    index = json.load(f)
-                    return index.get('backup_count', 0)
-        except:
-            pass
-        return 0
-    
-    def cleanup_dropbox_backups(self, dbx, max_revisions):
-        """Remove old Dropbox backup files"""
-        try:
-            # List all backup files
-            result = dbx.files_list_folder("/InstituteBackups")
-            backup_files = []
-            
-            for entry in result.entries:
-                if entry.name.startswith("institute_backup_") and entry.name.endswith(".db"):
-                    backup_files.append((entry.name, entry.server_modified))
-            
-            # Sort by modification time (newest first)
-            backup_files.sort(key=lambda x: x[1], reverse=True)
-            
-            # Delete excess backups
-            for filename, _ in backup_files[max_revisions:]:
-                try:
-                    dbx.files_delete(f"/InstituteBackups/{filename}")
-                except:
-                    pass  # File might already be deleted
-                    
-        except Exception as e:
-            print(f"Error cleaning up Dropbox backups: {e}")
-
 class SettingsManager(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Settings")
         self.setGeometry(200, 200, 800, 700)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                color: #2c3e50;
-            }
-            QLabel {
-                color: #2c3e50;
-                font-weight: 600;
-                font-size: 12px;
-                margin: 5px 0px;
-                background-color: transparent;
-            }
-            QLineEdit {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 10px;
-                font-size: 12px;
-                color: #495057;
-            }
-            QLineEdit:focus {
-                border-color: #3498db;
-                background-color: #f8f9fa;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 12px 20px;
-                border-radius: 6px;
-                font-size: 12px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-                color: white;
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-                color: white;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-                color: #7f8c8d;
-            }
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #bdc3c7;
-                border-radius: 8px;
-                margin-top: 10px;
-                padding-top: 10px;
-                color: #2c3e50;
-                background-color: white;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-                color: #2c3e50;
-                background-color: white;
-            }
-            QTabWidget::pane {
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-                background-color: white;
-            }
-            QTabBar::tab {
-                background-color: #f8f9fa;
-                color: #495057;
-                padding: 12px 20px;
-                margin-right: 2px;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-                font-weight: bold;
-            }
-            QTabBar::tab:selected {
-                background-color: white;
-                color: #2c3e50;
-                border-bottom: 2px solid #3498db;
-            }
-            QTabBar::tab:hover {
-                background-color: #e9ecef;
-                color: #2c3e50;
-            }
-            QSpinBox {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 8px;
-                font-size: 12px;
-                color: #495057;
-            }
-            QTextEdit {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 8px;
-                font-size: 11px;
-                font-family: 'Courier New', monospace;
-                color: #495057;
-            }
-        """)
 
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -771,16 +76,7 @@ class SettingsManager(QWidget):
 
         # Title section
         title_label = QLabel("Settings & Backup")
-        title_label.setStyleSheet("""
-            font-size: 18px;
-            font-weight: bold;
-            color: #2c3e50;
-            margin: 10px 0px 20px 0px;
-            padding: 15px;
-            background-color: white;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-        """)
+        title_label.setProperty("role", "title")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
 
@@ -815,6 +111,7 @@ class SettingsManager(QWidget):
         self.save_button = None
         
         self.load_settings()
+        self.refresh_restore_points()
 
     def show_loading_overlay(self, message="Backup in Progress..."):
         """Show loading overlay and disable buttons"""
@@ -865,7 +162,7 @@ class SettingsManager(QWidget):
         
         revisions_layout = QHBoxLayout()
         revisions_label = QLabel("Max Revisions to Keep:")
-        revisions_label.setStyleSheet("color: #2c3e50; font-weight: bold;")
+        revisions_label.setProperty("role", "field")
         revisions_layout.addWidget(revisions_label)
         self.max_revisions_spin = QSpinBox()
         self.max_revisions_spin.setRange(1, 20)
@@ -874,16 +171,72 @@ class SettingsManager(QWidget):
         revisions_layout.addStretch()
         general_layout.addLayout(revisions_layout)
         
+        compression_layout = QHBoxLayout()
+        compression_label = QLabel("Backup Compression:")
+        compression_label.setProperty("role", "field")
+        compression_layout.addWidget(compression_label)
+        self.compression_combo = QComboBox()
+        self.compression_combo.addItems(available_compressions())
+        self.compression_combo.setCurrentText(DEFAULT_COMPRESSION)
+        compression_layout.addWidget(self.compression_combo)
+        compression_layout.addStretch()
+        general_layout.addLayout(compression_layout)
+        
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel("Backup Type:")
+        mode_label.setProperty("role", "field")
+        mode_layout.addWidget(mode_label)
+        self.backup_mode_combo = QComboBox()
+        self.backup_mode_combo.addItems(["full", "incremental"])
+        self.backup_mode_combo.setToolTip("Incremental backups only store the parts of the database that changed")
+        mode_layout.addWidget(self.backup_mode_combo)
+        mode_layout.addStretch()
+        general_layout.addLayout(mode_layout)
+        
         general_group.setLayout(general_layout)
         layout.addWidget(general_group)
 
+        # Automatic backup settings
+        auto_group = QGroupBox("Automatic Backups")
+        auto_layout = QVBoxLayout()
+        
+        self.auto_backup_check = QCheckBox("Back up automatically in the background")
+        auto_layout.addWidget(self.auto_backup_check)
+        
+        interval_layout = QHBoxLayout()
+        interval_label = QLabel("Every (minutes):")
+        interval_label.setProperty("role", "field")
+        interval_layout.addWidget(interval_label)
+        self.auto_interval_spin = QSpinBox()
+        self.auto_interval_spin.setRange(5, 1440)
+        self.auto_interval_spin.setValue(60)
+        interval_layout.addWidget(self.auto_interval_spin)
+        
+        changes_label = QLabel("or after changes (0 = off):")
+        changes_label.setProperty("role", "field")
+        interval_layout.addWidget(changes_label)
+        self.auto_changes_spin = QSpinBox()
+        self.auto_changes_spin.setRange(0, 1000)
+        self.auto_changes_spin.setValue(0)
+        interval_layout.addWidget(self.auto_changes_spin)
+        interval_layout.addStretch()
+        auto_layout.addLayout(interval_layout)
+        
+        self.continuous_shipping_check = QCheckBox("Ship every change within seconds (point-in-time recovery)")
+        self.continuous_shipping_check.setToolTip(
+            "Uploads logged changes between backups; rebuild any moment with: python log_shipping.py --help")
+        auto_layout.addWidget(self.continuous_shipping_check)
+        
+        auto_group.setLayout(auto_layout)
+        layout.addWidget(auto_group)
+
         # Local backup settings
         local_group = QGroupBox("Local Drive Backup")
         local_layout = QVBoxLayout()
         
         path_layout = QHBoxLayout()
         path_label = QLabel("Backup Path:")
-        path_label.setStyleSheet("color: #2c3e50; font-weight: bold;")
+        path_label.setProperty("role", "field")
         path_layout.addWidget(path_label)
         self.local_path_input = QLineEdit()
         self.local_path_input.setPlaceholderText("Select backup directory...")
@@ -903,7 +256,7 @@ class SettingsManager(QWidget):
         
         token_layout = QHBoxLayout()
         token_label = QLabel("Dropbox Access Token:")
-        token_label.setStyleSheet("color: #2c3e50; font-weight: bold;")
+        token_label.setProperty("role", "field")
         token_layout.addWidget(token_label)
         self.dropbox_token_input = QLineEdit()
         self.dropbox_token_input.setPlaceholderText("Enter your Dropbox access token...")
@@ -917,7 +270,7 @@ class SettingsManager(QWidget):
         dropbox_layout.addLayout(token_layout)
         
         help_text = QLabel("Get your token from: https://www.dropbox.com/developers/apps")
-        help_text.setStyleSheet("color: #7f8c8d; font-size: 10px; font-style: italic;")
+        help_text.setProperty("role", "hint")
         dropbox_layout.addWidget(help_text)
         
         dropbox_group.setLayout(dropbox_layout)
@@ -930,45 +283,27 @@ class SettingsManager(QWidget):
         # Backup button
         self.backup_button = QPushButton("Create Backup")
         self.backup_button.clicked.connect(self.start_backup)
-        self.backup_button.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                font-size: 14px;
-                font-weight: bold;
-                padding: 15px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #229954;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-                color: #7f8c8d;
-            }
-        """)
+        self.backup_button.setProperty("role", "success")
         action_layout.addWidget(self.backup_button)
         
+        # Restore point picker, filled from the backup catalog
+        restore_point_layout = QHBoxLayout()
+        restore_point_label = QLabel("Restore Point:")
+        restore_point_label.setProperty("role", "field")
+        restore_point_layout.addWidget(restore_point_label)
+        self.restore_point_combo = QComboBox()
+        restore_point_layout.addWidget(self.restore_point_combo, 1)
+        
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh_restore_points)
+        refresh_btn.setFixedWidth(80)
+        restore_point_layout.addWidget(refresh_btn)
+        action_layout.addLayout(restore_point_layout)
+        
         # Restore button
         self.restore_button = QPushButton("Restore from Backup")
         self.restore_button.clicked.connect(self.start_restore)
-        self.restore_button.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                font-size: 14px;
-                font-weight: bold;
-                padding: 15px;
-                border-radius: 8px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-                color: #7f8c8d;
-            }
-        """)
+        self.restore_button.setProperty("role", "danger")
         action_layout.addWidget(self.restore_button)
         
         action_group.setLayout(action_layout)
@@ -995,8 +330,15 @@ class SettingsManager(QWidget):
         db_layout = QVBoxLayout()
         
         db_info = QLabel("Database: SQLite (institute.db)")
-        db_info.setStyleSheet("color: #27ae60; font-weight: bold; font-size: 14px;")
+        db_info.setProperty("role", "info")
+        db_info.setProperty("state", "ok")
         db_layout.addWidget(db_info)
+
+        cache = get_read_cache_stats()
+        cache_info = QLabel(f"Read cache: {cache['entries']}/{cache['size']} entries, {cache['hits']} hits, "
+                            f"{cache['misses']} misses, {cache['invalidations']} invalidated")
+        cache_info.setProperty("role", "hint")
+        db_layout.addWidget(cache_info)
         
         db_group.setLayout(db_layout)
         layout.addWidget(db_group)
@@ -1006,7 +348,7 @@ class SettingsManager(QWidget):
         app_layout = QVBoxLayout()
         
         app_info = QLabel("Institute Management System v1.0")
-        app_info.setStyleSheet("color: #2c3e50; font-weight: bold; font-size: 14px;")
+        app_info.setProperty("role", "info")
         app_layout.addWidget(app_info)
         
         app_group.setLayout(app_layout)
@@ -1075,11 +417,13 @@ The token will be stored securely in your settings.
     def start_restore(self):
         """Start restore operation"""
         reply = QMessageBox.question(self, 'Confirm Restore', 
-                                   'Are you sure you want to restore from backup?\nThis will replace your current database.',
+                                   f'Are you sure you want to restore from backup?\n\n{self.restore_point_combo.currentText()}\n\n'
+                                   'This will replace your current database.',
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
             config = self.get_secure_config()
+            config['restore_point'] = self.restore_point_combo.currentData()
             
             # Show loading overlay
             self.show_loading_overlay("Starting restore operations...")
@@ -1096,6 +440,36 @@ The token will be stored securely in your settings.
             
             self.backup_worker.start()
     
+    def refresh_restore_points(self):
+        """Fill the restore point picker from the backup catalog"""
+        self.restore_point_combo.clear()
+        self.restore_point_combo.addItem("Latest available backup", None)
+        try:
+            entries = get_backup_files(limit=100)
+        except Exception as e:
+            self.update_status(f"Could not read backup catalog: {str(e)}")
+            return
+        
+        for entry in entries:
+            destination = "Local" if entry["destination"] == "local" else "Dropbox"
+            text = f"{entry['created_at']}  |  {destination}  |  {entry['backup_mode']}"
+            if entry["size"] is not None:
+                text += f"  |  {entry['size'] // 1024} KB"
+            if entry["row_counts"]:
+                text += (f"  |  {entry['row_counts'].get('students', 0)} students, "
+                         f"{entry['row_counts'].get('payments', 0)} payments")
+            self.restore_point_combo.addItem(text, entry)
+    
+    def closeEvent(self, event):
+        """Keep the window (and its worker thread) alive until a running backup or restore finishes"""
+        worker = getattr(self, 'backup_worker', None)
+        if worker is not None and worker.isRunning():
+            QMessageBox.information(self, "Operation in Progress",
+                                    "Please wait for the current backup or restore to finish before closing Settings.")
+            event.ignore()
+            return
+        super().closeEvent(event)
+    
     def update_loading_message(self, message):
         """Update both status text and loading overlay message"""
         self.update_status(message)
@@ -1105,11 +479,14 @@ The token will be stored securely in your settings.
         """Get configuration from secure storage"""
         config = {
             'local_path': self.local_path_input.text().strip(),
-            'max_revisions': self.max_revisions_spin.value()
+            'max_revisions': self.max_revisions_spin.value(),
+            'compression': self.compression_combo.currentText(),
+            'backup_mode': self.backup_mode_combo.currentText()
         }
         
         # Get Dropbox token from secure storage
         try:
+            import keyring
             dropbox_token = keyring.get_password("institute_app", "dropbox_token")
             config['dropbox_token'] = dropbox_token or ""
         except:
@@ -1119,6 +496,9 @@ The token will be stored securely in your settings.
 
     def update_progress(self, value):
         """Update progress bar"""
+        # Switch from indeterminate to percentage mode on the first report
+        if self.progress_bar.maximum() == 0:
+            self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(value)
 
     def update_status(self, message):
@@ -1158,6 +538,8 @@ The token will be stored securely in your settings.
             
             self.update_status(f"❌ {error_msg}")
             QMessageBox.warning(self, "Backup Failed", detailed_msg)
+        
+        self.refresh_restore_points()
     
     def restore_finished(self, results):
         """Handle restore completion"""
@@ -1171,6 +553,8 @@ The token will be stored securely in your settings.
             error_msg = results.get("message", "Restore failed")
             self.update_status(f"❌ {error_msg}")
             QMessageBox.warning(self, "Restore Failed", error_msg)
+        
+        self.refresh_restore_points()
 
     def load_settings(self):
         """Load settings from file and secure storage"""
@@ -1181,9 +565,16 @@ The token will be stored securely in your settings.
                     
                 self.local_path_input.setText(settings.get("local_path", ""))
                 self.max_revisions_spin.setValue(settings.get("max_revisions", 5))
+                self.compression_combo.setCurrentText(settings.get("compression", DEFAULT_COMPRESSION))
+                self.backup_mode_combo.setCurrentText(settings.get("backup_mode", "full"))
+                self.auto_backup_check.setChecked(settings.get("auto_backup_enabled", False))
+                self.auto_interval_spin.setValue(settings.get("auto_backup_interval_minutes", 60))
+                self.auto_changes_spin.setValue(settings.get("auto_backup_after_changes", 0))
+                self.continuous_shipping_check.setChecked(settings.get("continuous_shipping", False))
             
             # Load Dropbox token from secure storage
             try:
+                import keyring
                 dropbox_token = keyring.get_password("institute_app", "dropbox_token")
                 if dropbox_token:
                     self.dropbox_token_input.setText(dropbox_token)
@@ -1203,7 +594,13 @@ The token will be stored securely in your settings.
             # Save non-sensitive settings to file
             settings = {
                 "local_path": self.local_path_input.text().strip(),
-                "max_revisions": self.max_revisions_spin.value()
+                "max_revisions": self.max_revisions_spin.value(),
+                "compression": self.compression_combo.currentText(),
+                "backup_mode": self.backup_mode_combo.currentText(),
+                "auto_backup_enabled": self.auto_backup_check.isChecked(),
+                "auto_backup_interval_minutes": self.auto_interval_spin.value(),
+                "auto_backup_after_changes": self.auto_changes_spin.value(),
+                "continuous_shipping": self.continuous_shipping_check.isChecked()
             }
             
             with open("settings.json", "w") as f:
@@ -1213,6 +610,7 @@ The token will be stored securely in your settings.
             dropbox_token = self.dropbox_token_input.text().strip()
             if dropbox_token:
                 try:
+                    import keyring
                     keyring.set_password("institute_app", "dropbox_token", dropbox_token)
                     self.update_status("Settings and Dropbox token saved securely")
                 except Exception as e:
@@ -1224,21 +622,16 @@ The token will be stored securely in your settings.
             else:
                 # Clear token if empty
                 try:
+                    import keyring
                     keyring.delete_password("institute_app", "dropbox_token")
                 except:
                     pass
             
+            # Apply schedule changes to the running scheduler
+            reload_backup_scheduler()
+            
             QMessageBox.information(self, "Settings Saved", "Settings have been saved successfully!")
             
         except Exception as e:
             self.update_status(f"Error saving settings: {e}")
             QMessageBox.warning(self, "Save Error", f"Failed to save settings: {e}")
-
-# Keep reference alive
-open_windows = []
-
-def open_settings_window():
-    settings_window = SettingsManager()
-    settings_window.show()
-    settings_window.raise_()
-    open_windows.append(settings_window)
@@ -1,82 +1,18 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QMessageBox, QSizePolicy, QHeaderView, QAbstractItemView, QTabWidget
+    QPushButton, QTableView, QMessageBox, QSizePolicy, QHeaderView, QAbstractItemView, QTabWidget
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-from database import add_student, get_students, delete_student
+from data_source import data_source, SyncedRows
+from table_models import FilteredTableModel, EditBuffer, delete_action
+
+STUDENT_COLUMNS = ("id", "student_id", "name", "phone", "email", "address")
 
 class StudentManager(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Student Manager")
         self.setGeometry(200, 200, 800, 700)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f8f9fa;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QLabel {
-                color: #2c3e50;
-                font-weight: 600;
-                font-size: 12px;
-                margin: 5px 0px;
-            }
-            QLineEdit {
-                background-color: white;
-                border: 2px solid #e9ecef;
-                border-radius: 6px;
-                padding: 10px;
-                font-size: 12px;
-                color: #495057;
-            }
-            QLineEdit:focus {
-                border-color: #3498db;
-                background-color: #f8f9fa;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 12px 20px;
-                border-radius: 6px;
-                font-size: 12px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-            }
-            QTableWidget {
-                background-color: white;
-                alternate-background-color: #f8f9fa;
-                gridline-color: #dee2e6;
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-            }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #f1f3f4;
-            }
-            QTableWidget::item:selected {
-                background-color: #3498db;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2c3e50;
-                color: white;
-                padding: 12px;
-                border: none;
-                font-weight: bold;
-                font-size: 11px;
-            }
-            QHeaderView::section:hover {
-                background-color: #34495e;
-            }
-        """)
 
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -84,45 +20,12 @@ class StudentManager(QWidget):
 
         # Title section
         title_label = QLabel("👨‍🎓 Student Management")
-        title_label.setStyleSheet("""
-            font-size: 18px;
-            font-weight: bold;
-            color: #2c3e50;
-            margin: 10px 0px 20px 0px;
-            padding: 15px;
-            background-color: white;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-        """)
+        title_label.setProperty("role", "title")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
 
         # Create tab widget
         self.tab_widget = QTabWidget()
-        self.tab_widget.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #dee2e6;
-                border-radius: 6px;
-                background-color: white;
-            }
-            QTabBar::tab {
-                background-color: #f8f9fa;
-                color: #495057;
-                padding: 12px 20px;
-                margin-right: 2px;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-                font-weight: bold;
-            }
-            QTabBar::tab:selected {
-                background-color: white;
-                color: #2c3e50;
-                border-bottom: 2px solid #3498db;
-            }
-            QTabBar::tab:hover {
-                background-color: #e9ecef;
-            }
-        """)
         layout.addWidget(self.tab_widget)
 
         # Create tabs
@@ -130,7 +33,10 @@ class StudentManager(QWidget):
         self.create_add_tab()
 
         self.setLayout(layout)
-        self.refresh_students()
+        # Rows by id, kept current from the change journal after the first full load
+        self.students = SyncedRows("students", STUDENT_COLUMNS, parent=self)
+        self.students.updated.connect(self.update_student_model)
+        self.update_student_model(None)
 
     def create_listing_tab(self):
         """Create the listing tab with search and table"""
@@ -141,18 +47,26 @@ class StudentManager(QWidget):
 
         # Search/filter bar
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by student name...")
+        self.search_input.setPlaceholderText("Search by name, student ID, phone or email...")
         self.search_input.textChanged.connect(self.filter_students)
         self.search_input.setFixedHeight(45)
-        self.search_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.search_input)
 
-        self.student_table = QTableWidget()
-        self.student_table.setColumnCount(6)
-        self.student_table.setHorizontalHeaderLabels(["ID", "Name", "Phone", "Email", "Address", "Delete"])
-        self.student_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.student_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.student_table.setSelectionMode(QTableWidget.SingleSelection)
+        # Cell edits are saved together, a couple of seconds after the last one or on Save
+        self.edit_buffer = EditBuffer(self.validate_student_edit, self.save_student_edits, parent=self)
+        self.edit_buffer.failed.connect(lambda message: QMessageBox.warning(self, "Input Error", message))
+        self.edit_buffer.edits_changed.connect(self.update_edit_status)
+        self.student_model = FilteredTableModel(
+            [("ID", 0, None), ("Name", 2, None), ("Phone", 3, None), ("Email", 4, None), ("Address", 5, None)],
+            search_fields=(1, 2, 3, 4),
+            action=delete_action("Delete this student"),
+            editable_columns=(1, 2, 3, 4),
+            edit_buffer=self.edit_buffer
+        )
+        self.student_table = QTableView()
+        self.student_table.setModel(self.student_model)
+        self.student_table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked)
+        self.student_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.student_table.setSortingEnabled(True)
         self.student_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.student_table.verticalHeader().setDefaultSectionSize(35)
@@ -161,10 +75,23 @@ class StudentManager(QWidget):
         # Set fixed width for the delete column
         header.setSectionResizeMode(5, QHeaderView.Fixed)
         self.student_table.setColumnWidth(5, 60)
-        self.student_table.itemChanged.connect(self.handle_item_changed)
+        self.student_table.clicked.connect(self.handle_table_click)
         self.student_table.setSelectionMode(QAbstractItemView.NoSelection)
         layout.addWidget(self.student_table, stretch=1)
 
+        edit_layout = QHBoxLayout()
+        self.edit_status = QLabel("Double-click a cell to edit it.")
+        self.edit_status.setProperty("role", "hint")
+        edit_layout.addWidget(self.edit_status, stretch=1)
+        self.discard_button = QPushButton("Discard")
+        self.discard_button.clicked.connect(self.edit_buffer.discard)
+        edit_layout.addWidget(self.discard_button)
+        self.save_button = QPushButton("Save Changes")
+        self.save_button.clicked.connect(self.edit_buffer.flush)
+        edit_layout.addWidget(self.save_button)
+        layout.addLayout(edit_layout)
+        self.update_edit_status()
+
         listing_tab.setLayout(layout)
         self.tab_widget.addTab(listing_tab, "📋 Listing")
 
@@ -177,38 +104,27 @@ class StudentManager(QWidget):
 
         # Form section with better grouping
         form_group = QLabel("Add New Student")
-        form_group.setStyleSheet("""
-            font-size: 14px;
-            font-weight: bold;
-            color: #34495e;
-            margin: 15px 0px 10px 0px;
-            padding: 8px 0px;
-            border-bottom: 2px solid #3498db;
-        """)
+        form_group.setProperty("role", "section")
         layout.addWidget(form_group)
 
         self.name_input = QLineEdit()
         self.name_input.setPlaceholderText("Name (required)")
         self.name_input.setFixedHeight(45)
-        self.name_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.name_input)
 
         self.phone_input = QLineEdit()
         self.phone_input.setPlaceholderText("Phone Number (required)")
         self.phone_input.setFixedHeight(45)
-        self.phone_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.phone_input)
 
         self.email_input = QLineEdit()
         self.email_input.setPlaceholderText("Email (optional)")
         self.email_input.setFixedHeight(45)
-        self.email_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.email_input)
 
         self.address_input = QLineEdit()
         self.address_input.setPlaceholderText("Address (optional)")
         self.address_input.setFixedHeight(45)
-        self.address_input.setStyleSheet("padding-left: 10px; padding-right: 10px;")
         layout.addWidget(self.address_input)
 
         self.add_button = QPushButton("Add Student")
@@ -232,95 +148,65 @@ class StudentManager(QWidget):
             QMessageBox.warning(self, "Input Error", "Name and phone number are required.")
             return
 
-        add_student(name, phone, email, address)
+        self.add_button.setEnabled(False)
+        data_source().call("add_student", name, phone, email, address,
+                           on_result=self.student_added, on_error=self.add_failed, context=self)
+
+    def student_added(self, student_id):
+        self.add_button.setEnabled(True)
         self.name_input.clear()
         self.phone_input.clear()
         self.email_input.clear()
         self.address_input.clear()
-        self.refresh_students()
         
         # Switch to listing tab to show the newly added student
         self.tab_widget.setCurrentIndex(0)
 
-    def refresh_students(self):
-        self.all_students = get_students()
-        self.student_table.blockSignals(True)
-        self.filter_students()
-        self.student_table.blockSignals(False)
+    def add_failed(self, message):
+        self.add_button.setEnabled(True)
+        QMessageBox.critical(self, "Student Not Added", message)
+
+    def update_student_model(self, changed):
+        students_by_id = self.students.rows_by_id
+        if changed is None:
+            self.student_model.set_records(students_by_id[sid] for sid in sorted(students_by_id))
+        elif changed:
+            self.student_model.update_records(students_by_id, changed)
 
     def filter_students(self):
-        filter_text = self.search_input.text().strip().lower() if hasattr(self, 'search_input') else ''
-        self.student_table.blockSignals(True)
-        self.student_table.setRowCount(0)
-        for stu in getattr(self, 'all_students', get_students()):
-            sid, name, phone, email, address = stu
-            if filter_text and filter_text not in name.lower():
-                continue
-            row_idx = self.student_table.rowCount()
-            self.student_table.insertRow(row_idx)
-            self.student_table.setItem(row_idx, 0, QTableWidgetItem(str(sid)))
-            self.student_table.setItem(row_idx, 1, QTableWidgetItem(name))
-            self.student_table.setItem(row_idx, 2, QTableWidgetItem(phone))
-            self.student_table.setItem(row_idx, 3, QTableWidgetItem(email or ''))
-            self.student_table.setItem(row_idx, 4, QTableWidgetItem(address or ''))
-            self.add_delete_button(row_idx, sid)
-        self.student_table.blockSignals(False)
-
-    def add_delete_button(self, row, student_id):
-        btn = QPushButton()
-        icon = QIcon.fromTheme('user-trash')
-        if icon.isNull():
-            icon = QIcon.fromTheme('edit-delete')
-        if icon.isNull():
-            icon = QIcon.fromTheme('window-close')
-        if icon.isNull():
-            btn.setText("🗑️")
-        else:
-            btn.setIcon(icon)
-            btn.setText("")
-        btn.setToolTip('Delete this student')
-        btn.setFlat(True)
-        btn.setFixedSize(28, 20)
-        btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                border: none;
-                padding: 0px;
-                margin: 0px;
-            }
-            QPushButton:hover {
-                background-color: #ffebee;
-                border-radius: 3px;
-            }
-            QPushButton:pressed {
-                background-color: #ffcdd2;
-            }
-        """)
-        btn.clicked.connect(lambda _, sid=student_id: self.confirm_delete_student(sid))
-        self.student_table.setCellWidget(row, 5, btn)
+        self.student_model.set_filter(self.search_input.text())
+
+    def handle_table_click(self, index):
+        if index.column() == self.student_model.columnCount() - 1:
+            self.confirm_delete_student(self.student_model.record_at(index.row())[0])
 
     def confirm_delete_student(self, student_id):
         reply = QMessageBox.question(self, 'Confirm Delete', 'Are you sure you want to delete this student?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            delete_student(student_id)
-            self.refresh_students()
-
-    def handle_item_changed(self, item):
-        # Prevent editing ID column
-        if item.column() == 0:
-            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-            return
-        row = item.row()
-        sid = int(self.student_table.item(row, 0).text())
-        name = self.student_table.item(row, 1).text().strip()
-        phone = self.student_table.item(row, 2).text().strip()
-        email = self.student_table.item(row, 3).text().strip()
-        address = self.student_table.item(row, 4).text().strip()
-        from database import get_connection
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("UPDATE students SET name=?, phone=?, email=?, address=? WHERE id=?", (name, phone, email, address, sid))
-        conn.commit()
-        conn.close()
-        self.refresh_students()
+            data_source().call("delete_student", student_id, on_error=self.show_error, context=self)
+
+    def validate_student_edit(self, sid, field, text):
+        """(value to store, None) for an accepted cell edit, else (None, error message)"""
+        if STUDENT_COLUMNS[field] in ("name", "phone") and not text:
+            return None, "Name and phone number are required."
+        return text, None
+
+    def save_student_edits(self, edits):
+        data_source().call("update_rows", "students", {
+            sid: {STUDENT_COLUMNS[field]: value for field, value in fields.items()}
+            for sid, fields in edits.items()
+        }, on_error=lambda message: self.edit_buffer.failed.emit(f"Changes were not saved: {message}"), context=self)
+
+    def show_error(self, message):
+        QMessageBox.critical(self, "Error", message)
+
+    def update_edit_status(self):
+        count = self.edit_buffer.pending_count()
+        self.edit_status.setText(f"{count} unsaved change(s)" if count else "Double-click a cell to edit it.")
+        self.save_button.setEnabled(bool(count))
+        self.discard_button.setEnabled(bool(count))
+
+    def closeEvent(self, event):
+        self.edit_buffer.flush()
+        super().closeEvent(event)
@@ -0,0 +1,344 @@
+import re
+import unicodedata
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QIcon, QFont
+
+
+NON_DIGITS = re.compile(r"\D+")
+# Numbers written with separators, e.g. "98765 43210" or "011-2345-6789"
+SPACED_NUMBER = re.compile(r"(?<!\d)\d+(?:[ ().+/-]+\d+)+")
+DIGIT_SEPARATOR = re.compile(r"\d[ ().+/-]+\d")
+# Accents left over after NFKD decomposition (Indic vowel signs are kept: they change the word)
+ACCENTS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+")
+
+
+def normalize_text(value):
+    """Lowercase, accent-free form of value used for searching"""
+    text = "" if value is None else str(value)
+    if text.isascii():
+        return text.lower()
+    return ACCENTS.sub("", unicodedata.normalize("NFKD", text).casefold())
+
+
+def make_search_key(values):
+    """Search index entry for one record.
+
+    The values are normalized and kept on separate lines so a query never
+    matches across two fields. Numbers written with separators are added
+    again as bare digits, so "98765 43210" also matches "9876543".
+    """
+    text = normalize_text("\n".join("" if value is None else str(value) for value in values))
+    if not DIGIT_SEPARATOR.search(text):
+        return text
+    numbers = [NON_DIGITS.sub("", number) for number in SPACED_NUMBER.findall(text)]
+    return "\n".join([text] + numbers)
+
+
+def sort_key(value):
+    """Numbers before text (compared case-insensitively), empty values last"""
+    if value is None or value == "":
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, normalize_text(value))
+
+
+def delete_action(tooltip):
+    """Action column spec for a per-row delete icon (falls back to an emoji without an icon theme)"""
+    icon = QIcon.fromTheme('user-trash')
+    if icon.isNull():
+        icon = QIcon.fromTheme('edit-delete')
+    if icon.isNull():
+        icon = QIcon.fromTheme('window-close')
+    return ("Delete", "🗑️", icon, tooltip)
+
+
+class EditBuffer(QObject):
+    """Cell edits collected and saved together instead of one UPDATE per cell.
+
+    validate(record_id, field, text) returns (value, None) for an accepted
+    edit or (None, message). save(edits) gets {record_id: {field: value}}
+    and must write them all in one transaction. Edits are saved delay ms
+    after the last one, or at once by flush().
+    """
+    edits_changed = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, validate, save, delay=2000, parent=None):
+        super().__init__(parent)
+        self.validate = validate
+        self.save = save
+        self.edits = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+
+    def add(self, record_id, field, text):
+        """Queue an edit; returns False (and emits failed) if validate() rejects it"""
+        value, error = self.validate(record_id, field, text)
+        if error:
+            self.failed.emit(error)
+            return False
+        self.edits.setdefault(record_id, {})[field] = value
+        self.timer.start()
+        self.edits_changed.emit()
+        return True
+
+    def value(self, record_id, field, default):
+        """The pending value of a cell, or default when it has no pending edit"""
+        return self.edits.get(record_id, {}).get(field, default)
+
+    def is_pending(self, record_id, field):
+        return field in self.edits.get(record_id, {})
+
+    def pending_count(self):
+        return sum(len(fields) for fields in self.edits.values())
+
+    def flush(self):
+        self.timer.stop()
+        if not self.edits:
+            return
+        edits, self.edits = self.edits, {}
+        try:
+            self.save(edits)
+        except Exception as e:
+            self.failed.emit(f"Changes were not saved: {e}")
+        # Saved rows come back through the change events; failed ones show their stored values again
+        self.edits_changed.emit()
+
+    def discard(self):
+        self.timer.stop()
+        self.edits = {}
+        self.edits_changed.emit()
+
+
+class FilteredTableModel(QAbstractTableModel):
+    """Records shown through a filter backed by a precomputed search index.
+
+    Records are tuples whose first item is the record id. columns lists
+    (header, record field index, display formatter or None). Only records
+    matching the current filter are exposed to the view, in the current
+    sort order, so the view only ever asks for the cells it paints and
+    filtering never touches the records themselves, just their index
+    strings. The sort order is computed once per sort or record change, and
+    filtering walks it, so keystrokes never sort. Each whitespace-separated
+    query word must appear in one of the search_fields (as a prefix or
+    anywhere inside).
+
+    An optional action column (e.g. delete) is appended after the data
+    columns; clicks on it are left to the view's clicked signal. Edits to
+    editable_columns go to edit_buffer (an EditBuffer) and are shown, in
+    italics, until it saves them.
+    """
+    def __init__(self, columns, search_fields, action=None, editable_columns=(), edit_buffer=None, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.search_fields = search_fields
+        self.action = action  # (header, text, icon, tooltip)
+        self.editable_columns = set(editable_columns)
+        self.edit_buffer = edit_buffer
+        if edit_buffer is not None:
+            edit_buffer.edits_changed.connect(self.repaint_rows)
+        self.records = []
+        self.keys = []
+        self.positions = {}
+        self.order = []
+        self.visible = []
+        self.query = ()
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns) + (1 if self.action else 0)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return section + 1
+        if section < len(self.columns):
+            return self.columns[section][0]
+        return self.action[0]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[self.visible[index.row()]]
+        column = index.column()
+        if column >= len(self.columns):
+            _, text, icon, tooltip = self.action
+            if role == Qt.DisplayRole and (icon is None or icon.isNull()):
+                return text
+            if role == Qt.DecorationRole and icon is not None and not icon.isNull():
+                return icon
+            if role == Qt.ToolTipRole:
+                return tooltip
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+            return None
+        _, field, formatter = self.columns[column]
+        value = record[field]
+        if self.edit_buffer is not None:
+            if role == Qt.FontRole and self.edit_buffer.is_pending(record[0], field):
+                font = QFont()
+                font.setItalic(True)
+                return font
+            value = self.edit_buffer.value(record[0], field, value)
+        if role == Qt.DisplayRole:
+            if formatter:
+                return formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.EditRole:
+            return "" if value is None else str(value)
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in self.editable_columns:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or self.edit_buffer is None:
+            return False
+        record = self.records[self.visible[index.row()]]
+        field = self.columns[index.column()][1]
+        text = str(value).strip()
+        if text == ("" if record[field] is None else str(record[field])) \
+                and not self.edit_buffer.is_pending(record[0], field):
+            return False
+        # Once saved, the change event refreshes the record itself
+        return self.edit_buffer.add(record[0], field, text)
+
+    def repaint_rows(self):
+        if self.visible:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.visible) - 1, self.columnCount() - 1))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column >= len(self.columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_visible = self.visible
+        self.sort_column = column
+        self.sort_order = order
+        self.update_order()
+        shown = set(old_visible)
+        self.visible = [pos for pos in self.order if pos in shown]
+        # Keep selections and the current index on the same records
+        rows = {pos: row for row, pos in enumerate(self.visible)}
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(old_indexes, [
+            self.index(rows[old_visible[index.row()]], index.column()) for index in old_indexes])
+        self.layoutChanged.emit()
+
+    # Records and filtering
+
+    def record_at(self, row):
+        """Record shown at a view row, or None"""
+        if 0 <= row < len(self.visible):
+            return self.records[self.visible[row]]
+        return None
+
+    def row_of(self, record_id):
+        """View row showing the record with record_id, or None if it is filtered out"""
+        pos = self.positions.get(record_id)
+        if pos is None:
+            return None
+        try:
+            return self.visible.index(pos)
+        except ValueError:
+            return None
+
+    def set_records(self, records):
+        self.records = list(records)
+        self.keys = [self.search_key(record) for record in self.records]
+        self.positions = {record[0]: pos for pos, record in enumerate(self.records)}
+        self.update_order()
+        self.refilter(narrowing=False)
+
+    def update_records(self, records_by_id, changed_ids):
+        """Refresh the records with the given ids from records_by_id; ids missing from it are removed"""
+        needs_refilter = False
+        updated_rows = []
+        for record_id in changed_ids:
+            record = records_by_id.get(record_id)
+            pos = self.positions.get(record_id)
+            if record is None:
+                if pos is not None:
+                    self.records[pos] = None
+                    needs_refilter = True
+            elif pos is None:
+                self.positions[record_id] = len(self.records)
+                self.records.append(record)
+                self.keys.append(self.search_key(record))
+                needs_refilter = True
+            else:
+                old_record = self.records[pos]
+                self.records[pos] = record
+                self.keys[pos] = self.search_key(record)
+                updated_rows.append(pos)
+                if self.sort_column is not None:
+                    field = self.columns[self.sort_column][1]
+                    needs_refilter = needs_refilter or old_record[field] != record[field]
+
+        visible_rows = {pos: row for row, pos in enumerate(self.visible)}
+        if needs_refilter or any(self.matches(self.keys[pos]) != (pos in visible_rows) for pos in updated_rows):
+            if any(record is None for record in self.records):
+                kept = [pos for pos, record in enumerate(self.records) if record is not None]
+                self.records = [self.records[pos] for pos in kept]
+                self.keys = [self.keys[pos] for pos in kept]
+                self.positions = {record[0]: pos for pos, record in enumerate(self.records)}
+            if needs_refilter:
+                self.update_order()
+            self.refilter(narrowing=False)
+            return
+        # Only edits that keep each record in or out of the view and in place: repaint those rows
+        for pos in updated_rows:
+            row = visible_rows.get(pos)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def search_key(self, record):
+        return make_search_key(record[field] for field in self.search_fields)
+
+    def matches(self, key):
+        return all(word in key for word in self.query)
+
+    def set_filter(self, text):
+        query = tuple(normalize_text(text).split())
+        # Typing more of the same query can only narrow the previous matches
+        narrowing = bool(self.query) and len(query) == len(self.query) and all(
+            new.startswith(old) for new, old in zip(query, self.query))
+        self.query = query
+        self.refilter(narrowing)
+
+    def refilter(self, narrowing):
+        self.beginResetModel()
+        candidates = self.visible if narrowing else self.order
+        keys = self.keys
+        if not self.query:
+            self.visible = list(candidates)
+        elif len(self.query) == 1:
+            word = self.query[0]
+            self.visible = [pos for pos in candidates if word in keys[pos]]
+        else:
+            query = self.query
+            self.visible = [pos for pos in candidates if all(word in keys[pos] for word in query)]
+        self.endResetModel()
+
+    def update_order(self):
+        """Positions of all records in the current sort order"""
+        if self.sort_column is None:
+            self.order = list(range(len(self.records)))
+            return
+        field = self.columns[self.sort_column][1]
+        records = self.records
+        self.order = sorted(range(len(records)), key=lambda pos: sort_key(records[pos][field]),
+                            reverse=self.sort_order == Qt.DescendingOrder)
@@ -0,0 +1,280 @@
+"""Application-wide style sheet.
+
+apply_theme() installs it once on the QApplication. Windows no longer set
+their own style sheets: variants are picked with an objectName (main menu,
+loading overlay) or a "role" dynamic property set before the widget is
+shown, e.g. label.setProperty("role", "title").
+"""
+
+APP_STYLESHEET = """
+    QWidget {
+        background-color: #f8f9fa;
+        font-family: 'Segoe UI', Arial, sans-serif;
+    }
+    QLabel {
+        color: #2c3e50;
+        font-weight: 600;
+        font-size: 12px;
+        margin: 5px 0px;
+        background-color: transparent;
+    }
+    QLineEdit {
+        background-color: white;
+        border: 2px solid #e9ecef;
+        border-radius: 6px;
+        padding: 10px;
+        font-size: 12px;
+        color: #495057;
+    }
+    QLineEdit:focus {
+        border-color: #3498db;
+        background-color: #f8f9fa;
+    }
+    QPushButton {
+        background-color: #3498db;
+        color: white;
+        border: none;
+        padding: 12px 20px;
+        border-radius: 6px;
+        font-size: 12px;
+        font-weight: bold;
+        min-height: 40px;
+    }
+    QPushButton:hover {
+        background-color: #2980b9;
+    }
+    QPushButton:pressed {
+        background-color: #21618c;
+    }
+    QPushButton:disabled {
+        background-color: #bdc3c7;
+        color: #7f8c8d;
+    }
+    QTableWidget, QTableView {
+        background-color: white;
+        alternate-background-color: #f8f9fa;
+        gridline-color: #dee2e6;
+        border: 1px solid #dee2e6;
+        border-radius: 6px;
+    }
+    QTableWidget::item, QTableView::item {
+        padding: 8px;
+        border-bottom: 1px solid #f1f3f4;
+    }
+    QTableWidget::item:selected, QTableView::item:selected {
+        background-color: #3498db;
+        color: white;
+    }
+    QHeaderView::section {
+        background-color: #2c3e50;
+        color: white;
+        padding: 12px;
+        border: none;
+        font-weight: bold;
+        font-size: 11px;
+    }
+    QHeaderView::section:hover {
+        background-color: #34495e;
+    }
+    QListWidget {
+        background-color: white;
+        alternate-background-color: #f8f9fa;
+        border: 1px solid #dee2e6;
+        border-radius: 6px;
+        padding: 5px;
+    }
+    QListWidget::item {
+        padding: 10px;
+        border-bottom: 1px solid #f1f3f4;
+        margin: 2px 0px;
+    }
+    QListWidget::item:selected {
+        background-color: #3498db;
+        color: white;
+        border-radius: 4px;
+    }
+    QTabWidget::pane {
+        border: 1px solid #dee2e6;
+        border-radius: 6px;
+        background-color: white;
+    }
+    QTabBar::tab {
+        background-color: #f8f9fa;
+        color: #495057;
+        padding: 12px 20px;
+        margin-right: 2px;
+        border-top-left-radius: 6px;
+        border-top-right-radius: 6px;
+        font-weight: bold;
+    }
+    QTabBar::tab:selected {
+        background-color: white;
+        color: #2c3e50;
+        border-bottom: 2px solid #3498db;
+    }
+    QTabBar::tab:hover {
+        background-color: #e9ecef;
+        color: #2c3e50;
+    }
+    QGroupBox {
+        font-weight: bold;
+        border: 2px solid #bdc3c7;
+        border-radius: 8px;
+        margin-top: 10px;
+        padding-top: 10px;
+        color: #2c3e50;
+        background-color: white;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px 0 5px;
+        color: #2c3e50;
+        background-color: white;
+    }
+    QCheckBox, QComboBox {
+        color: #2c3e50;
+    }
+    QSpinBox {
+        background-color: white;
+        border: 2px solid #e9ecef;
+        border-radius: 6px;
+        padding: 8px;
+        font-size: 12px;
+        color: #495057;
+    }
+    QTextEdit {
+        background-color: white;
+        border: 2px solid #e9ecef;
+        border-radius: 6px;
+        padding: 8px;
+        font-size: 11px;
+        font-family: 'Courier New', monospace;
+        color: #495057;
+    }
+
+    /* Window titles and section headings */
+    QLabel[role="title"] {
+        font-size: 18px;
+        font-weight: bold;
+        color: #2c3e50;
+        margin: 10px 0px 20px 0px;
+        padding: 15px;
+        background-color: white;
+        border-radius: 8px;
+        border-left: 4px solid #3498db;
+    }
+    QLabel[role="section"] {
+        font-size: 14px;
+        font-weight: bold;
+        color: #34495e;
+        margin: 15px 0px 10px 0px;
+        padding: 8px 0px;
+        border-bottom: 2px solid #3498db;
+    }
+    QLabel[role="field"] {
+        color: #2c3e50;
+        font-weight: bold;
+    }
+    QLabel[role="hint"] {
+        color: #7f8c8d;
+        font-size: 10px;
+        font-style: italic;
+    }
+    QLabel[role="info"] {
+        color: #2c3e50;
+        font-weight: bold;
+        font-size: 14px;
+    }
+    QLabel[role="info"][state="ok"] {
+        color: #27ae60;
+    }
+
+    /* Large action buttons */
+    QPushButton[role="success"], QPushButton[role="danger"] {
+        font-size: 14px;
+        font-weight: bold;
+        padding: 15px;
+        border-radius: 8px;
+    }
+    QPushButton[role="success"] {
+        background-color: #27ae60;
+    }
+    QPushButton[role="success"]:hover {
+        background-color: #229954;
+    }
+    QPushButton[role="danger"] {
+        background-color: #e74c3c;
+    }
+    QPushButton[role="danger"]:hover {
+        background-color: #c0392b;
+    }
+    QPushButton[role="success"]:disabled, QPushButton[role="danger"]:disabled {
+        background-color: #bdc3c7;
+        color: #7f8c8d;
+    }
+
+    /* Main menu */
+    QWidget#mainMenu, #mainMenu QWidget {
+        background-color: #f5f5f5;
+    }
+    #mainMenu QLabel#title {
+        background-color: #2c3e50;
+        color: white;
+        padding: 20px;
+        border-radius: 10px;
+        font-size: 20px;
+        font-weight: bold;
+        margin: 10px;
+    }
+    #mainMenu QLabel#subtitle {
+        color: #34495e;
+        font-size: 16px;
+        font-weight: 500;
+        margin: 10px;
+        background-color: transparent;
+    }
+    #mainMenu QPushButton {
+        background-color: #3498db;
+        padding: 15px;
+        border-radius: 8px;
+        font-size: 14px;
+        margin: 8px;
+        min-height: 50px;
+    }
+    #mainMenu QPushButton:hover {
+        background-color: #2980b9;
+    }
+    #mainMenu QPushButton:pressed {
+        background-color: #21618c;
+    }
+
+    /* Loading overlay shown over Settings during backups and restores */
+    QFrame#loadingOverlay {
+        background-color: rgba(0, 0, 0, 150);
+        border-radius: 10px;
+    }
+    #loadingOverlay QLabel {
+        background-color: transparent;
+    }
+    #loadingOverlay QLabel#loadingIndicator {
+        font-size: 24px;
+        color: #3498db;
+        font-weight: bold;
+    }
+    #loadingOverlay QLabel#loadingMessage {
+        color: white;
+        font-size: 16px;
+        font-weight: bold;
+    }
+    #loadingOverlay QLabel#loadingWarning {
+        color: #f39c12;
+        font-size: 12px;
+        font-weight: 500;
+    }
+"""
+
+
+def apply_theme(app):
+    """Install the application style sheet; call once, right after creating the QApplication"""
+    app.setStyleSheet(APP_STYLESHEET)
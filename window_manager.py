@@ -0,0 +1,135 @@
+import os
+import time
+import importlib
+
+from PyQt5.QtCore import Qt
+
+
+def current_rss_kb():
+    """Resident memory of this process in KB, or None where it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current usage, but still shows growth over a session
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, AttributeError):
+        return None
+
+
+class WindowManager:
+    """Keeps at most one window of each type.
+
+    A window is built on first use, raised if it is already open, and
+    deleted when closed so it no longer holds memory. Build and open times
+    and the memory each build added are recorded per window type.
+    """
+    def __init__(self):
+        self.factories = {}
+        self.windows = {}
+        self.stats = {}
+
+    def register(self, key, factory):
+        """factory() builds the window; it is not called until the window is first opened"""
+        self.factories[key] = factory
+        self.stats.setdefault(key, {
+            "builds": 0, "reuses": 0, "build_ms": 0.0, "last_open_ms": None, "last_build_kb": None
+        })
+
+    def open(self, key):
+        start = time.perf_counter()
+        stats = self.stats[key]
+        window = self.windows.get(key)
+        if window is not None and not window.isVisible():
+            # Closed and waiting for deletion; it cannot be shown again
+            window = None
+        if window is None:
+            rss_before = current_rss_kb()
+            window = self.factories[key]()
+            window.setAttribute(Qt.WA_DeleteOnClose)
+            window.destroyed.connect(lambda _=None, key=key, window=window: self.forget(key, window))
+            self.windows[key] = window
+            stats["builds"] += 1
+            stats["build_ms"] += (time.perf_counter() - start) * 1000
+            rss_after = current_rss_kb()
+            if rss_before is not None and rss_after is not None:
+                stats["last_build_kb"] = rss_after - rss_before
+        else:
+            stats["reuses"] += 1
+
+        if window.isMinimized():
+            window.showNormal()
+        else:
+            window.show()
+        window.raise_()
+        window.activateWindow()
+
+        stats["last_open_ms"] = (time.perf_counter() - start) * 1000
+        return window
+
+    def forget(self, key, window):
+        if self.windows.get(key) is window:
+            del self.windows[key]
+
+    def close_all(self):
+        for window in list(self.windows.values()):
+            window.close()
+
+    def report(self):
+        """Per-window open statistics as printable lines"""
+        lines = [f"{'window':<20} {'builds':>6} {'reuses':>6} {'avg build':>10} {'last open':>10} {'build mem':>10}"]
+        for key, stats in self.stats.items():
+            if not stats["builds"]:
+                continue
+            avg_build = stats["build_ms"] / stats["builds"]
+            memory = f"{stats['last_build_kb']} KB" if stats["last_build_kb"] is not None else "n/a"
+            lines.append(f"{key:<20} {stats['builds']:>6} {stats['reuses']:>6} {avg_build:>8.1f}ms "
+                         f"{stats['last_open_ms']:>8.1f}ms {memory:>10}")
+        rss = current_rss_kb()
+        lines.append(f"open windows: {len(self.windows)}, process memory: {f'{rss} KB' if rss is not None else 'n/a'}")
+        return lines
+
+
+def lazy_window(module_name, class_name):
+    """Factory that imports module_name only when the window is first opened"""
+    def build():
+        return getattr(importlib.import_module(module_name), class_name)()
+    return build
+
+
+window_manager = WindowManager()
+
+# Window modules are imported on first open, so startup only loads the main menu
+window_manager.register("course_manager", lazy_window("course_manager", "CourseManager"))
+window_manager.register("student_manager", lazy_window("student_manager", "StudentManager"))
+window_manager.register("enroll_student", lazy_window("enroll_student", "EnrollStudent"))
+window_manager.register("record_payment", lazy_window("record_payment", "RecordPayment"))
+window_manager.register("payment_history", lazy_window("view_payment_history", "ViewPaymentHistory"))
+window_manager.register("dashboard", lazy_window("dashboard", "Dashboard"))
+window_manager.register("settings", lazy_window("settings_manager", "SettingsManager"))
+
+
+def open_course_manager():
+    window_manager.open("course_manager")
+
+def open_student_manager():
+    window_manager.open("student_manager")
+
+def open_enroll_window():
+    window_manager.open("enroll_student")
+
+def open_payment_window():
+    window_manager.open("record_payment")
+
+def open_payment_history():
+    window_manager.open("payment_history")
+
+def open_dashboard():
+    window_manager.open("dashboard")
+
+def open_settings_window():
+    window_manager.open("settings")